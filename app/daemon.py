@@ -0,0 +1,336 @@
+"""
+Headless reminder daemon: runs the EventScheduler without Tk and serves a
+JSON API on a Unix-domain socket, so reminders keep firing with no window.
+
+    python -m app.daemon [--socket PATH]
+
+Each request is one JSON object per line, answered with one line:
+    {"op": "list", "after": ["2025-01-01T09:00", 3], "limit": 200}
+    {"op": "add", "task": {"title": "...", "scheduled_at": "2025-01-01T09:00", "repeat": "daily"}}
+    {"op": "toggle", "id": 3}     {"op": "delete", "id": 3}
+    {"op": "stats"}               {"op": "ping"}
+    {"op": "changed", "kind": "update", "id": 3}   (a write made by another process)
+    -> {"ok": true, "result": ...} | {"ok": false, "error": "..."}
+{"op": "watch"} is answered once and then streams {"kind": ..., "id": ...}
+lines for every task change until the client disconnects.
+"""
+from __future__ import annotations
+import asyncio, json, os, pathlib, signal, socket, sys, threading, time, datetime as dt
+from typing import Callable, Optional
+from . import storage, metrics, notifications
+from .models import Task
+from .utils import parse_iso_local
+from .scheduler import EventScheduler
+
+WATCH_QUEUE_SIZE = 1000
+
+def socket_path() -> pathlib.Path:
+    """Default socket: next to the database, so each database has its own daemon."""
+    return storage.DB_PATH.with_suffix(".sock")
+
+def _task_to_json(t: Task) -> dict:
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "scheduled_at": t.scheduled_at.isoformat(timespec="minutes"),
+        "repeat": t.repeat,
+        "enabled": t.enabled,
+        "last_fired_at": t.last_fired_at.isoformat(timespec="minutes") if t.last_fired_at else None,
+    }
+
+def _task_from_json(d: dict) -> Task:
+    return Task(
+        id=None,
+        title=d["title"],
+        description=d.get("description") or "",
+        scheduled_at=parse_iso_local(d["scheduled_at"]),
+        repeat=d.get("repeat") or "none",
+        enabled=bool(d.get("enabled", True)),
+    )
+
+# -------------------- Server --------------------
+class Daemon:
+    def __init__(self, path=None, scheduler: Optional[EventScheduler] = None):
+        self.path = pathlib.Path(path or socket_path())
+        self.scheduler = scheduler if scheduler is not None else EventScheduler()
+        self.started_at = time.time()
+        self.ready = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._watchers: set = set()
+
+    def stop(self):
+        """Thread-safe; serve() returns once the server and scheduler are down."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        if connect_daemon(self.path) is not None:
+            raise RuntimeError(f"a daemon is already listening on {self.path}")
+        if self.path.exists():
+            self.path.unlink()  # left behind by a daemon that died
+        server = await asyncio.start_unix_server(self._handle, sock=self._bind())
+        storage.subscribe(self._on_change)
+        self.scheduler.start()
+        self.ready.set()
+        print(f"[daemon] listening on {self.path}")
+        try:
+            await self._stopping.wait()
+        finally:
+            storage.unsubscribe(self._on_change)
+            server.close()
+            for q in list(self._watchers):
+                q.put_nowait(None)
+            await server.wait_closed()
+            self.scheduler.stop()
+            await asyncio.to_thread(self.scheduler.join, 2)
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _bind(self) -> socket.socket:
+        """The listening socket, bound under umask 077 so it is owner-only from the start."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            sock.bind(str(self.path))
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(old_umask)
+        return sock
+
+    # Storage listeners run on the writing thread; hop onto the loop.
+    def _on_change(self, kind: str, task_id: Optional[int]):
+        self._loop.call_soon_threadsafe(self._broadcast, {"kind": kind, "id": task_id})
+
+    def _broadcast(self, event: dict):
+        for q in self._watchers:
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                # The watcher fell behind: replace the backlog with "reload everything".
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait({"kind": "bulk", "id": None})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    req = json.loads(line)
+                    op = req.get("op")
+                    if op == "watch":
+                        await self._send(writer, {"ok": True, "result": None})
+                        await self._watch(reader, writer)
+                        break
+                    handler = getattr(self, f"_op_{op}", None) if isinstance(op, str) else None
+                    if handler is None:
+                        raise ValueError(f"unknown op: {op!r}")
+                    resp = {"ok": True, "result": await asyncio.to_thread(handler, req)}
+                except Exception as e:
+                    resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                await self._send(writer, resp)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, obj: dict):
+        writer.write(json.dumps(obj).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    async def _watch(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        q: asyncio.Queue = asyncio.Queue(WATCH_QUEUE_SIZE)
+        self._watchers.add(q)
+        eof = asyncio.ensure_future(reader.read())
+        try:
+            while True:
+                get = asyncio.ensure_future(q.get())
+                await asyncio.wait({get, eof}, return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    return
+                event = get.result()
+                if event is None:
+                    return
+                await self._send(writer, event)
+        finally:
+            self._watchers.discard(q)
+            eof.cancel()
+
+    # --- Operations (run on worker threads) ---
+    def _op_ping(self, req):
+        return {"pid": os.getpid()}
+
+    def _op_list(self, req):
+        after = req.get("after")
+        if after is not None:
+            after = (dt.datetime.fromisoformat(after[0]), int(after[1]))
+        return [_task_to_json(t) for t in storage.list_tasks_page(after, int(req.get("limit", 200)))]
+
+    def _op_add(self, req):
+        return storage.add_task(_task_from_json(req["task"]))
+
+    def _op_toggle(self, req):
+        task = storage.get_task(int(req["id"]))
+        if task is None:
+            raise KeyError(f"no task {req['id']}")
+        task.enabled = not task.enabled
+        storage.update_task(task)
+        return task.enabled
+
+    def _op_delete(self, req):
+        storage.delete_task(int(req["id"]))
+        return None
+
+    def _op_changed(self, req):
+        task_id = req.get("id")
+        self.scheduler.notify_change(req.get("kind", "update"), task_id)
+        self._on_change(req.get("kind", "update"), task_id)
+        return None
+
+    def _op_stats(self, req):
+        due = self.scheduler._due_at.copy().values()
+        out = {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "tasks": storage.task_counts(),
+            "scheduled": len(due),
+            "next_due": min(due).isoformat(timespec="minutes") if due else None,
+            "watchers": len(self._watchers),
+            "notifications": notifications.get_dispatcher().stats(),
+        }
+        if metrics.ENABLED:
+            out["metrics"] = metrics.snapshot()
+        return out
+
+# -------------------- Client --------------------
+class DaemonError(RuntimeError):
+    pass
+
+class DaemonClient:
+    """Blocking client; every call() uses its own short-lived connection."""
+
+    def __init__(self, path=None, timeout: float = 2.0):
+        self.path = pathlib.Path(path or socket_path())
+        self.timeout = timeout
+
+    def _connect(self) -> socket.socket:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        try:
+            s.connect(str(self.path))
+        except OSError:
+            s.close()
+            raise
+        return s
+
+    @staticmethod
+    def _request(s: socket.socket, fp, op: str, params: dict):
+        s.sendall(json.dumps({"op": op, **params}).encode("utf-8") + b"\n")
+        line = fp.readline()
+        if not line:
+            raise DaemonError("daemon closed the connection")
+        resp = json.loads(line)
+        if not resp["ok"]:
+            raise DaemonError(resp["error"])
+        return resp["result"]
+
+    def call(self, op: str, **params):
+        with self._connect() as s, s.makefile("rb") as fp:
+            return self._request(s, fp, op, params)
+
+    def post(self, op: str, **params) -> None:
+        """call() on a background thread; failures are only logged."""
+        def work():
+            try:
+                self.call(op, **params)
+            except (OSError, DaemonError) as e:
+                print(f"[daemon] {op} failed:", e)
+        threading.Thread(target=work, daemon=True, name="daemon-post").start()
+
+    def watch(self, callback: Callable[[str, Optional[int]], None], on_close: Optional[Callable[[], None]] = None) -> Callable[[], None]:
+        """
+        Call callback(kind, task_id) from a background thread for every change
+        the daemon sees; on_close() runs if the connection drops. Returns a
+        function that stops watching.
+        """
+        s = self._connect()
+        fp = s.makefile("rb")
+        self._request(s, fp, "watch", {})
+        s.settimeout(None)
+        closed = threading.Event()
+
+        def run():
+            try:
+                for line in fp:
+                    event = json.loads(line)
+                    try:
+                        callback(event["kind"], event["id"])
+                    except Exception as e:
+                        print("[daemon] watch callback error:", e)
+            except (OSError, ValueError):
+                pass
+            finally:
+                fp.close()
+                s.close()
+                if on_close is not None and not closed.is_set():
+                    on_close()
+
+        def stop():
+            closed.set()
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        threading.Thread(target=run, daemon=True, name="daemon-watch").start()
+        return stop
+
+def connect_daemon(path=None, timeout: float = 0.5) -> Optional[DaemonClient]:
+    """A client for the daemon listening on `path`, or None if none answers."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    client = DaemonClient(path, timeout)
+    if not client.path.exists():
+        return None
+    try:
+        client.call("ping")
+    except (OSError, ValueError, DaemonError):
+        return None
+    client.timeout = 2.0
+    return client
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[argv.index("--socket") + 1] if "--socket" in argv else None
+    daemon = Daemon(path)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, daemon.stop)
+        await daemon.serve()
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        print(f"[daemon] {e}", file=sys.stderr)
+        return 1
+    finally:
+        notifications.shutdown()
+        storage.close_all()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
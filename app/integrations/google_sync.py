@@ -1,12 +1,9 @@
 from __future__ import annotations
-import os, datetime as dt, pathlib, json
-from typing import Optional, List, Dict
+import os, datetime as dt, pathlib, json, threading
+from typing import Optional, List, Dict, Iterable
 
-# Google API imports (lazy)
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+# The Google client libraries take most of the app's import time, so they are
+# imported inside the functions that need them, on the first Google call.
 
 DATA_DIR = pathlib.Path(__file__).resolve().parents[1]  # .../app
 TOKEN_PATH = DATA_DIR / "token.json"
@@ -18,29 +15,72 @@ SCOPES = [
     "https://www.googleapis.com/auth/calendar"
 ]
 
+# Process-wide caches. Credentials are refreshed in place when they expire and
+# the service objects keep using them, so clients are only rebuilt when a new
+# credentials object has to be created (first use, revoked refresh token...).
+# The underlying httplib2 transport is not thread-safe: call from one thread.
+_lock = threading.RLock()
+_creds = None
+_services: Dict[str, object] = {}
+_default_tasklist: Optional[str] = None
+
+def reset_cache():
+    global _creds, _default_tasklist
+    with _lock:
+        _creds = None
+        _services.clear()
+        _default_tasklist = None
+
 def _get_creds():
-    creds = None
-    if TOKEN_PATH.exists():
-        creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not CLIENT_SECRET_PATH.exists():
-                raise FileNotFoundError("Falta credentials.json en la carpeta app/ para autenticar con Google.")
-            flow = InstalledAppFlow.from_client_secrets_file(str(CLIENT_SECRET_PATH), SCOPES)
-            creds = flow.run_local_server(port=0)
-        TOKEN_PATH.write_text(creds.to_json())
-    return creds
+    global _creds, _default_tasklist
+    with _lock:
+        if _creds is not None and _creds.valid:
+            return _creds
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        creds = _creds
+        if creds is None and TOKEN_PATH.exists():
+            creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not CLIENT_SECRET_PATH.exists():
+                    raise FileNotFoundError("Falta credentials.json en la carpeta app/ para autenticar con Google.")
+                flow = InstalledAppFlow.from_client_secrets_file(str(CLIENT_SECRET_PATH), SCOPES)
+                creds = flow.run_local_server(port=0)
+            TOKEN_PATH.write_text(creds.to_json())
+        if creds is not _creds:
+            _services.clear()
+            _default_tasklist = None
+        _creds = creds
+        return creds
+
+def _service(name: str, version: str):
+    with _lock:
+        creds = _get_creds()
+        svc = _services.get(name)
+        if svc is None:
+            from googleapiclient.discovery import build
+            svc = _services[name] = build(name, version, credentials=creds, cache_discovery=False)
+        return svc
 
 # -------------------- Google Tasks --------------------
 def tasks_service():
-    creds = _get_creds()
-    return build('tasks', 'v1', credentials=creds, cache_discovery=False)
+    return _service('tasks', 'v1')
 
 def calendar_service():
-    creds = _get_creds()
-    return build('calendar', 'v3', credentials=creds, cache_discovery=False)
+    return _service('calendar', 'v3')
+
+def default_tasklist_id() -> str:
+    """Id of the first task list, looked up once per process."""
+    global _default_tasklist
+    with _lock:
+        if _default_tasklist is None:
+            tasklists = tasks_service().tasklists().list(maxResults=1).execute()
+            _default_tasklist = tasklists['items'][0]['id']
+        return _default_tasklist
 
 def _ensure_timezone(d: dt.datetime) -> dt.datetime:
     if d.tzinfo is None or d.tzinfo.utcoffset(d) is None:
@@ -49,44 +89,44 @@ def _ensure_timezone(d: dt.datetime) -> dt.datetime:
     return d
 
 
-def add_google_task(title: str, notes: str = "", due: Optional[dt.datetime] = None, tasklist_id: Optional[str] = None) -> str:
-    svc = tasks_service()
-    if not tasklist_id:
-        # default tasklist (first one)
-        tasklists = svc.tasklists().list(maxResults=1).execute()
-        tasklist_id = tasklists['items'][0]['id']
+def _task_body(title: str, notes: str = "", due: Optional[dt.datetime] = None) -> dict:
     body = {"title": title}
     if notes:
         body["notes"] = notes
     if due:
         due = _ensure_timezone(due)
         body["due"] = due.astimezone(dt.timezone.utc).isoformat()
-    res = svc.tasks().insert(tasklist=tasklist_id, body=body).execute()
+    return body
+
+def add_google_task(title: str, notes: str = "", due: Optional[dt.datetime] = None, tasklist_id: Optional[str] = None) -> str:
+    svc = tasks_service()
+    tasklist_id = tasklist_id or default_tasklist_id()
+    res = svc.tasks().insert(tasklist=tasklist_id, body=_task_body(title, notes, due)).execute()
     return res["id"]
 
 def list_google_tasks(max_results: int = 50, tasklist_id: Optional[str] = None):
     svc = tasks_service()
-    if not tasklist_id:
-        tasklists = svc.tasklists().list(maxResults=1).execute()
-        tasklist_id = tasklists['items'][0]['id']
+    tasklist_id = tasklist_id or default_tasklist_id()
     res = svc.tasks().list(tasklist=tasklist_id, maxResults=max_results, showCompleted=True).execute()
     return res.get("items", [])
 
 # -------------------- Google Calendar --------------------
-def add_calendar_event(title: str, start: dt.datetime, end: Optional[dt.datetime] = None, description: str = "", calendar_id: str = "primary") -> str:
-    svc = calendar_service()
+def _event_body(title: str, start: dt.datetime, end: Optional[dt.datetime] = None, description: str = "") -> dict:
     start = _ensure_timezone(start)
     if end is None:
         end = start + dt.timedelta(minutes=30)
     else:
         end = _ensure_timezone(end)
-    event = {
+    return {
         "summary": title,
         "description": description,
         "start": {"dateTime": start.isoformat()},
         "end": {"dateTime": end.isoformat()},
     }
-    created = svc.events().insert(calendarId=calendar_id, body=event).execute()
+
+def add_calendar_event(title: str, start: dt.datetime, end: Optional[dt.datetime] = None, description: str = "", calendar_id: str = "primary") -> str:
+    svc = calendar_service()
+    created = svc.events().insert(calendarId=calendar_id, body=_event_body(title, start, end, description)).execute()
     return created["id"]
 
 def list_calendar_events(time_min: Optional[dt.datetime] = None, time_max: Optional[dt.datetime] = None, calendar_id: str = "primary", max_results: int = 50):
@@ -111,3 +151,61 @@ def export_local_task_to_google(title: str, when: dt.datetime, notes: str = "")
     except Exception as e:
         ids["event_error"] = str(e)
     return ids
+
+# Google batch endpoints take at most 50 calls per HTTP request (Calendar's limit).
+BATCH_SIZE = 50
+
+def _execute_batches(svc, requests, callback):
+    """
+    Execute (index, request) pairs BATCH_SIZE per HTTP request. callback(index,
+    response, exception) gets one outcome per request, including the error of
+    a batch that failed as a whole.
+    """
+    done = set()
+    def on_response(request_id, response, exception):
+        done.add(int(request_id))
+        callback(int(request_id), response, exception)
+    for start in range(0, len(requests), BATCH_SIZE):
+        chunk = requests[start:start + BATCH_SIZE]
+        try:
+            batch = svc.new_batch_http_request(callback=on_response)
+            for i, req in chunk:
+                batch.add(req, request_id=str(i))
+            batch.execute()
+        except Exception as e:
+            for i, _ in chunk:
+                if i not in done:
+                    callback(i, None, e)
+
+def _run_batches(svc, requests, results: List[Dict[str, str]], key: str):
+    """Execute (index, request) pairs in batches, filling results[index][key]."""
+    def callback(i, response, exception):
+        if exception is not None:
+            results[i][f"{key}_error"] = str(exception)
+        else:
+            results[i][f"{key}_id"] = response["id"]
+    _execute_batches(svc, requests, callback)
+
+def export_local_tasks_to_google(tasks: Iterable, calendar_id: str = "primary") -> List[Dict[str, str]]:
+    """
+    Bulk version of export_local_task_to_google for agenda Task objects.
+    Returns one ids/errors dict per task, in input order.
+    """
+    tasks = list(tasks)
+    results: List[Dict[str, str]] = [{} for _ in tasks]
+    if not tasks:
+        return results
+    try:
+        svc = tasks_service()
+        tasklist_id = default_tasklist_id()
+        _run_batches(svc, [(i, svc.tasks().insert(tasklist=tasklist_id, body=_task_body(t.title, t.description, t.scheduled_at))) for i, t in enumerate(tasks)], results, "task")
+    except Exception as e:
+        for r in results:
+            r.setdefault("task_error", str(e))
+    try:
+        svc = calendar_service()
+        _run_batches(svc, [(i, svc.events().insert(calendarId=calendar_id, body=_event_body(t.title, t.scheduled_at, description=t.description))) for i, t in enumerate(tasks)], results, "event")
+    except Exception as e:
+        for r in results:
+            r.setdefault("event_error", str(e))
+    return results
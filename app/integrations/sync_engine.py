@@ -0,0 +1,306 @@
+"""
+Incremental two-way sync between local agenda tasks and Google Tasks/Calendar.
+
+Pull: Google Tasks changes since the last seen `updated` time (updatedMin) and
+Calendar changes since the last `nextSyncToken`. Push: local tasks whose
+updated_at moved past their link's synced_at, plus deletions of linked tasks.
+When both sides changed since the last sync, the newer modification wins.
+"""
+from __future__ import annotations
+import datetime as dt
+from typing import List, Optional
+from .. import storage
+from ..models import Task
+from . import google_sync
+
+TASKS_WATERMARK = "google.tasks.updated_min"
+CALENDAR_TOKEN = "google.calendar.sync_token"
+PUSH_WATERMARK = "google.push.watermark"
+TASK_ID_PROPERTY = "pt_task_id"  # private extended property on events we create
+
+def _parse_rfc3339(value: str) -> dt.datetime:
+    return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _local_naive(d: dt.datetime) -> dt.datetime:
+    return d.astimezone().replace(tzinfo=None, second=0, microsecond=0)
+
+def _http_status(exc: Exception) -> Optional[int]:
+    resp = getattr(exc, "resp", None)
+    return getattr(resp, "status", None)
+
+class GoogleSync:
+    def __init__(self, tasks_svc=None, calendar_svc=None, tasklist_id: Optional[str] = None, calendar_id: str = "primary"):
+        self.tasks_svc = tasks_svc or google_sync.tasks_service()
+        self.calendar_svc = calendar_svc or google_sync.calendar_service()
+        self.tasklist_id = tasklist_id or google_sync.default_tasklist_id()
+        self.calendar_id = calendar_id
+        self.report = {}
+        self._unlinked = {}
+
+    def sync(self) -> dict:
+        self.report = {"pulled": 0, "pushed": 0, "deleted_local": 0, "deleted_remote": 0, "conflicts_local_won": 0}
+        self._unlinked = {}
+        self.pull_tasks()
+        self.pull_events()
+        self.push()
+        return self.report
+
+    # -------------------- conflict helpers --------------------
+    def _remote_wins(self, link: dict, remote_updated: str) -> bool:
+        """Remote change applies unless the local task changed later than it."""
+        local_updated = storage.task_updated_at(link["task_id"])
+        if local_updated is None or local_updated <= link["synced_at"]:
+            return True
+        if _parse_rfc3339(remote_updated) >= dt.datetime.fromisoformat(local_updated):
+            return True
+        self.report["conflicts_local_won"] += 1
+        return False
+
+    # Items exported before links were recorded are matched to their local
+    # task (title plus due date or start time) and linked, not imported again.
+    @staticmethod
+    def _match_key(column: str, title: str, when: dt.datetime):
+        if column == "gtask_id":
+            # Google Tasks keeps only the (UTC) date of a due time.
+            return title, when.astimezone(dt.timezone.utc).date().isoformat()
+        return title, when
+
+    def _adopt(self, column: str, key) -> Optional[int]:
+        index = self._unlinked.get(column)
+        if index is None:
+            index = self._unlinked[column] = {}
+            for t in storage.unlinked_tasks(column):
+                index.setdefault(self._match_key(column, t.title, t.scheduled_at), []).append(t.id)
+        ids = index.get(key)
+        return ids.pop(0) if ids else None
+
+    def _delete_local(self, task_id: int):
+        storage.delete_task(task_id)
+        storage.delete_link(task_id)
+        self.report["deleted_local"] += 1
+
+    # -------------------- pull --------------------
+    def pull_tasks(self):
+        updated_min = storage.get_sync_state(TASKS_WATERMARK)
+        newest = updated_min
+        page_token = None
+        while True:
+            kw = dict(tasklist=self.tasklist_id, showDeleted=True, showHidden=True, maxResults=100)
+            if updated_min:
+                kw["updatedMin"] = updated_min
+            if page_token:
+                kw["pageToken"] = page_token
+            res = self.tasks_svc.tasks().list(**kw).execute()
+            for item in res.get("items", []):
+                self._apply_remote_task(item)
+                if newest is None or _parse_rfc3339(item["updated"]) > _parse_rfc3339(newest):
+                    newest = item["updated"]
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                break
+        if newest:
+            storage.set_sync_state(TASKS_WATERMARK, newest)
+
+    def _apply_remote_task(self, item: dict):
+        link = storage.find_link(gtask_id=item["id"])
+        gone = bool(item.get("deleted"))
+        if link is None:
+            if gone or not item.get("title"):
+                return
+            task_id = self._adopt("gtask_id", (item["title"], item["due"][:10])) if item.get("due") else None
+            if task_id is not None:
+                storage.save_link(task_id, gtask_id=item["id"], gtask_etag=item.get("etag"), gtask_updated=item["updated"])
+                return
+            # Only pending tasks with a future due time become live reminders;
+            # due-less and overdue ones are imported disabled so they don't
+            # all fire the moment they arrive.
+            now = dt.datetime.now().replace(second=0, microsecond=0)
+            due = _local_naive(_parse_rfc3339(item["due"])) if item.get("due") else None
+            enabled = item.get("status") != "completed" and due is not None and due >= now
+            task_id = storage.add_task(Task(id=None, title=item["title"], description=item.get("notes", ""), scheduled_at=due or now, repeat="none", enabled=enabled))
+            storage.save_link(task_id, gtask_id=item["id"], gtask_etag=item.get("etag"), gtask_updated=item["updated"])
+            self.report["pulled"] += 1
+            return
+        if link["gtask_updated"] and item["updated"] <= link["gtask_updated"]:
+            return  # our own push coming back
+        if not self._remote_wins(link, item["updated"]):
+            if gone:
+                storage.save_link(link["task_id"], reconciled=False, gtask_id=None, gtask_etag=None, gtask_updated=None)
+            return
+        if gone:
+            self._delete_local(link["task_id"])
+            return
+        task = storage.get_task(link["task_id"])
+        if task is None:
+            return
+        task.title = item.get("title", task.title)
+        task.description = item.get("notes", "")
+        if item.get("status") == "completed":
+            task.enabled = False
+        elif not task.enabled:
+            # Reopening in Google does not re-arm a one-shot reminder already past due.
+            task.enabled = task.repeat != "none" or task.scheduled_at >= dt.datetime.now().replace(second=0, microsecond=0)
+        storage.update_task(task)
+        storage.save_link(task.id, gtask_etag=item.get("etag"), gtask_updated=item["updated"])
+        self.report["pulled"] += 1
+
+    def pull_events(self):
+        token = storage.get_sync_state(CALENDAR_TOKEN)
+        page_token = None
+        while True:
+            kw = dict(calendarId=self.calendar_id, showDeleted=True, maxResults=250)
+            if token:
+                kw["syncToken"] = token
+            if page_token:
+                kw["pageToken"] = page_token
+            try:
+                res = self.calendar_svc.events().list(**kw).execute()
+            except Exception as e:
+                if _http_status(e) == 410 and token:
+                    # Sync token expired: start over with a full listing.
+                    token, page_token = None, None
+                    storage.set_sync_state(CALENDAR_TOKEN, None)
+                    continue
+                raise
+            for item in res.get("items", []):
+                self._apply_remote_event(item)
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                break
+        if res.get("nextSyncToken"):
+            storage.set_sync_state(CALENDAR_TOKEN, res["nextSyncToken"])
+
+    def _apply_remote_event(self, item: dict):
+        # Only events created by this app are synced back; the rest of the
+        # user's calendar is left alone.
+        link = storage.find_link(event_id=item["id"])
+        if link is None:
+            start = item.get("start", {})
+            if item.get("status") != "cancelled" and "dateTime" in start:
+                task_id = self._adopt("event_id", (item.get("summary"), _local_naive(_parse_rfc3339(start["dateTime"]))))
+                if task_id is not None:
+                    storage.save_link(task_id, event_id=item["id"], event_etag=item.get("etag"), event_updated=item.get("updated"))
+            return
+        # Cancelled entries of an incremental listing may carry no `updated`;
+        # with nothing to compare, the remote change counts as the newer one.
+        updated = item.get("updated")
+        if updated and link["event_updated"] and updated <= link["event_updated"]:
+            return
+        if updated and not self._remote_wins(link, updated):
+            if item.get("status") == "cancelled":
+                storage.save_link(link["task_id"], reconciled=False, event_id=None, event_etag=None, event_updated=None)
+            return
+        if item.get("status") == "cancelled":
+            self._delete_local(link["task_id"])
+            return
+        task = storage.get_task(link["task_id"])
+        if task is None:
+            return
+        start = item.get("start", {})
+        if "dateTime" in start:
+            task.scheduled_at = _local_naive(_parse_rfc3339(start["dateTime"]))
+        elif "date" in start:
+            task.scheduled_at = dt.datetime.fromisoformat(start["date"])
+        task.title = item.get("summary", task.title)
+        task.description = item.get("description", "")
+        storage.update_task(task)
+        storage.save_link(task.id, event_etag=item.get("etag"), event_updated=item.get("updated"))
+        self.report["pulled"] += 1
+
+    # -------------------- push --------------------
+    # Pushes go out BATCH_SIZE calls per HTTP request on each service.
+    def push(self):
+        self._push_deletes(storage.orphan_links())
+        watermark = storage.get_sync_state(PUSH_WATERMARK, "")
+        pending = storage.tasks_to_push(watermark)
+        # Many rows share one updated_at (a scheduler tick, a migration), so
+        # the watermark only moves past a stamp once every row carrying it
+        # was pushed; rows pushed before a failure are already reconciled.
+        stamps = [updated_at for _, _, updated_at in pending]
+        try:
+            for start in range(0, len(pending), google_sync.BATCH_SIZE):
+                chunk = pending[start:start + google_sync.BATCH_SIZE]
+                errors = self.push_tasks([(task, link or {}) for task, link, _ in chunk])
+                for i, err in enumerate(errors, start):
+                    if err is not None:
+                        raise err
+                    if i + 1 == len(stamps) or stamps[i + 1] != stamps[i]:
+                        watermark = stamps[i]
+        finally:
+            storage.set_sync_state(PUSH_WATERMARK, watermark)
+
+    def _push_deletes(self, links):
+        errors = [None] * len(links)
+        def callback(i, response, exception):
+            if exception is not None and _http_status(exception) not in (404, 410):
+                errors[i] = errors[i] or exception
+        google_sync._execute_batches(self.tasks_svc, [
+            (i, self.tasks_svc.tasks().delete(tasklist=self.tasklist_id, task=link["gtask_id"]))
+            for i, link in enumerate(links) if link["gtask_id"]
+        ], callback)
+        google_sync._execute_batches(self.calendar_svc, [
+            (i, self.calendar_svc.events().delete(calendarId=self.calendar_id, eventId=link["event_id"]))
+            for i, link in enumerate(links) if link["event_id"]
+        ], callback)
+        for link, err in zip(links, errors):
+            if err is None:
+                storage.delete_link(link["task_id"])
+                self.report["deleted_remote"] += 1
+        for err in errors:
+            if err is not None:
+                raise err
+
+    def push_tasks(self, items) -> List[Optional[Exception]]:
+        """
+        Insert or patch (task, link) pairs in Google Tasks and Calendar and
+        record what was created in the links. Returns each pair's error, or None.
+        """
+        task_requests, event_requests = [], []
+        for i, (task, link) in enumerate(items):
+            body = google_sync._task_body(task.title, task.description, task.scheduled_at)
+            body["status"] = "needsAction" if task.enabled else "completed"
+            if link.get("gtask_id"):
+                task_requests.append((i, self.tasks_svc.tasks().patch(tasklist=self.tasklist_id, task=link["gtask_id"], body=body)))
+            else:
+                task_requests.append((i, self.tasks_svc.tasks().insert(tasklist=self.tasklist_id, body=body)))
+            event = google_sync._event_body(task.title, task.scheduled_at, description=task.description)
+            event["extendedProperties"] = {"private": {TASK_ID_PROPERTY: str(task.id)}}
+            if link.get("event_id"):
+                event_requests.append((i, self.calendar_svc.events().patch(calendarId=self.calendar_id, eventId=link["event_id"], body=event)))
+            else:
+                event_requests.append((i, self.calendar_svc.events().insert(calendarId=self.calendar_id, body=event)))
+        fields = [{} for _ in items]
+        errors: List[Optional[Exception]] = [None] * len(items)
+        def collect(prefix):
+            def callback(i, response, exception):
+                if exception is not None:
+                    errors[i] = errors[i] or exception
+                else:
+                    fields[i].update({f"{prefix}_id": response["id"], f"{prefix}_etag": response.get("etag"), f"{prefix}_updated": response.get("updated")})
+            return callback
+        google_sync._execute_batches(self.tasks_svc, task_requests, collect("gtask"))
+        google_sync._execute_batches(self.calendar_svc, event_requests, collect("event"))
+        for (task, _), linked, err in zip(items, fields, errors):
+            # A half-pushed task keeps what was created, unreconciled, so the
+            # retry patches it instead of inserting a second copy.
+            if linked:
+                storage.save_link(task.id, reconciled=err is None, **linked)
+            if err is None:
+                self.report["pushed"] += 1
+        return errors
+
+    def export(self, tasks) -> List[Optional[Exception]]:
+        """Push `tasks` now through their links; exporting again updates the same Google items."""
+        self.report = {"pushed": 0}
+        tasks = list(tasks)
+        errors: List[Optional[Exception]] = []
+        for start in range(0, len(tasks), google_sync.BATCH_SIZE):
+            chunk = tasks[start:start + google_sync.BATCH_SIZE]
+            errors.extend(self.push_tasks([(t, storage.get_link(t.id) or {}) for t in chunk]))
+        return errors
+
+def sync_with_google(**kw) -> dict:
+    return GoogleSync(**kw).sync()
+
+def export_tasks_to_google(tasks, **kw) -> List[Optional[Exception]]:
+    return GoogleSync(**kw).export(tasks)
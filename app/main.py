@@ -1,39 +1,152 @@
 from __future__ import annotations
 import tkinter as tk
-from tkinter import ttk, messagebox
-
-try:
-    from tkcalendar import DateEntry, Calendar
-except ImportError:  # pragma: no cover
-    DateEntry = None
-    Calendar = None
-import datetime as dt
-
-from .storage import add_task, list_tasks, update_task, delete_task, get_task, add_tabata_session, count_tabatas_on
-from .models import Task
-from .scheduler import Scheduler
-from .notifications import notify
-from .sounds import play as play_sound
+from tkinter import ttk, messagebox, filedialog
+import datetime as dt, math, bisect, queue, threading, sys, importlib.util
+
+from .storage import add_task, list_task_columns, iter_task_columns, search_tasks, iter_occurrences, get_tasks, update_task, delete_task, get_task, add_tabata_session, count_tabatas_on, add_pomodoro_phases, pomodoro_on, BatchWriter, ChangeBus, close_all, subscribe, unsubscribe
+from .models import Task, TaskColumns
+from .scheduler import EventScheduler
+from .notifications import notify, shutdown as shutdown_notifications
+from .sounds import play as play_sound, preload as preload_sounds
 from .utils import parse_datetime, now
-from .integrations.google_sync import export_local_task_to_google
+from .timer_engine import IntervalProgram, Phase, PhaseRecorder, WORK, REST, pomodoro, tabata
+from . import transfer, metrics
+
+# tkcalendar (and babel under it) and the Google client libraries are slow to
+# import; they are loaded the first time a date picker opens or a Google
+# action runs. `python -m app.main --profile-startup` shows what startup pays for.
+HAS_TKCALENDAR = importlib.util.find_spec("tkcalendar") is not None
 
 APP_TITLE = "Productivity Timer & Agenda"
 WINDOWING_SYSTEM = None
 
-class TimerTab(ttk.Frame):
+class IntervalTab(ttk.Frame):
+    """Countdown plumbing shared by TimerTab and TabataTab, driven by an IntervalProgram."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.program: IntervalProgram | None = None
+        self._timer_id = None
+        self._shown_seconds = None
+        self.bind("<Map>", self._on_visible, add="+")
+        self.winfo_toplevel().bind("<Map>", self._on_toplevel_map, add="+")
+
+    @property
+    def running(self):
+        return self.program is not None and self.program.running
+
+    def _build_program(self) -> IntervalProgram:
+        raise NotImplementedError
+
+    def _on_start(self, fresh: bool):
+        pass
+
+    def _on_phase_end(self, phase: Phase, nxt: Phase | None):
+        raise NotImplementedError
+
+    def _bell(self):
+        try:
+            self.bell()
+        except Exception:
+            pass
+
+    def _on_toplevel_map(self, event):
+        # Toplevel bindings also see every child's <Map>; only react to de-iconify.
+        if event.widget is self.winfo_toplevel():
+            self._on_visible()
+
+    def _on_visible(self, _event=None):
+        # While hidden only phase deadlines are scheduled; catch up right away.
+        if self.running:
+            self._cancel_tick()
+            self._tick()
+        else:
+            self._update_time_lbl(force=True)
+
+    def _cancel_tick(self):
+        if self._timer_id:
+            self.after_cancel(self._timer_id)
+            self._timer_id = None
+
+    def _schedule_tick(self):
+        rem = self.program.remaining()
+        if self.winfo_viewable():
+            delay = rem - math.floor(rem) or 1.0  # until the displayed second changes
+        else:
+            delay = rem  # minimized or tab hidden: wake only for the phase change
+        self._timer_id = self.after(max(10, int(delay * 1000) + 1), self._tick)
+
+    def _tick(self):
+        self._timer_id = None
+        if not self.running:
+            return
+        # Several phases can end in one poll after a stall; each is paired
+        # with its own successor, not with the phase now current.
+        for phase, nxt in self.program.poll_transitions():
+            self._on_phase_end(phase, nxt)
+        self._update_time_lbl()
+        if self.running:
+            self._schedule_tick()
+
+    def _update_time_lbl(self, force: bool = False):
+        secs = self.program.display_seconds() if self.program is not None else 0
+        if not force and (secs == self._shown_seconds or not self.winfo_viewable()):
+            return
+        self._shown_seconds = secs
+        m, s = divmod(secs, 60)
+        self.time_lbl.config(text=f"{m:02d}:{s:02d}")
+
+    def start(self):
+        if self.running:
+            return
+        fresh = self.program is None or self.program.finished
+        if fresh:
+            self.program = self._build_program()
+        self._on_start(fresh)
+        self.program.start()
+        self._update_time_lbl(force=True)
+        self._schedule_tick()
+
+    def pause(self):
+        if self.program is not None:
+            self.program.pause()
+        self._cancel_tick()
+        self.status_lbl.config(text="Pausado")
+
+    def reset(self):
+        self.pause()
+        self.program = None
+        self._update_time_lbl(force=True)
+        self.status_lbl.config(text="Listo")
+
+
+class TimerTab(IntervalTab):
     def __init__(self, master):
         super().__init__(master)
         self.work_min = tk.IntVar(value=25)
         self.break_min = tk.IntVar(value=5)
         self.cycles = tk.IntVar(value=4)
 
-        self.remaining = 0
-        self.is_work = True
-        self.running = False
-        self.completed_cycles = 0
-        self._timer_id = None
+        # Every phase goes to pomodoro_sessions through a background writer;
+        # the "Hoy" label re-reads the daily rollup once a batch is stored.
+        # The writer thread only sets _today_stale; _poll_today reads it on
+        # the Tk thread.
+        self._recorder = PhaseRecorder()
+        self._today_stale = threading.Event()
+        self._writer = BatchWriter(add_pomodoro_phases, on_written=lambda _: self._today_stale.set())
+        self._writer.start()
 
         self._build_ui()
+        self.refresh_today()
+        self.after(self.TODAY_POLL_MS, self._poll_today)
+
+    TODAY_POLL_MS = 500
+
+    def _poll_today(self):
+        if self._today_stale.is_set():
+            self._today_stale.clear()
+            self.refresh_today()
+        self.after(self.TODAY_POLL_MS, self._poll_today)
 
     def _build_ui(self):
         row = 0
@@ -60,6 +173,10 @@ class TimerTab(ttk.Frame):
         self.status_lbl = ttk.Label(self, text="Listo")
         self.status_lbl.grid(row=row, column=0, columnspan=6, sticky="w")
 
+        row += 1
+        self.today_lbl = ttk.Label(self, text="Hoy: 0 pomodoros / 0 min")
+        self.today_lbl.grid(row=row, column=0, columnspan=6, sticky="w", pady=(8,0))
+
         for i in range(6):
             self.grid_columnconfigure(i, weight=1)
 
@@ -68,88 +185,71 @@ class TimerTab(ttk.Frame):
             return
         self.work_min.set(w); self.break_min.set(b); self.cycles.set(c)
 
-    def _tick(self):
-        if not self.running:
-            return
-        if self.remaining <= 0:
-            self._phase_change()
-        else:
-            self.remaining -= 1
-            self._update_time_lbl()
-            self._timer_id = self.after(1000, self._tick)
-
-    def _update_time_lbl(self):
-        m, s = divmod(self.remaining, 60)
-        self.time_lbl.config(text=f"{m:02d}:{s:02d}")
+    def _build_program(self):
+        return IntervalProgram(pomodoro(self.work_min.get() * 60, self.break_min.get() * 60, self.cycles.get()))
 
-    def _phase_change(self):
-        try:
-            self.bell()
-        except Exception:
-            pass
-        phase = "Trabajo" if self.is_work else "Descanso"
-        notify("Timer", f"Fin de {phase}")
-        play_sound("end")
-        if self.is_work:
-            self.completed_cycles += 1
-            if self.completed_cycles >= self.cycles.get():
-                self.running = False
-                self.status_lbl.config(text=f"Ciclos completados: {self.completed_cycles}")
-                return
-            self.is_work = False
-            self.remaining = self.break_min.get() * 60
-            self.status_lbl.config(text=f"Descanso #{self.completed_cycles}")
-            play_sound("start")
+    def _on_start(self, fresh):
+        if fresh:
+            self._recorder.begin(self.program.current)
+            self.status_lbl.config(text="Trabajo #1")
         else:
-            self.is_work = True
-            self.remaining = self.work_min.get() * 60
-            self.status_lbl.config(text=f"Trabajo #{self.completed_cycles+1}")
-            play_sound("start")
-        self._update_time_lbl()
-        self._timer_id = self.after(1000, self._tick)
+            self._recorder.resume()
+        play_sound("start")
 
-    def start(self):
-        if self.running:
+    def _on_phase_end(self, phase, nxt):
+        record = self._recorder.end()
+        if record is not None:
+            self._writer.submit(record)
+        if nxt is not None:
+            self._recorder.begin(nxt, at=record.ended_at if record is not None else None)
+        self._bell()
+        notify("Timer", f"Fin de {'Trabajo' if phase.name == WORK else 'Descanso'}")
+        play_sound("end")
+        if nxt is None:
+            self.status_lbl.config(text=f"Ciclos completados: {phase.number}")
             return
-        if self.remaining <= 0:
-            self.is_work = True
-            self.completed_cycles = 0
-            self.remaining = self.work_min.get() * 60
-            self.status_lbl.config(text="Trabajo #1")
-            play_sound("start")
-            self._update_time_lbl()
-        self.running = True
+        if nxt.name == REST:
+            self.status_lbl.config(text=f"Descanso #{nxt.number}")
+        else:
+            self.status_lbl.config(text=f"Trabajo #{nxt.number}")
         play_sound("start")
-        self._tick()
 
     def pause(self):
-        self.running = False
-        if self._timer_id:
-            self.after_cancel(self._timer_id)
-            self._timer_id = None
-        self.status_lbl.config(text="Pausado")
+        if self.running:
+            self._recorder.pause()
+        super().pause()
 
     def reset(self):
-        self.pause()
-        self.remaining = 0
-        self.completed_cycles = 0
-        self.is_work = True
-        self._update_time_lbl()
-        self.status_lbl.config(text="Listo")
+        self._interrupt()
+        super().reset()
+
+    def _interrupt(self):
+        """Record the phase in progress, if any, as interrupted."""
+        if self.program is not None and not self.program.finished:
+            record = self._recorder.end(self.program.remaining(), interrupted=True)
+            if record is not None:
+                self._writer.submit(record)
 
+    def shutdown(self, timeout: float = 2.0):
+        self._interrupt()
+        self._writer.stop(timeout)
 
-class TabataTab(ttk.Frame):
+    def refresh_today(self):
+        try:
+            n, focus_sec = pomodoro_on(dt.date.today())
+        except Exception:
+            n, focus_sec = 0, 0
+        self.today_lbl.config(text=f"Hoy: {n} pomodoros / {round(focus_sec / 60)} min")
+
+
+class TabataTab(IntervalTab):
     def __init__(self, master):
         super().__init__(master)
         self.work_sec = tk.IntVar(value=20)
         self.rest_sec = tk.IntVar(value=10)
         self.rounds = tk.IntVar(value=8)
 
-        self.remaining = 0
-        self.is_work = True
-        self.running = False
-        self.current_round = 0
-        self._timer_id = None
+        self._total_rounds = 0
         self._session_start = None
 
         self._build_ui()
@@ -194,84 +294,44 @@ class TabataTab(ttk.Frame):
         self.work_sec.set(w); self.rest_sec.set(r); self.rounds.set(n)
         self.status_lbl.config(text=f"Preset {w}/{r}×{n}")
 
-    def _update_time_lbl(self):
-        m, s = divmod(self.remaining, 60)
-        self.time_lbl.config(text=f"{m:02d}:{s:02d}")
+    def _build_program(self):
+        self._total_rounds = self.rounds.get()
+        return IntervalProgram(tabata(self.work_sec.get(), self.rest_sec.get(), self._total_rounds))
 
-    def _tick(self):
-        if not self.running:
-            return
-        if self.remaining <= 0:
-            self._phase_change()
-        else:
-            self.remaining -= 1
-            self._update_time_lbl()
-            self._timer_id = self.after(1000, self._tick)
+    def _on_start(self, fresh):
+        if fresh:
+            self._session_start = dt.datetime.now().replace(second=0, microsecond=0)
+            self.status_lbl.config(text=f"Trabajo (ronda 1/{self._total_rounds})")
+        play_sound("start")
 
-    def _phase_change(self):
-        try:
-            self.bell()
-        except Exception:
-            pass
-        if self.is_work:
-            self.current_round += 1
-            notify("Tabata", f"Fin trabajo #{self.current_round}")
+    def _on_phase_end(self, phase, nxt):
+        self._bell()
+        if phase.name == WORK:
+            notify("Tabata", f"Fin trabajo #{phase.number}")
             play_sound("end")
-            if self.current_round >= self.rounds.get():
+            if nxt is None:
                 self._finish_session()
                 return
-            self.is_work = False
-            self.remaining = self.rest_sec.get()
-            self.status_lbl.config(text=f"Descanso (ronda {self.current_round}/{self.rounds.get()})")
+            self.status_lbl.config(text=f"Descanso (ronda {phase.number}/{self._total_rounds})")
         else:
             notify("Tabata", "Fin descanso")
             play_sound("end")
-            self.is_work = True
-            self.remaining = self.work_sec.get()
-            self.status_lbl.config(text=f"Trabajo (ronda {self.current_round+1}/{self.rounds.get()})")
-        self._update_time_lbl()
-        self._timer_id = self.after(1000, self._tick)
+            if nxt is None:
+                self._finish_session()
+                return
+            self.status_lbl.config(text=f"Trabajo (ronda {nxt.number}/{self._total_rounds})")
 
     def _finish_session(self):
-        self.running = False
-        self.remaining = 0
-        self._update_time_lbl()
-        self.status_lbl.config(text=f"¡Completado! {self.rounds.get()} rondas")
+        self.status_lbl.config(text=f"¡Completado! {self._total_rounds} rondas")
         notify("Tabata", "Sesión completada 🎉")
         play_sound("alert")
         start = self._session_start or dt.datetime.now().replace(second=0, microsecond=0)
-        add_tabata_session(start, self.rounds.get(), self.work_sec.get(), self.rest_sec.get(), True)
+        add_tabata_session(start, self._total_rounds, self.work_sec.get(), self.rest_sec.get(), True)
         self.refresh_today_count()
 
-    def start(self):
-        if self.running:
-            return
-        if self.remaining <= 0:
-            self.is_work = True
-            self.current_round = 0
-            self.remaining = self.work_sec.get()
-            self._session_start = dt.datetime.now().replace(second=0, microsecond=0)
-            self.status_lbl.config(text=f"Trabajo (ronda 1/{self.rounds.get()})")
-            self._update_time_lbl()
-        self.running = True
-        play_sound("start")
-        self._tick()
-
-    def pause(self):
-        self.running = False
-        if self._timer_id:
-            self.after_cancel(self._timer_id)
-            self._timer_id = None
-        self.status_lbl.config(text="Pausado")
-
     def reset(self):
-        self.pause()
-        self.remaining = 0
-        self.is_work = True
-        self.current_round = 0
+        super().reset()
         self._session_start = None
-        self._update_time_lbl()
-        self.status_lbl.config(text="Listo")
 
     def refresh_today_count(self):
         try:
@@ -283,32 +343,84 @@ class TabataTab(ttk.Frame):
 
 class AgendaTab(ttk.Frame):
 
+    # Google calls run off the Tk thread, one at a time: the cached API
+    # clients are not thread-safe and overlapping syncs would push the same
+    # tasks twice. Results come back through _google_results, which
+    # _poll_changes drains on the Tk thread.
+    def _run_google(self, title: str, job, failure):
+        if self._google_busy:
+            messagebox.showinfo(title, "Ya hay una operación con Google en curso.")
+            return
+        self._google_busy = True
+        def work():
+            try:
+                result = (messagebox.showinfo, job())
+            except Exception as e:
+                result = (messagebox.showerror, failure(e))
+            self._google_results.put((title, *result))
+        threading.Thread(target=work, daemon=True, name="google-sync").start()
+
+    def _show_google_results(self):
+        while True:
+            try:
+                title, show, msg = self._google_results.get_nowait()
+            except queue.Empty:
+                return
+            self._google_busy = False
+            show(title, msg)
+
     def export_to_google(self):
-        tid = self._selected_task_id()
-        if tid is None:
+        sel = self.tree.selection()
+        if not sel:
             messagebox.showinfo("Exportar a Google", "Selecciona una tarea de la lista.")
             return
-        from .storage import get_task
-        t = get_task(tid)
-        if not t:
-            return
-        try:
-            ids = export_local_task_to_google(t.title, t.scheduled_at, notes=t.description)
-            ok_msg = "Exportado:\n"
-            if "task_id" in ids: ok_msg += f"- Google Tasks: {ids['task_id']}\n"
-            if "event_id" in ids: ok_msg += f"- Calendar: {ids['event_id']}\n"
-            if "task_error" in ids or "event_error" in ids:
-                ok_msg += "\n(Con errores)\n"
-                if "task_error" in ids: ok_msg += f"Tasks error: {ids['task_error']}\n"
-                if "event_error" in ids: ok_msg += f"Calendar error: {ids['event_error']}\n"
-            messagebox.showinfo("Exportar a Google", ok_msg)
-        except Exception as e:
-            messagebox.showerror("Exportar a Google", f"No se pudo exportar: {e}\nColoca credentials.json en la carpeta app/ y vuelve a intentar.")
+        tasks = get_tasks(int(i) for i in sel)
+        def job():
+            # Exported tasks are linked like synced ones, so exporting again
+            # (or syncing later) updates them instead of creating copies.
+            from .integrations.sync_engine import export_tasks_to_google
+            errors = [e for e in export_tasks_to_google(tasks) if e is not None]
+            msg = f"Exportadas {len(tasks) - len(errors)} de {len(tasks)} tareas a Google Tasks y Calendar.\n"
+            if errors:
+                msg += f"\n(Con errores)\n{errors[0]}\n"
+            return msg
+        self._run_google("Exportar a Google", job, lambda e: f"No se pudo exportar: {e}\nColoca credentials.json en la carpeta app/ y vuelve a intentar.")
+
+    def sync_google(self):
+        # Storage changes reach the tree through the usual change listener.
+        def job():
+            from .integrations.sync_engine import sync_with_google
+            r = sync_with_google()
+            return (f"Recibidas: {r['pulled']}  Enviadas: {r['pushed']}\n"
+                    f"Borradas aquí: {r['deleted_local']}  Borradas en Google: {r['deleted_remote']}")
+        self._run_google("Sincronizar con Google", job, lambda e: f"No se pudo sincronizar: {e}")
+
+    PAGE_SIZE = 200
+    CHANGES_POLL_MS = 250
+    FRAME_MS = 16
+    SEARCH_DEBOUNCE_MS = 200
+    SEARCH_LIMIT = 200
+    WEEK_LIMIT = 2000  # occurrences shown per week; the rest is summarised
 
     def __init__(self, master):
         super().__init__(master)
+        # Rows currently in the tree: the first len(_order) tasks in
+        # (scheduled_at, id) order. More pages load as the list is scrolled.
+        self._order: list = []   # sorted [(key, iid)]
+        self._keys: dict = {}    # iid -> key
+        self._values: dict = {}  # iid -> row values
+        self._exhausted = False
+        self._loading = False
+        self._pages = None  # storage.iter_task_columns generator feeding _load_more
+        self._searching = False
+        self._search_after = None
+        self.changes = ChangeBus()
+        self._google_busy = False
+        self._google_results = queue.SimpleQueue()  # (title, messagebox function, message)
         self._build_ui()
         self.refresh()
+        subscribe(self.changes.publish)
+        self.after(self.CHANGES_POLL_MS, self._poll_changes)
 
     def _build_ui(self):
         frm = ttk.LabelFrame(self, text="Nueva tarea / recordatorio")
@@ -331,24 +443,13 @@ class AgendaTab(ttk.Frame):
         ttk.Entry(grid, textvariable=self.desc_var, width=40).grid(row=0, column=3, sticky="w", padx=5)
 
         ttk.Label(grid, text="Fecha").grid(row=1, column=0, sticky="w", pady=(6,0))
-        today = dt.date.today()
-        if DateEntry is None:
+        if not HAS_TKCALENDAR:
             self.date_entry = ttk.Entry(grid, textvariable=self.date_var, width=16)
         else:
-            if WINDOWING_SYSTEM == "aqua":
-                # macOS (Aqua) tiene problemas con el popup nativo de tkcalendar
-                self.date_entry = ttk.Entry(grid, textvariable=self.date_var, width=16, state="readonly")
-                self.date_entry.bind("<Button-1>", self._open_mac_calendar)
-            else:
-                self.date_entry = DateEntry(
-                    grid,
-                    textvariable=self.date_var,
-                    date_pattern="yyyy-mm-dd",
-                    width=16,
-                    showweeknumbers=False,
-                    state="readonly",
-                    mindate=today,
-                )
+            # Popup calendar built on first click (also avoids the native
+            # DateEntry popup, which misbehaves on macOS/Aqua)
+            self.date_entry = ttk.Entry(grid, textvariable=self.date_var, width=16, state="readonly")
+            self.date_entry.bind("<Button-1>", self._open_calendar)
         self.date_entry.grid(row=1, column=1, sticky="w", padx=5, pady=(6,0))
         ttk.Label(grid, text="Hora (HH:MM)").grid(row=1, column=2, sticky="w", pady=(6,0))
         self.time_entry = ttk.Entry(grid, textvariable=self.time_var, width=10, state="readonly")
@@ -356,7 +457,7 @@ class AgendaTab(ttk.Frame):
         self.time_entry.bind("<Button-1>", self._open_time_picker)
 
         ttk.Label(grid, text="Repetir").grid(row=2, column=0, sticky="w", pady=(6,0))
-        cb = ttk.Combobox(grid, textvariable=self.repeat_var, values=["none","daily","weekly","weekdays"], width=12, state="readonly")
+        cb = ttk.Combobox(grid, textvariable=self.repeat_var, values=["none","daily","weekly","weekdays","monthly"], width=12, state="readonly")
         cb.grid(row=2, column=1, sticky="w", padx=5, pady=(6,0))
 
         btns = ttk.Frame(frm)
@@ -369,6 +470,13 @@ class AgendaTab(ttk.Frame):
         tbl_frame = ttk.LabelFrame(self, text="Tareas programadas")
         tbl_frame.pack(fill="both", expand=True, padx=5, pady=5)
 
+        search = ttk.Frame(tbl_frame)
+        search.pack(fill="x", side="top", pady=(0, 4))
+        ttk.Label(search, text="Buscar").pack(side="left")
+        self.search_var = tk.StringVar()
+        ttk.Entry(search, textvariable=self.search_var, width=40).pack(side="left", padx=5)
+        self.search_var.trace_add("write", self._on_search_typed)
+
         self.tree = ttk.Treeview(tbl_frame, columns=("when","title","repeat","enabled"), show="headings", height=10)
         self.tree.heading("when", text="Cuándo")
         self.tree.heading("title", text="Título")
@@ -377,7 +485,8 @@ class AgendaTab(ttk.Frame):
         self.tree.pack(fill="both", expand=True, side="left")
 
         vsb = ttk.Scrollbar(tbl_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=vsb.set)
+        self._vsb = vsb
+        self.tree.configure(yscroll=self._on_tree_scroll)
         vsb.pack(side="right", fill="y")
 
         actions = ttk.Frame(self)
@@ -385,12 +494,16 @@ class AgendaTab(ttk.Frame):
         ttk.Button(actions, text="Activar/Desactivar", command=self.toggle_task).pack(side="left", padx=2)
         ttk.Button(actions, text="Eliminar", command=self.delete_task).pack(side="left", padx=2)
         ttk.Button(actions, text="Refrescar", command=self.refresh).pack(side="left", padx=2)
+        ttk.Button(actions, text="Semana", command=self.open_week_view).pack(side="left", padx=2)
         ttk.Button(actions, text="Exportar a Google", command=self.export_to_google).pack(side="left", padx=8)
+        ttk.Button(actions, text="Sincronizar", command=self.sync_google).pack(side="left", padx=2)
+        ttk.Button(actions, text="Importar…", command=self.import_tasks).pack(side="left", padx=2)
+        ttk.Button(actions, text="Exportar…", command=self.export_tasks).pack(side="left", padx=2)
 
-    def _open_mac_calendar(self, _event=None):
-        if Calendar is None:
-            # Si tkcalendar no está disponible, no podemos mostrar popup personalizado
+    def _open_calendar(self, _event=None):
+        if not HAS_TKCALENDAR:
             return
+        from tkcalendar import Calendar
         self._close_calendar_popup()
 
         top = tk.Toplevel(self)
@@ -426,7 +539,7 @@ class AgendaTab(ttk.Frame):
         self._calendar_popup = top
         top.focus_set()
 
-    def _on_calendar_selected(self, cal: Calendar):
+    def _on_calendar_selected(self, cal):
         value = cal.get_date()
         self.date_var.set(value)
         self._close_calendar_popup()
@@ -519,11 +632,6 @@ class AgendaTab(ttk.Frame):
         t = now() + dt.timedelta(minutes=minutes)
         self.date_var.set(t.strftime("%Y-%m-%d"))
         self.time_var.set(t.strftime("%H:%M"))
-        if DateEntry is not None:
-            try:
-                self.date_entry.set_date(t.date())
-            except Exception:
-                pass
 
     def add_task(self):
         title = self.title_var.get().strip()
@@ -539,13 +647,225 @@ class AgendaTab(ttk.Frame):
         add_task(t)
         notify("Tarea creada", f"{title} → {when.strftime('%Y-%m-%d %H:%M')}")
         self.title_var.set(""); self.desc_var.set(""); self.date_var.set(""); self.time_var.set("")
-        self.refresh()
+        self._apply_changes()
+
+    _FILE_TYPES = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("iCalendar", "*.ics")]
+
+    def import_tasks(self):
+        path = filedialog.askopenfilename(title="Importar tareas", filetypes=self._FILE_TYPES)
+        if not path:
+            return
+        try:
+            read, inserted = transfer.import_file(path)
+        except Exception as e:
+            messagebox.showerror("Importar", f"No se pudo importar: {e}")
+            return
+        messagebox.showinfo("Importar", f"{inserted} tareas importadas ({read - inserted} duplicadas omitidas).")
+        self._apply_changes()
+
+    def export_tasks(self):
+        path = filedialog.asksaveasfilename(title="Exportar tareas", defaultextension=".csv", filetypes=self._FILE_TYPES)
+        if not path:
+            return
+        try:
+            n = transfer.export_file(path)
+        except Exception as e:
+            messagebox.showerror("Exportar", f"No se pudo exportar: {e}")
+            return
+        messagebox.showinfo("Exportar", f"{n} tareas exportadas.")
+
+    # Row keys are (stored ISO scheduled_at, id), the storage sort order, so
+    # pages read with list_task_columns need no datetime decoding at all.
+    @staticmethod
+    def _row_key(t: Task) -> tuple:
+        return (t.scheduled_at.isoformat(timespec="minutes"), t.id)
+
+    @staticmethod
+    def _row_values(t: Task) -> tuple:
+        return (t.scheduled_at.strftime("%Y-%m-%d %H:%M"), t.title, t.repeat, "Sí" if t.enabled else "No")
+
+    @staticmethod
+    def _column_rows(cols: TaskColumns) -> list:
+        """(iid, key, values) for every row of a column read."""
+        yes_no = ("No", "Sí")
+        return [(str(i), (at, i), (at.replace("T", " "), title, repeat, yes_no[enabled]))
+                for i, at, title, repeat, enabled in zip(cols.id, cols.scheduled_at, cols.title, cols.repeat, cols.enabled)]
+
+    # --- Week view ---
+    # Recurring tasks are expanded into their concrete occurrences by
+    # storage.iter_occurrences, one parent row per day.
+    def open_week_view(self):
+        top = tk.Toplevel(self)
+        top.title("Semana")
+        top.geometry("420x480")
+        monday = dt.date.today() - dt.timedelta(days=dt.date.today().weekday())
+        state = {"start": dt.datetime.combine(monday, dt.time())}
+
+        nav = ttk.Frame(top)
+        nav.pack(fill="x", padx=5, pady=5)
+        label = ttk.Label(nav, anchor="center")
+        tree = ttk.Treeview(top, show="tree")
+        tree.pack(fill="both", expand=True, padx=5, pady=(0, 5))
+
+        def show(weeks=0):
+            start = state["start"] = state["start"] + dt.timedelta(weeks=weeks)
+            end = start + dt.timedelta(days=7)
+            label.configure(text=f"{start:%Y-%m-%d} – {end - dt.timedelta(days=1):%Y-%m-%d}")
+            tree.delete(*tree.get_children())
+            days = {}
+            for d in range(7):
+                day = (start + dt.timedelta(days=d)).date()
+                days[day] = tree.insert("", "end", text=day.strftime("%a %d/%m"), open=True)
+            for n, (at, task) in enumerate(iter_occurrences(start, end), 1):
+                if n > self.WEEK_LIMIT:
+                    tree.insert("", "end", text=f"(más de {self.WEEK_LIMIT} recordatorios; se muestran los primeros)")
+                    break
+                tree.insert(days[at.date()], "end", text=f"{at:%H:%M}  {task.title}")
+
+        ttk.Button(nav, text="◀", width=3, command=lambda: show(-1)).pack(side="left")
+        ttk.Button(nav, text="▶", width=3, command=lambda: show(1)).pack(side="right")
+        label.pack(side="left", fill="x", expand=True)
+        show()
+
+    # --- Search ---
+    # While the search box has text the tree shows the best search_tasks()
+    # matches in rank order instead of the paged schedule; any change re-runs
+    # the query.
+    def _on_search_typed(self, *_):
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(self.SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _clear_tree(self):
+        self.tree.delete(*self.tree.get_children())
+        self._order, self._keys, self._values = [], {}, {}
+        self._pages = None
+
+    def _run_search(self):
+        self._search_after = None
+        query = self.search_var.get().strip()
+        if not query:
+            if self._searching:
+                self._searching = False
+                self._clear_tree()
+                self.refresh()
+            return
+        self._searching = True
+        self._exhausted = True
+        self._clear_tree()
+        for t in search_tasks(query, self.SEARCH_LIMIT):
+            iid, key, values = str(t.id), self._row_key(t), self._row_values(t)
+            self.tree.insert("", "end", iid=iid, values=values)
+            self._keys[iid], self._values[iid] = key, values
 
     def refresh(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        for t in list_tasks():
-            self.tree.insert("", "end", iid=str(t.id), values=(t.scheduled_at.strftime("%Y-%m-%d %H:%M"), t.title, t.repeat, "Sí" if t.enabled else "No"))
+        """Re-read the loaded window and patch only the rows that changed."""
+        if self._searching:
+            self._run_search()
+            return
+        limit = max(self.PAGE_SIZE, len(self._order))
+        rows = self._column_rows(list_task_columns(None, limit))
+        self._exhausted = len(rows) < limit
+        wanted = {iid for iid, _, _ in rows}
+        stale = [iid for iid in self._keys if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self._keys[iid], self._values[iid]
+        for index, (iid, key, values) in enumerate(rows):
+            if iid not in self._values:
+                self.tree.insert("", index, iid=iid, values=values)
+            elif self._values[iid] != values:
+                self.tree.item(iid, values=values)
+            self._keys[iid], self._values[iid] = key, values
+        order = [(key, iid) for iid, key, _ in rows]
+        if [iid for _, iid in order] != list(self.tree.get_children()):
+            for index, (_, iid) in enumerate(order):
+                self.tree.move(iid, "", index)
+        self._order = order
+        self._pages = None  # continue lazily after the new last row
+
+    def _load_more(self):
+        self._loading = False
+        if self._exhausted:
+            return
+        if self._pages is None:
+            after = self._order[-1][0] if self._order else None
+            self._pages = iter_task_columns(after, page_size=self.PAGE_SIZE)
+        page = next(self._pages, None)
+        rows = self._column_rows(page) if page is not None else []
+        self._exhausted = len(rows) < self.PAGE_SIZE
+        for iid, key, values in rows:
+            if iid in self._keys:
+                continue
+            self.tree.insert("", "end", iid=iid, values=values)
+            self._order.append((key, iid))
+            self._keys[iid], self._values[iid] = key, values
+
+    def _on_tree_scroll(self, first, last):
+        self._vsb.set(first, last)
+        if float(last) > 0.9 and not self._exhausted and not self._loading:
+            self._loading = True
+            self.after_idle(self._load_more)
+
+    def _remove_row(self, iid: str):
+        key = self._keys.pop(iid, None)
+        if key is None:
+            return
+        del self._values[iid]
+        self._order.pop(bisect.bisect_left(self._order, (key, iid)))
+        self.tree.delete(iid)
+
+    def _place_row(self, t: Task):
+        """Insert, update or move one task's row, keeping the window contiguous."""
+        iid, key, values = str(t.id), self._row_key(t), self._row_values(t)
+        if self._keys.get(iid) == key:
+            if self._values[iid] != values:
+                self.tree.item(iid, values=values)
+                self._values[iid] = values
+            return
+        self._remove_row(iid)
+        if not self._exhausted and self._order and key > self._order[-1][0]:
+            return  # beyond the loaded window; it shows up when scrolled to
+        index = bisect.bisect_left(self._order, (key, iid))
+        self._order.insert(index, (key, iid))
+        self._keys[iid], self._values[iid] = key, values
+        self.tree.insert("", index, iid=iid, values=values)
+
+    # Storage changes arrive on whichever thread wrote (e.g. the Scheduler)
+    # through self.changes; Tk is only touched from _poll_changes on the main
+    # thread, which applies everything since the last poll as one update.
+    # Polling speeds up to FRAME_MS while changes keep coming.
+    def _apply_changes(self) -> bool:
+        changes = self.changes.drain()
+        if not changes:
+            return False
+        if self._searching:
+            self._run_search()
+        elif changes.reload:
+            self.refresh()
+        else:
+            live = changes.inserted | changes.updated
+            found = {t.id: t for t in get_tasks(live)} if live else {}
+            for task_id in live | changes.deleted:
+                if task_id in found:
+                    self._place_row(found[task_id])
+                else:
+                    self._remove_row(str(task_id))
+        return True
+
+    def _poll_changes(self):
+        busy = False
+        self._show_google_results()
+        try:
+            busy = self._apply_changes()
+        except Exception as e:
+            print("[agenda] refresh error:", e)
+        self.after(self.FRAME_MS if busy else self.CHANGES_POLL_MS, self._poll_changes)
+
+    def destroy(self):
+        unsubscribe(self.changes.publish)
+        super().destroy()
 
     def _selected_task_id(self):
         sel = self.tree.selection()
@@ -562,7 +882,7 @@ class AgendaTab(ttk.Frame):
             return
         t.enabled = not t.enabled
         update_task(t)
-        self.refresh()
+        self._apply_changes()
 
     def delete_task(self):
         tid = self._selected_task_id()
@@ -570,7 +890,7 @@ class AgendaTab(ttk.Frame):
             return
         if messagebox.askyesno("Confirmar", "¿Eliminar tarea?"):
             delete_task(tid)
-            self.refresh()
+            self._apply_changes()
 
 
 class App(tk.Tk):
@@ -588,7 +908,7 @@ class App(tk.Tk):
             global WINDOWING_SYSTEM
             windowing = self.tk.call("tk", "windowingsystem")
             WINDOWING_SYSTEM = windowing
-            if windowing == "aqua" and DateEntry is not None:
+            if windowing == "aqua" and HAS_TKCALENDAR:
                 style.theme_use("clam")
             elif windowing == "aqua":
                 style.theme_use("aqua")
@@ -608,21 +928,112 @@ class App(tk.Tk):
         nb.add(self.tabata_tab, text="Tabata")
         nb.add(self.agenda_tab, text="Agenda")
 
-        self.scheduler = Scheduler(poll_seconds=20)
+        preload_sounds()
+        self.scheduler = None
+        self.daemon = None
+        self._stop_watch = None
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._attach_daemon() or self._start_scheduler()
+
+    def _start_scheduler(self):
+        self.scheduler = EventScheduler()
         self.scheduler.start()
 
+    def _attach_daemon(self) -> bool:
+        """
+        Use a running `python -m app.daemon` for reminders instead of a local
+        scheduler: local writes are reported to it, its changes (e.g. fired
+        reminders) reach the Agenda tree. Falls back to a local scheduler if
+        the daemon goes away.
+        """
+        from .daemon import connect_daemon
+        client = connect_daemon()
+        if client is None:
+            return False
+        # The watch thread only sets _daemon_lost; _poll_daemon acts on it
+        # from the Tk thread.
+        self._daemon_lost = threading.Event()
+        try:
+            self._stop_watch = client.watch(self.agenda_tab.changes.publish, on_close=self._daemon_lost.set)
+        except Exception as e:
+            print("[app] could not attach to daemon:", e)
+            return False
+        self.daemon = client
+        subscribe(self._forward_to_daemon)
+        self.after(self.DAEMON_POLL_MS, self._poll_daemon)
+        return True
+
+    DAEMON_POLL_MS = 500
+
+    def _poll_daemon(self):
+        if self._daemon_lost.is_set():
+            self._on_daemon_lost()
+        else:
+            self.after(self.DAEMON_POLL_MS, self._poll_daemon)
+
+    def _forward_to_daemon(self, kind, task_id):
+        self.daemon.post("changed", kind=kind, id=task_id)
+
+    def _on_daemon_lost(self):
+        print("[app] daemon disconnected; running reminders locally")
+        unsubscribe(self._forward_to_daemon)
+        self.daemon = self._stop_watch = None
+        self._start_scheduler()
+
+    SHUTDOWN_TIMEOUT = 2.0  # seconds to wait for each background thread
+
     def on_close(self):
         try:
-            self.scheduler.stop()
+            if self._stop_watch is not None:
+                unsubscribe(self._forward_to_daemon)
+                self._stop_watch()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+                self.scheduler.join(self.SHUTDOWN_TIMEOUT)
         except Exception:
             pass
+        self.timer_tab.shutdown(self.SHUTDOWN_TIMEOUT)
+        shutdown_notifications()
+        # Only close the pooled connections once the threads using them are done.
+        close_all()
         self.destroy()
 
 
-def main():
-    app = App()
-    app.mainloop()
+def _option(argv, name: str):
+    """Value of `--name VALUE` or `--name=VALUE` in argv, else None."""
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--profile-startup" in argv:
+        from .profiling import startup_report
+        print(startup_report())
+        return
+    # --metrics-file PATH writes a JSON snapshot every 10 s; --metrics-port N
+    # serves Prometheus text on 127.0.0.1:N. Either one turns metrics on.
+    metrics_file, metrics_port = _option(argv, "--metrics-file"), _option(argv, "--metrics-port")
+    writer = server = None
+    if metrics_file or metrics_port:
+        metrics.enable()
+    if metrics_file:
+        writer = metrics.SnapshotWriter(metrics_file)
+        writer.start()
+    if metrics_port:
+        server = metrics.serve_prometheus(int(metrics_port))
+    try:
+        app = App()
+        app.mainloop()
+    finally:
+        if writer is not None:
+            writer.stop()
+        if server is not None:
+            server.shutdown()
 
 
 if __name__ == "__main__":
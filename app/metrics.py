@@ -0,0 +1,213 @@
+"""
+Hot-path metrics: counters and fixed-bucket histograms kept in process.
+
+Disabled by default; while disabled every helper returns after a single
+global check. Enable with enable(), then expose the registry as a JSON
+snapshot file (SnapshotWriter) and/or Prometheus text over a local HTTP
+socket (serve_prometheus).
+"""
+from __future__ import annotations
+import bisect, functools, json, os, pathlib, threading, time
+from typing import Dict, Optional, Tuple
+
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+LAG_BUCKETS_S = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+ENABLED = False
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_histograms: Dict[str, "Histogram"] = {}
+
+class Histogram:
+    """Bucketed histogram: counts[i] is the number of values in (buckets[i-1],
+    buckets[i]], the last slot those above every bucket. The Prometheus
+    output sums them into cumulative `le` buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count, "sum": self.sum, "max": self.max,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def inc(name: str, n: float = 1) -> None:
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS) -> None:
+    if not ENABLED:
+        return
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram(buckets)
+        h.observe(value)
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name: str):
+    """`with timer("x_ms"):` records the block's duration in milliseconds."""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+def timed(name: str):
+    """Decorator: call duration histogram `name` (ms) plus an `<name>.errors` counter."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                inc(name + ".errors")
+                raise
+            finally:
+                observe(name, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return deco
+
+# -------------------- Exposition --------------------
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "time": time.time(),
+            "counters": dict(_counters),
+            "histograms": {k: h.as_dict() for k, h in _histograms.items()},
+        }
+
+def _prom_name(name: str) -> str:
+    return "pt_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus_text() -> str:
+    """The registry in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            n = _prom_name(name) + "_total"
+            lines += [f"# TYPE {n} counter", f"{n} {value}"]
+        for name, h in sorted(_histograms.items()):
+            n = _prom_name(name)
+            lines.append(f"# TYPE {n} histogram")
+            seen = 0
+            for bound, c in zip(h.buckets, h.counts):
+                seen += c
+                lines.append(f'{n}_bucket{{le="{bound}"}} {seen}')
+            lines += [f'{n}_bucket{{le="+Inf"}} {h.count}', f"{n}_sum {h.sum}", f"{n}_count {h.count}"]
+    return "\n".join(lines) + "\n"
+
+def write_snapshot(path) -> None:
+    """Atomically replace `path` with the current snapshot as JSON."""
+    path = pathlib.Path(path)
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(snapshot(), indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+class SnapshotWriter(threading.Thread):
+    """Writes the snapshot to `path` every `interval` seconds, and once more on stop()."""
+
+    def __init__(self, path, interval: float = 10.0):
+        super().__init__(daemon=True, name="metrics-snapshot")
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        self._stop_event.set()
+        self.join(timeout)
+
+    def run(self):
+        while True:
+            stopping = self._stop_event.wait(self.interval)
+            try:
+                write_snapshot(self.path)
+            except OSError as e:
+                print("[metrics] snapshot error:", e)
+            if stopping:
+                return
+
+def serve_prometheus(port: int = 9464, host: str = "127.0.0.1"):
+    """
+    Serve prometheus_text() over HTTP on `host:port` from a daemon thread.
+    Returns the server; call shutdown() on it to stop. Port 0 picks a free one
+    (see server.server_address).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
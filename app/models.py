@@ -1,29 +1,110 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from collections.abc import Sequence
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
 import datetime as dt
+from .recurrence import EPOCH, parse_rule, next_after
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: Optional[int]
     title: str
     description: str
     scheduled_at: dt.datetime
-    repeat: str  # 'none' | 'daily' | 'weekly' | 'weekdays'
+    repeat: str  # 'none' | 'daily' | 'weekly' | 'weekdays' | 'monthly' | RRULE subset (see recurrence.parse_rule)
     enabled: bool = True
     last_fired_at: Optional[dt.datetime] = None
 
-    def next_occurrence(self) -> dt.datetime | None:
-        if self.repeat == "none":
+    def next_occurrence(self, after: Optional[dt.datetime] = None) -> dt.datetime | None:
+        """First occurrence strictly after `after` (defaults to scheduled_at)."""
+        rule = parse_rule(self.repeat)
+        if rule is None:
             return None
-        d = self.scheduled_at
-        if self.repeat == "daily":
-            return d + dt.timedelta(days=1)
-        if self.repeat == "weekly":
-            return d + dt.timedelta(weeks=1)
-        if self.repeat == "weekdays":
-            d = d + dt.timedelta(days=1)
-            while d.weekday() >= 5:
-                d += dt.timedelta(days=1)
-            return d
-        return None
+        return next_after(rule, self.scheduled_at, after or self.scheduled_at)
+
+class TaskColumns:
+    """
+    Column-oriented bulk read: one tuple per column instead of one Task per
+    row. scheduled_at keeps the stored ISO strings ("YYYY-MM-DDTHH:MM") and
+    enabled the stored 0/1, so nothing is decoded until a row is asked for.
+    last_fired_at is not read.
+    """
+    __slots__ = ("id", "title", "description", "scheduled_at", "repeat", "enabled")
+    COLUMNS = __slots__
+
+    def __init__(self, rows: Sequence[tuple]):
+        cols = tuple(zip(*rows)) if rows else ((),) * len(self.COLUMNS)
+        self.id, self.title, self.description, self.scheduled_at, self.repeat, self.enabled = cols
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def task(self, i: int) -> Task:
+        return Task(self.id[i], self.title[i], self.description[i] or "", dt.datetime.fromisoformat(self.scheduled_at[i]), self.repeat[i], bool(self.enabled[i]))
+
+    def tasks(self) -> Iterator[Task]:
+        return (self.task(i) for i in range(len(self)))
+
+class Occurrence(NamedTuple):
+    """One concrete firing of a task; `task` is shared by all its occurrences."""
+    at: dt.datetime
+    task: Task
+
+class OccurrenceList(Sequence):
+    """
+    Occurrences in time order, stored as packed ints (minute since
+    recurrence.EPOCH << ID_BITS | task id) plus the tasks by id. Occurrence
+    objects are only built for the items actually read; tasks missing from
+    `tasks` are fetched with load(ids) a chunk of keys at a time.
+    """
+    __slots__ = ("keys", "tasks", "load")
+    ID_BITS = 32
+    CHUNK = 512
+
+    def __init__(self, keys: list, tasks: dict, load: Optional[Callable[[set], Iterable[Task]]] = None):
+        self.keys = keys
+        self.tasks = tasks
+        self.load = load
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _fill(self, keys: list) -> None:
+        tasks = self.tasks
+        missing = {i for i in {k & _ID_MASK for k in keys} if i not in tasks}
+        if missing and self.load is not None:
+            self.tasks.update((t.id, t) for t in self.load(missing))
+
+    def _decode(self, key: int) -> Occurrence:
+        return Occurrence(EPOCH + dt.timedelta(minutes=key >> self.ID_BITS), self.tasks[key & _ID_MASK])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return OccurrenceList(self.keys[i], self.tasks, self.load)
+        self._fill([self.keys[i]])
+        return self._decode(self.keys[i])
+
+    def __iter__(self) -> Iterator[Occurrence]:
+        tasks, bits, make, minute, at = self.tasks, self.ID_BITS, Occurrence._make, None, None
+        for i in range(0, len(self.keys), self.CHUNK):
+            chunk = self.keys[i:i + self.CHUNK]
+            self._fill(chunk)
+            for key in chunk:
+                if key >> bits != minute:  # keys are sorted: reuse the datetime within a minute
+                    minute = key >> bits
+                    at = EPOCH + dt.timedelta(minutes=minute)
+                yield make((at, tasks[key & _ID_MASK]))
+
+_ID_MASK = (1 << OccurrenceList.ID_BITS) - 1
+
+@dataclass(slots=True)
+class FocusPhase:
+    """One work or break phase of a Pomodoro run, as it actually went."""
+    started_at: dt.datetime
+    ended_at: dt.datetime
+    kind: str             # timer_engine.WORK | REST
+    number: int           # 1-based cycle
+    planned_sec: int
+    actual_sec: float     # time counted down, pauses excluded
+    paused_sec: float = 0.0
+    interrupted: bool = False  # reset before the phase ran out
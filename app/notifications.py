@@ -1,8 +1,167 @@
 from __future__ import annotations
-from plyer import notification
+import queue, threading, time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from . import metrics
 
-def notify(title: str, message: str, timeout: int = 8) -> None:
-    try:
-        notification.notify(title=title, message=message, timeout=timeout)
-    except Exception as e:
-        print(f"[notify:fallback] {title}: {message} ({e})")
+# -------------------- Backends --------------------
+class PlyerBackend:
+    """Desktop notifications through plyer, imported on first use."""
+
+    def __init__(self):
+        self._notification = None
+
+    def deliver(self, title: str, message: str, timeout: int) -> None:
+        try:
+            if self._notification is None:
+                from plyer import notification
+                self._notification = notification
+            self._notification.notify(title=title, message=message, timeout=timeout)
+        except Exception as e:
+            print(f"[notify:fallback] {title}: {message} ({e})")
+
+class LogBackend:
+    def deliver(self, title: str, message: str, timeout: int) -> None:
+        print(f"[notify] {title}: {message}")
+
+class MemoryBackend:
+    """Keeps delivered (title, message) pairs in memory; used by tests."""
+
+    def __init__(self):
+        self.delivered: List[tuple] = []
+        self.event = threading.Event()
+
+    def deliver(self, title: str, message: str, timeout: int) -> None:
+        self.delivered.append((title, message))
+        self.event.set()
+
+# -------------------- Dispatcher --------------------
+@dataclass
+class Notification:
+    title: str
+    message: str
+    timeout: int = 8
+    source: str = ""
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+MAX_SUMMARY_LINES = 5
+
+def _merge(items: List[Notification]) -> tuple:
+    if len(items) == 1:
+        return items[0].title, items[0].message
+    lines = [n.message for n in items[:MAX_SUMMARY_LINES]]
+    if len(items) > MAX_SUMMARY_LINES:
+        lines.append(f"… y {len(items) - MAX_SUMMARY_LINES} más")
+    return f"{items[0].title} ({len(items)})", "\n".join(lines)
+
+class Dispatcher(threading.Thread):
+    """
+    Delivers notifications off the caller's thread. Notifications from the
+    same source arriving within `coalesce_window` seconds become a single
+    summary, and each source gets at most one delivery per `min_interval`
+    seconds; anything arriving in between is folded into the next one.
+    """
+
+    def __init__(self, backend=None, maxsize: int = 256, coalesce_window: float = 0.3, min_interval: float = 1.0):
+        super().__init__(daemon=True, name="notifications")
+        self.backend = backend if backend is not None else PlyerBackend()
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._pending: Dict[str, List[Notification]] = {}
+        self._next_allowed: Dict[str, float] = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "delivered": 0, "coalesced": 0, "dropped": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def submit(self, n: Notification) -> bool:
+        try:
+            self._queue.put_nowait(n)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._stats_lock:
+            self._stats["submitted"] += 1
+        return True
+
+    def stats(self) -> dict:
+        """Counters plus delivery latency (seconds from submit to backend call)."""
+        with self._stats_lock:
+            out = dict(self._stats)
+        out["latency_avg"] = out["latency_total"] / out["delivered"] if out["delivered"] else 0.0
+        return out
+
+    def stop(self, timeout: Optional[float] = 2.0):
+        """Deliver whatever is pending, ignoring rate limits, and exit."""
+        self._queue.put(None)
+        self.join(timeout)
+
+    def _ready_at(self, source: str) -> float:
+        first = self._pending[source][0].enqueued_at
+        return max(first + self.coalesce_window, self._next_allowed.get(source, 0.0))
+
+    def _deliver(self, source: str, now: float):
+        items = self._pending.pop(source)
+        title, message = _merge(items)
+        try:
+            with metrics.timer("notify.deliver_ms"):
+                self.backend.deliver(title, message, items[-1].timeout)
+        except Exception as e:
+            metrics.inc("notify.errors")
+            print("[notify] error:", e)
+        self._next_allowed[source] = now + self.min_interval
+        latency = time.monotonic() - items[0].enqueued_at
+        with self._stats_lock:
+            self._stats["delivered"] += 1
+            self._stats["coalesced"] += len(items) - 1
+            self._stats["latency_total"] += latency
+            self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+
+    def run(self):
+        while True:
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, min(self._ready_at(s) for s in self._pending) - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            if item is None:
+                for source in list(self._pending):
+                    self._deliver(source, time.monotonic())
+                return
+            if item:
+                self._pending.setdefault(item.source, []).append(item)
+            now = time.monotonic()
+            for source in [s for s in self._pending if self._ready_at(s) <= now]:
+                self._deliver(source, now)
+
+_dispatcher: Optional[Dispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> Dispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            _dispatcher = Dispatcher()
+            _dispatcher.start()
+        return _dispatcher
+
+def set_dispatcher(dispatcher: Optional[Dispatcher]) -> None:
+    """Replace the process-wide dispatcher (e.g. one with another backend)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        _dispatcher = dispatcher
+        if dispatcher is not None and not dispatcher.is_alive():
+            dispatcher.start()
+
+def shutdown() -> None:
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None and dispatcher.is_alive():
+        dispatcher.stop()
+
+def notify(title: str, message: str, timeout: int = 8, source: Optional[str] = None) -> None:
+    """Queue a notification; `source` (default: the title) groups coalescing and rate limits."""
+    get_dispatcher().submit(Notification(title, message, timeout, source or title))
@@ -0,0 +1,55 @@
+"""
+Startup import profiling.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+parses the per-module timings it prints to stderr.
+"""
+from __future__ import annotations
+import pathlib, re, subprocess, sys
+from dataclasses import dataclass
+from typing import List
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 = imported directly by the profiled statement
+
+def import_times(module: str = "app.main") -> List[ImportTiming]:
+    """Timings for `module` and everything it pulls in, in the order printed
+    (children before their parent); interpreter startup imports are dropped."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    block: List[ImportTiming] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        block.append(ImportTiming(m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+        if block[-1].depth == 0:
+            if block[-1].module == module:
+                return block
+            block = []
+    raise RuntimeError(f"no import timing for {module}")
+
+def total_us(timings: List[ImportTiming], module: str = "app.main") -> int:
+    """Cumulative import time of `module` itself (µs)."""
+    for t in timings:
+        if t.module == module and t.depth == 0:
+            return t.cumulative_us
+    raise KeyError(module)
+
+def startup_report(module: str = "app.main", top: int = 25) -> str:
+    timings = import_times(module)
+    lines = [f"import {module}: {total_us(timings, module) / 1000:.1f} ms", "", f"{'self ms':>9} {'cumul ms':>9}  module"]
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{t.self_us / 1000:9.1f} {t.cumulative_us / 1000:9.1f}  {'  ' * t.depth}{t.module}")
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+from __future__ import annotations
+import calendar, functools, datetime as dt
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+DAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Catch-up policies for occurrences missed while the app was not running:
+# fire once and jump past `now`, fire every missed occurrence, or jump past
+# `now` silently when the reminder is more than `grace` late.
+CATCH_UP_ONCE = "once"
+CATCH_UP_ALL = "all"
+CATCH_UP_SKIP = "skip"
+CATCH_UP_POLICIES = (CATCH_UP_ONCE, CATCH_UP_ALL, CATCH_UP_SKIP)
+
+@dataclass(frozen=True)
+class Rule:
+    freq: str  # 'daily' | 'weekly' | 'monthly'
+    interval: int = 1
+    byday: Tuple[int, ...] = ()  # weekday numbers, 0=Monday
+    bymonthday: Optional[int] = None  # 1..31, or negative counting from month end
+
+KEYWORDS = {
+    "daily": Rule("daily"),
+    "weekly": Rule("weekly"),
+    "weekdays": Rule("weekly", byday=(0, 1, 2, 3, 4)),
+    "monthly": Rule("monthly"),
+}
+
+@functools.lru_cache(maxsize=256)
+def parse_rule(repeat: str) -> Optional[Rule]:
+    """
+    Accepts the legacy keywords ('none', 'daily', 'weekly', 'weekdays',
+    'monthly') or an RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY with optional
+    INTERVAL, BYDAY (weekly) and BYMONTHDAY (monthly). Unknown rules -> None.
+    """
+    repeat = (repeat or "none").strip()
+    if repeat.lower() in KEYWORDS:
+        return KEYWORDS[repeat.lower()]
+    if repeat.upper().startswith("RRULE:"):
+        repeat = repeat[6:]
+    try:
+        parts = dict(p.split("=", 1) for p in repeat.upper().split(";") if p)
+        freq = parts.pop("FREQ").lower()
+        if freq not in ("daily", "weekly", "monthly"):
+            return None
+        interval = int(parts.pop("INTERVAL", "1"))
+        byday = tuple(sorted({DAY_CODES.index(d) for d in parts.pop("BYDAY", "").split(",") if d}))
+        bymonthday = int(parts["BYMONTHDAY"]) if "BYMONTHDAY" in parts else None
+        parts.pop("BYMONTHDAY", None)
+    except (KeyError, ValueError):
+        return None
+    if parts or interval < 1 or (byday and freq != "weekly") or (bymonthday is not None and (freq != "monthly" or not 0 < abs(bymonthday) <= 31)):
+        return None
+    return Rule(freq, interval, byday, bymonthday)
+
+def to_rrule(repeat: str) -> Optional[str]:
+    rule = parse_rule(repeat)
+    if rule is None:
+        return None
+    out = f"FREQ={rule.freq.upper()}"
+    if rule.interval != 1:
+        out += f";INTERVAL={rule.interval}"
+    if rule.byday:
+        out += ";BYDAY=" + ",".join(DAY_CODES[d] for d in rule.byday)
+    if rule.bymonthday is not None:
+        out += f";BYMONTHDAY={rule.bymonthday}"
+    return out
+
+@functools.lru_cache(maxsize=4096)
+def _month_day(year: int, month: int, bymonthday: int) -> Optional[int]:
+    last = calendar.monthrange(year, month)[1]
+    day = bymonthday if bymonthday > 0 else last + 1 + bymonthday
+    return day if 1 <= day <= last else None
+
+def next_after(rule: Rule, anchor: dt.datetime, after: dt.datetime) -> dt.datetime:
+    """First occurrence strictly after `after` of the series starting at `anchor`."""
+    if after < anchor:
+        return anchor
+    if rule.freq == "monthly":
+        return _next_monthly(rule, anchor, after)
+    if rule.freq == "weekly" and rule.byday:
+        return _next_weekly_byday(rule, anchor, after)
+    step = dt.timedelta(days=rule.interval * (7 if rule.freq == "weekly" else 1))
+    return anchor + ((after - anchor) // step + 1) * step
+
+def _next_weekly_byday(rule: Rule, anchor: dt.datetime, after: dt.datetime) -> dt.datetime:
+    at = anchor.time()
+    day = after.date() + dt.timedelta(days=1 if after.time() >= at else 0)
+    week0 = anchor.date() - dt.timedelta(days=anchor.weekday())
+    week = (day - dt.timedelta(days=day.weekday()) - week0).days // 7
+    if week % rule.interval:
+        week += rule.interval - week % rule.interval
+        day = week0 + dt.timedelta(weeks=week)
+    later = [d for d in rule.byday if d >= day.weekday()]
+    if later:
+        day += dt.timedelta(days=later[0] - day.weekday())
+    else:
+        day = week0 + dt.timedelta(weeks=week + rule.interval, days=rule.byday[0])
+    return dt.datetime.combine(day, at, tzinfo=anchor.tzinfo)
+
+def _next_monthly(rule: Rule, anchor: dt.datetime, after: dt.datetime) -> dt.datetime:
+    bymonthday = rule.bymonthday or anchor.day
+    base = anchor.year * 12 + anchor.month - 1
+    gap = after.year * 12 + after.month - 1 - base
+    idx = base + -(-gap // rule.interval) * rule.interval
+    # Months lacking the requested day are skipped, as RFC 5545 does, so the
+    # loop runs a bounded handful of times (at most a few years for Feb 29).
+    while True:
+        year, month = divmod(idx, 12)
+        day = _month_day(year, month + 1, bymonthday)
+        if day is not None:
+            cand = anchor.replace(year=year, month=month + 1, day=day)
+            if cand > after:
+                return cand
+        idx += rule.interval
+
+def occurrences(rule: Rule, anchor: dt.datetime, start: dt.datetime, end: dt.datetime) -> Iterator[dt.datetime]:
+    """Occurrences of the series starting at `anchor` in [start, end), lazily and in order."""
+    first = anchor if anchor >= start else next_after(rule, anchor, start - dt.timedelta(microseconds=1))
+    if rule.freq == "monthly":
+        # Walk the months directly instead of searching from each occurrence.
+        if first >= end:
+            return
+        yield first  # may be an off-pattern anchor
+        bymonthday = rule.bymonthday or anchor.day
+        idx = first.year * 12 + first.month - 1
+        while True:
+            year, month = divmod(idx, 12)
+            day = _month_day(year, month + 1, bymonthday)
+            if day is not None:
+                t = anchor.replace(year=year, month=month + 1, day=day)
+                if t >= end:
+                    return
+                if t > first:
+                    yield t
+            elif year > end.year:
+                return
+            idx += rule.interval
+    if rule.byday:
+        t = first
+        while t < end:
+            yield t
+            t = next_after(rule, anchor, t)
+        return
+    # Fixed step: plain additions, no per-occurrence search.
+    step = dt.timedelta(days=rule.interval * (7 if rule.freq == "weekly" else 1))
+    t = first
+    while t < end:
+        yield t
+        t += step
+
+EPOCH = dt.datetime(1970, 1, 1)
+MINUTE = dt.timedelta(minutes=1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+def to_minute(t: dt.datetime) -> int:
+    """Whole minutes from EPOCH to naive `t`, rounded down."""
+    return (t - EPOCH) // MINUTE
+
+def _ceil_minute(t: dt.datetime) -> int:
+    return -((EPOCH - t) // MINUTE)
+
+def _monthly_minutes(rule: Rule, anchor: dt.datetime, lo: int, stop: int) -> List[range]:
+    bymonthday = rule.bymonthday or anchor.day
+    time_of_day = anchor.hour * 60 + anchor.minute
+    base = anchor.year * 12 + anchor.month - 1
+    first = EPOCH + dt.timedelta(minutes=lo)
+    gap = max(0, first.year * 12 + first.month - 1 - base)
+    idx = base + -(-gap // rule.interval) * rule.interval
+    last_year = (EPOCH + dt.timedelta(minutes=stop)).year
+    out = []
+    if lo == to_minute(anchor) < stop and anchor.day != _month_day(anchor.year, anchor.month, bymonthday):
+        out.append(range(lo, lo + 1))  # an off-pattern anchor still fires
+    while True:
+        year, month = divmod(idx, 12)
+        day = _month_day(year, month + 1, bymonthday)
+        if day is not None:
+            m = (dt.date(year, month + 1, day).toordinal() - _EPOCH_ORDINAL) * 1440 + time_of_day
+            if m >= stop:
+                break
+            if m >= lo:
+                out.append(range(m, m + 1))
+        elif year > last_year:
+            break
+        idx += rule.interval
+    out.sort(key=lambda r: r.start)
+    return out
+
+def minute_ranges(rule: Rule, anchor: dt.datetime, start: dt.datetime, end: dt.datetime) -> List[range]:
+    """
+    occurrences(rule, anchor, start, end) as ranges of to_minute() values, for
+    expanding many series without a datetime per occurrence. A fixed-step
+    series is one arithmetic progression and a weekly BYDAY series one per
+    weekday (plus the anchor itself when it is off-pattern); monthly series
+    get one single-value range per occurrence.
+    """
+    lo, stop = max(_ceil_minute(start), to_minute(anchor)), _ceil_minute(end)
+    if rule.freq == "monthly":
+        return _monthly_minutes(rule, anchor, lo, stop)
+    step = rule.interval * (7 if rule.freq == "weekly" else 1) * 1440
+    if not rule.byday:
+        firsts = [to_minute(anchor)]
+    else:
+        week0 = to_minute(anchor) - anchor.weekday() * 1440
+        firsts = [week0 + d * 1440 for d in rule.byday]
+    out = []
+    for m in firsts:
+        if m < lo:
+            m += -((m - lo) // step) * step
+        out.append(range(m, stop, step))
+    if rule.byday and anchor.weekday() not in rule.byday and lo == to_minute(anchor) < stop:
+        out.append(range(lo, lo + 1))
+    return out
+
+def catch_up(repeat: str, scheduled_at: dt.datetime, now: dt.datetime, policy: str = CATCH_UP_ONCE, grace: dt.timedelta = dt.timedelta(minutes=5)) -> Tuple[bool, Optional[dt.datetime]]:
+    """
+    Decide what firing the occurrence at `scheduled_at` means at `now`.
+    Returns (fire, next_scheduled_at); next is None for one-shot tasks.
+    """
+    if policy not in CATCH_UP_POLICIES:
+        raise ValueError(f"unknown catch-up policy: {policy!r}")
+    overdue = now - scheduled_at > grace
+    fire = not (overdue and policy == CATCH_UP_SKIP)
+    rule = parse_rule(repeat)
+    if rule is None:
+        return fire, None
+    if policy == CATCH_UP_ALL:
+        return fire, next_after(rule, scheduled_at, scheduled_at)
+    return fire, next_after(rule, scheduled_at, max(now, scheduled_at))
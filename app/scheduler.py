@@ -1,36 +1,235 @@
 from __future__ import annotations
-import threading, time, datetime as dt
-from .storage import due_tasks, update_task
+import threading, time, heapq, datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from .storage import due_tasks, save_fired, get_task, get_tasks, enabled_schedule, subscribe, unsubscribe
 from .notifications import notify
 from .sounds import play as play_sound
 from .models import Task
+from .recurrence import catch_up, CATCH_UP_ONCE
+from . import metrics
 
 class Scheduler(threading.Thread):
-    def __init__(self, poll_seconds: int = 20):
+    """
+    Fires due tasks in batches. For each tick the next state of every due
+    task is computed in memory, notifications and sounds are handed to a
+    small thread pool, and all state changes are committed in one
+    transaction, so a slow notification backend never delays the others.
+    """
+
+    def __init__(self, poll_seconds: int = 20, catch_up_policy: str = CATCH_UP_ONCE,
+                 effect_workers: int = 4, effect_timeout: float = 10.0):
         super().__init__(daemon=True)
-        self._stop = threading.Event()
+        self._stop_event = threading.Event()
         self.poll_seconds = poll_seconds
+        self.catch_up_policy = catch_up_policy
+        self.effect_workers = effect_workers
+        self.effect_timeout = effect_timeout
+        self._effects: Optional[ThreadPoolExecutor] = None
+        self._effects_lock = threading.Lock()
+        self._pending_effects: list = []  # [(deadline, future)]
 
     def stop(self):
-        self._stop.set()
+        self._stop_event.set()
+        with self._effects_lock:
+            if self._effects is not None:
+                self._effects.shutdown(wait=False, cancel_futures=True)
 
     def run(self):
-        while not self._stop.is_set():
+        while not self._stop_event.is_set():
+            t0 = time.perf_counter()
             try:
                 now = dt.datetime.now().replace(second=0, microsecond=0)
-                for task in due_tasks(now):
-                    self._fire(task)
+                due = due_tasks(now)
+                metrics.observe("scheduler.due_per_tick", len(due), metrics.COUNT_BUCKETS)
+                self._fire_batch(due)
             except Exception as e:
+                metrics.inc("scheduler.errors")
                 print("[scheduler] error:", e)
-            time.sleep(self.poll_seconds)
+            metrics.observe("scheduler.loop_ms", (time.perf_counter() - t0) * 1000)
+            self._stop_event.wait(self.poll_seconds)
 
     def _fire(self, task: Task):
-        notify("Recordatorio", f"{task.title}")
-        play_sound("alert")
-        task.last_fired_at = dt.datetime.now().replace(second=0, microsecond=0)
-        nxt = task.next_occurrence()
+        self._fire_batch([task])
+
+    def _advance(self, task: Task, now: dt.datetime) -> bool:
+        """Move `task` to its next state in memory; True if it should alert."""
+        fire, nxt = catch_up(task.repeat, task.scheduled_at, now, self.catch_up_policy)
+        if fire:
+            metrics.observe("scheduler.fire_lag_seconds", (now - task.scheduled_at).total_seconds(), metrics.LAG_BUCKETS_S)
+            task.last_fired_at = now.replace(second=0, microsecond=0)
         if nxt is not None:
             task.scheduled_at = nxt
         else:
             task.enabled = False
-        update_task(task)
+        return fire
+
+    def _fire_batch(self, tasks: List[Task]) -> int:
+        """Advance, alert and persist `tasks`; returns how many alerted."""
+        if not tasks:
+            return 0
+        now = dt.datetime.now()
+        fired = [t for t in tasks if self._advance(t, now)]
+        metrics.inc("scheduler.fired", len(fired))
+        self._reap_effects()
+        if fired:
+            with self._effects_lock:
+                if self._effects is None:
+                    self._effects = ThreadPoolExecutor(self.effect_workers, thread_name_prefix="fire")
+                deadline = time.monotonic() + self.effect_timeout
+                for task in fired:
+                    self._pending_effects.append((deadline, self._effects.submit(self._alert, task.title)))
+            # Check on the batch when its deadline passes, not at the next one.
+            watchdog = threading.Timer(self.effect_timeout, self._reap_effects)
+            watchdog.daemon = True
+            watchdog.start()
+        with metrics.timer("scheduler.commit_ms"):
+            save_fired(tasks)
+        return len(fired)
+
+    @staticmethod
+    def _alert(title: str):
+        with metrics.timer("scheduler.notify_ms"):
+            notify("Recordatorio", title)
+        with metrics.timer("scheduler.sound_ms"):
+            play_sound("alert")
+
+    def _reap_effects(self):
+        """
+        Drop finished alerts; log and count those past their deadline,
+        cancelling the ones not started yet. A running alert cannot be
+        stopped and keeps its worker, so later alerts get a fresh pool instead
+        of queueing behind blocked workers.
+        """
+        with self._effects_lock:
+            now, pending, timed_out, stuck = time.monotonic(), [], 0, 0
+            for deadline, fut in self._pending_effects:
+                if fut.done():
+                    if not fut.cancelled() and fut.exception() is not None:
+                        metrics.inc("scheduler.effect_errors")
+                        print("[scheduler] alert error:", fut.exception())
+                elif deadline <= now:
+                    timed_out += 1
+                    if not fut.cancel():
+                        stuck += 1
+                else:
+                    pending.append((deadline, fut))
+            self._pending_effects = pending
+            if timed_out:
+                metrics.inc("scheduler.effect_timeouts", timed_out)
+                print(f"[scheduler] {timed_out} alert(s) timed out after {self.effect_timeout}s ({stuck} still running)")
+            if stuck and self._effects is not None:
+                self._effects.shutdown(wait=False)
+                self._effects = None
+
+
+class EventScheduler(Scheduler):
+    """
+    Keeps a min-heap of (scheduled_at, task_id) loaded from storage once and
+    sleeps until the earliest entry. Storage mutations wake it up so the heap
+    can be adjusted; stale heap entries are discarded lazily.
+    """
+
+    def __init__(self, max_sleep: float = 60.0, resync_seconds: float = 600.0, catch_up_policy: str = CATCH_UP_ONCE):
+        super().__init__(catch_up_policy=catch_up_policy)
+        # Event.wait runs on the monotonic clock, so cap each sleep to notice
+        # wall-clock jumps (suspend, DST) and resync for writes made by other
+        # processes, which do not go through this process' listeners.
+        self.max_sleep = max_sleep
+        self.resync_seconds = resync_seconds
+        self._wake = threading.Event()
+        self._changed: set = set()
+        self._changed_lock = threading.Lock()
+        self._resync = True
+        self._heap: list = []
+        self._due_at: dict = {}
+
+    def stop(self):
+        super().stop()
+        self._wake.set()
+
+    def notify_change(self, kind: str, task_id):
+        """Storage listener; also called for writes made by other processes (task_id None: reload all)."""
+        with self._changed_lock:
+            if task_id is None:
+                self._resync = True
+            else:
+                self._changed.add(task_id)
+        self._wake.set()
+
+    def _push(self, task_id: int, when: dt.datetime):
+        self._due_at[task_id] = when
+        heapq.heappush(self._heap, (when, task_id))
+
+    def _load(self):
+        # Clear pending changes first: anything arriving during the read is
+        # kept and re-applied on top of the fresh snapshot.
+        with self._changed_lock:
+            self._changed.clear()
+            self._resync = False
+        self._heap, self._due_at = [], {}
+        for task_id, when in enabled_schedule():
+            self._push(task_id, when)
+
+    def _apply_changes(self):
+        with self._changed_lock:
+            changed, self._changed = self._changed, set()
+        for task_id in changed:
+            task = get_task(task_id)
+            if task is None or not task.enabled:
+                self._due_at.pop(task_id, None)
+            elif self._due_at.get(task_id) != task.scheduled_at:
+                self._push(task_id, task.scheduled_at)
+
+    def _next_entry(self):
+        while self._heap:
+            when, task_id = self._heap[0]
+            if self._due_at.get(task_id) == when:
+                return when, task_id
+            heapq.heappop(self._heap)
+        return None
+
+    def _fire_due(self, now: dt.datetime) -> int:
+        ids = []
+        entry = self._next_entry()
+        while entry is not None and entry[0] <= now:
+            heapq.heappop(self._heap)
+            del self._due_at[entry[1]]
+            ids.append(entry[1])
+            entry = self._next_entry()
+        try:
+            due = [t for t in get_tasks(ids) if t.enabled and t.scheduled_at <= now] if ids else []
+            self._fire_batch(due)
+        except Exception:
+            # The popped entries were not committed as fired (e.g. the
+            # database was locked): reload them from storage on the next pass.
+            with self._changed_lock:
+                self._resync = True
+            raise
+        return len(due)
+
+    def run(self):
+        subscribe(self.notify_change)
+        last_sync = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                self._wake.clear()
+                t0 = time.perf_counter()
+                try:
+                    if self._resync or time.monotonic() - last_sync >= self.resync_seconds:
+                        self._load()
+                        last_sync = time.monotonic()
+                    self._apply_changes()
+                    due = self._fire_due(dt.datetime.now())
+                    metrics.observe("scheduler.due_per_tick", due, metrics.COUNT_BUCKETS)
+                except Exception as e:
+                    metrics.inc("scheduler.errors")
+                    print("[scheduler] error:", e)
+                metrics.observe("scheduler.loop_ms", (time.perf_counter() - t0) * 1000)
+                timeout = self.max_sleep
+                entry = self._next_entry()
+                if entry is not None:
+                    timeout = min(timeout, max(0.0, (entry[0] - dt.datetime.now()).total_seconds()))
+                self._wake.wait(timeout)
+        finally:
+            unsubscribe(self.notify_change)
@@ -1,5 +1,32 @@
 from __future__ import annotations
-import sys, os, math, wave, struct, tempfile, shutil, subprocess
+import sys, os, io, math, time, wave, array, queue, atexit, threading, functools, pathlib, tempfile, shutil, subprocess
+from . import metrics
+
+SAMPLE_RATE = 44100
+VOLUME = 0.25
+FADE_MS = 5  # linear fade-in/out, removes the click at both ends of a tone
+
+# event -> (freq Hz, duration ms)
+TONES = {
+    "start": (880, 120),
+    "end": (523, 220),   # C5
+    "alert": (988, 150), # B5
+}
+
+def _user_cache_dir():
+    """Per-user cache directory for the tones, or None if there is no home."""
+    try:
+        if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+            root = pathlib.Path(os.environ["LOCALAPPDATA"])
+        else:
+            root = pathlib.Path(os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache")
+    except RuntimeError:
+        return None
+    return root / "productivity_timer" / "tones"
+
+# Rendered WAV files are kept in the user's own cache directory and reused
+# across runs; set to None to keep them only for the lifetime of the process.
+CACHE_DIR = _user_cache_dir()
 
 def _win_beep(freq=880, dur_ms=200):
     try:
@@ -17,52 +44,296 @@ def _mac_beep():
     except Exception:
         return False
 
-def _gen_tone_wav(path: str, freq=880, dur_ms=200, volume=0.25, sample_rate=44100):
+@functools.lru_cache(maxsize=32)
+def _tone_pcm(freq=880, dur_ms=200, volume=VOLUME, sample_rate=SAMPLE_RATE) -> bytes:
+    """16-bit little-endian mono PCM for a sine tone with a short fade in/out."""
     n = int(sample_rate * (dur_ms/1000.0))
-    with wave.open(path, "wb") as w:
+    fade = max(1, min(n // 2, int(sample_rate * FADE_MS / 1000)))
+    amp = 32767.0 * volume
+    step = 2*math.pi*freq/sample_rate
+    sin = math.sin
+    samples = array.array("h", [int(amp * min(1.0, i/fade, (n-1-i)/fade) * sin(step*i)) for i in range(n)])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+@functools.lru_cache(maxsize=32)
+def _tone_wav_bytes(freq=880, dur_ms=200, volume=VOLUME, sample_rate=SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
         w.setnchannels(1)
         w.setsampwidth(2)
         w.setframerate(sample_rate)
-        for i in range(n):
-            val = int(32767.0 * volume * math.sin(2*math.pi*freq*(i/sample_rate)))
-            w.writeframes(struct.pack("<h", val))
+        w.writeframes(_tone_pcm(freq, dur_ms, volume, sample_rate))
+    return buf.getvalue()
 
-def _play_with_system_player(freq=880, dur_ms=200):
-    # Try common CLI players if available
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    tmp.close()
+def _gen_tone_wav(path: str, freq=880, dur_ms=200, volume=VOLUME, sample_rate=SAMPLE_RATE):
+    with open(path, "wb") as f:
+        f.write(_tone_wav_bytes(freq, dur_ms, volume, sample_rate))
+
+_process_dir = None
+
+def _cache_dir() -> pathlib.Path:
+    if CACHE_DIR is not None:
+        try:
+            CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            return CACHE_DIR
+        except OSError:
+            pass
+    return _private_dir()
+
+def _private_dir() -> pathlib.Path:
+    """Owner-only directory for this process, removed at exit."""
+    global _process_dir
+    if _process_dir is None:
+        _process_dir = pathlib.Path(tempfile.mkdtemp(prefix="pt_tones_"))
+        atexit.register(shutil.rmtree, _process_dir, True)
+    return _process_dir
+
+def _write_tone(directory: pathlib.Path, name: str, data: bytes) -> str:
+    path = directory / name
+    if not path.exists() or path.stat().st_size != len(data):
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return str(path)
+
+@functools.lru_cache(maxsize=32)
+def _tone_wav_path(freq=880, dur_ms=200, volume=VOLUME, sample_rate=SAMPLE_RATE) -> str:
+    name = f"tone_{freq}_{dur_ms}_{volume}_{sample_rate}.wav"
+    data = _tone_wav_bytes(freq, dur_ms, volume, sample_rate)
     try:
-        _gen_tone_wav(tmp.name, freq=freq, dur_ms=dur_ms)
-        for player in ("paplay", "aplay", "ffplay", "afplay"):  # Linux/Pulse, Linux/ALSA, FFmpeg, macOS
-            if shutil.which(player):
+        return _write_tone(_cache_dir(), name, data)
+    except OSError:
+        # Read-only or full cache directory: fall back to a private one.
+        return _write_tone(_private_dir(), name, data)
+
+def preload():
+    """Render (and persist) the tones for every known event ahead of time."""
+    for freq, dur in TONES.values():
+        try:
+            _tone_wav_path(freq, dur)
+        except OSError:
+            _tone_pcm(freq, dur)
+
+FILE_PLAYERS = ("paplay", "aplay", "ffplay", "afplay")  # Linux/Pulse, Linux/ALSA, FFmpeg, macOS
+
+# Players that accept raw S16_LE mono PCM on stdin and can stay open between
+# sounds. Each entry builds the argv for a given sample rate.
+RAW_PLAYERS = {
+    "pacat": lambda rate: ["pacat", "--playback", "--format=s16le", f"--rate={rate}", "--channels=1"],
+    "aplay": lambda rate: ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-r", str(rate), "-c", "1"],
+}
+SINK_PADDING_MS = 60  # trailing silence so the player flushes its last period
+
+@functools.lru_cache(maxsize=1)
+def _file_players() -> tuple:
+    return tuple(p for p in FILE_PLAYERS if shutil.which(p))
+
+@functools.lru_cache(maxsize=1)
+def _raw_player_argv() -> tuple:
+    for name, argv in RAW_PLAYERS.items():
+        if shutil.which(name):
+            return tuple(argv(SAMPLE_RATE))
+    return ()
+
+
+class PcmSink:
+    """
+    One long-lived player process fed raw PCM over stdin. The process is
+    started on first write and restarted once if it has died or the pipe
+    breaks; write() returns False when that also fails.
+    """
+
+    def __init__(self, argv):
+        self.argv = list(argv)
+        self._proc: subprocess.Popen | None = None
+        self._lock = threading.Lock()
+
+    def _ensure(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._proc = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return self._proc
+
+    def write(self, pcm: bytes) -> bool:
+        with self._lock:
+            for _ in range(2):
                 try:
-                    if player == "ffplay":
-                        subprocess.run([player, "-nodisp", "-autoexit", "-loglevel", "quiet", tmp.name], check=True)
-                    else:
-                        subprocess.run([player, tmp.name], check=True)
+                    proc = self._ensure()
+                    proc.stdin.write(pcm)
+                    proc.stdin.flush()
                     return True
-                except Exception:
-                    continue
-    finally:
+                except (OSError, ValueError):
+                    self._close_locked()
+            return False
+
+    def _close_locked(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
         try:
-            os.unlink(tmp.name)
+            proc.stdin.close()
         except Exception:
             pass
+        try:
+            proc.wait(timeout=1)
+        except Exception:
+            proc.kill()
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
+
+_sink: PcmSink | None = None
+_sink_failed = False
+
+def _play_with_sink(freq=880, dur_ms=200) -> bool:
+    global _sink, _sink_failed
+    if _sink_failed:
+        return False
+    if _sink is None:
+        argv = _raw_player_argv()
+        if not argv:
+            _sink_failed = True
+            return False
+        _sink = PcmSink(argv)
+        atexit.register(_sink.close)
+    pcm = _tone_pcm(freq, dur_ms) + bytes(2 * int(SAMPLE_RATE * SINK_PADDING_MS / 1000))
+    if _sink.write(pcm):
+        return True
+    _sink_failed = True  # fall back to one player process per sound from now on
     return False
 
-def play(event: str):
+def _play_with_system_player(freq=880, dur_ms=200):
+    # Try common CLI players if available
+    try:
+        path = _tone_wav_path(freq, dur_ms)
+    except OSError:
+        return False
+    for player in _file_players():
+        try:
+            if player == "ffplay":
+                subprocess.run([player, "-nodisp", "-autoexit", "-loglevel", "quiet", path], check=True)
+            else:
+                subprocess.run([player, path], check=True)
+            return True
+        except Exception:
+            continue
+    return False
+
+def play_sync(event: str):
     """
     event in {'start','end','alert'}
-    Order: native Windows beep -> native mac beep -> system player (wav) -> no-op.
+    Order: native Windows beep -> native mac beep -> persistent PCM sink ->
+    system player (wav) -> no-op.
+    May block while a player runs; use play() from UI code.
     """
-    mapping = {
-        "start": (880, 120),
-        "end": (523, 220),   # C5
-        "alert": (988, 150), # B5
-    }
-    freq, dur = mapping.get(event, (880, 120))
+    freq, dur = TONES.get(event, (880, 120))
     if _win_beep(freq, dur):
         return
     if _mac_beep():
         return
+    if _play_with_sink(freq, dur):
+        return
     _play_with_system_player(freq, dur)
+
+
+class PlayHandle:
+    """Returned by play(); lets the caller wait for or cancel a queued sound."""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.enqueued_at = time.monotonic()
+        self.played = False
+        self.cancelled = False
+        self._done = threading.Event()
+
+    def cancel(self):
+        """Skip the sound if it has not started playing yet."""
+        self.cancelled = True
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _finish(self, played: bool):
+        self.played = played
+        self._done.set()
+
+
+class AudioWorker(threading.Thread):
+    """
+    Plays sounds one at a time off the caller's thread. Identical events
+    submitted within `coalesce_window` seconds share one handle, the oldest
+    queued sound is dropped when the queue is full, and sounds that waited
+    longer than `max_age` seconds are skipped as stale.
+    """
+
+    def __init__(self, player=play_sync, maxsize: int = 8, coalesce_window: float = 0.15, max_age: float = 1.0):
+        super().__init__(daemon=True, name="audio")
+        self.player = player
+        self.coalesce_window = coalesce_window
+        self.max_age = max_age
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._recent: dict = {}
+
+    def submit(self, event: str) -> PlayHandle:
+        with self._lock:
+            last = self._recent.get(event)
+            if last is not None and not last.cancelled and time.monotonic() - last.enqueued_at < self.coalesce_window:
+                return last
+            handle = PlayHandle(event)
+            self._recent[event] = handle
+            while True:
+                try:
+                    self._queue.put_nowait(handle)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()._finish(False)
+                    except queue.Empty:
+                        pass
+        return handle
+
+    def stop(self):
+        with self._lock:
+            while True:
+                try:
+                    self._queue.get_nowait()._finish(False)
+                except queue.Empty:
+                    break
+            self._queue.put_nowait(None)
+
+    def run(self):
+        while True:
+            handle = self._queue.get()
+            if handle is None:
+                return
+            if handle.cancelled or time.monotonic() - handle.enqueued_at > self.max_age:
+                handle._finish(False)
+                continue
+            try:
+                with metrics.timer("sound.play_ms"):
+                    self.player(handle.event)
+                handle._finish(True)
+            except Exception as e:
+                metrics.inc("sound.errors")
+                print("[sounds] error:", e)
+                handle._finish(False)
+
+
+_worker: AudioWorker | None = None
+_worker_lock = threading.Lock()
+
+def play(event: str) -> PlayHandle:
+    """Queue `event` on the background audio worker and return immediately."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = AudioWorker()
+            _worker.start()
+    return _worker.submit(event)
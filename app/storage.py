@@ -1,7 +1,11 @@
 from __future__ import annotations
-import sqlite3, pathlib, datetime as dt
-from typing import Optional, List
-from .models import Task
+import sqlite3, pathlib, threading, itertools, bisect, queue, time, weakref, datetime as dt
+from dataclasses import dataclass, field
+from typing import Callable, Optional, List, Iterable, Iterator
+from .models import Task, TaskColumns, Occurrence, OccurrenceList, FocusPhase
+from .recurrence import parse_rule, minute_ranges, to_minute
+from . import metrics
+from .metrics import timed
 
 DB_PATH = pathlib.Path(__file__).resolve().parent / "app_data.sqlite"
 
@@ -28,76 +32,512 @@ CREATE TABLE IF NOT EXISTS tabata_sessions (
 );
 """
 
-def connect():
-    con = sqlite3.connect(DB_PATH)
-    con.execute("PRAGMA journal_mode=WAL;")
-    con.row_factory = sqlite3.Row
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# of them a database file has already gone through.
+def _migrate_v1(con):
     con.execute(DDL)
     con.execute(DDL_TABATA)
+
+# Times are stored as normalized ISO strings ("YYYY-MM-DDTHH:MM"), which sort
+# lexicographically in chronological order. Queries compare the raw columns so
+# SQLite can range-scan the indexes instead of evaluating datetime() per row.
+def _fmt(d: dt.datetime) -> str:
+    return d.isoformat(timespec="minutes")
+
+def _normalize(value):
+    if not value:
+        return value
+    try:
+        return _fmt(dt.datetime.fromisoformat(value))
+    except ValueError:
+        return value
+
+def _migrate_v2(con):
+    for table, cols in (("tasks", ("scheduled_at", "last_fired_at")), ("tabata_sessions", ("started_at",))):
+        for col in cols:
+            rows = con.execute(f"SELECT id, {col} FROM {table} WHERE {col} IS NOT NULL").fetchall()
+            changed = [(_normalize(v), i) for i, v in rows if _normalize(v) != v]
+            con.executemany(f"UPDATE {table} SET {col}=? WHERE id=?", changed)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_scheduled ON tasks(scheduled_at, id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_enabled_scheduled ON tasks(enabled, scheduled_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tabata_completed_started ON tabata_sessions(completed, started_at)")
+
+DDL_TABATA_DAILY = """
+CREATE TABLE IF NOT EXISTS tabata_daily (
+    day TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    rounds INTEGER NOT NULL DEFAULT 0,
+    work_sec INTEGER NOT NULL DEFAULT 0,
+    rest_sec INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# Per-day totals of completed sessions. A session rests between rounds, so
+# it spends rounds*work_sec working and (rounds-1)*rest_sec resting.
+def _migrate_v3(con):
+    con.execute(DDL_TABATA_DAILY)
+    con.execute("DELETE FROM tabata_daily")
+    con.execute(
+        "INSERT INTO tabata_daily(day, sessions, rounds, work_sec, rest_sec) "
+        "SELECT substr(started_at, 1, 10), COUNT(*), SUM(rounds), SUM(rounds*work_sec), SUM(MAX(rounds-1, 0)*rest_sec) "
+        "FROM tabata_sessions WHERE completed=1 GROUP BY substr(started_at, 1, 10)"
+    )
+
+# Google sync bookkeeping: tasks.updated_at is a UTC timestamp bumped by every
+# local write; google_links maps a local task to its remote task/event with
+# their etags and remote 'updated' times, plus the local updated_at that was
+# last reconciled (synced_at); sync_state holds sync tokens and watermarks.
+DDL_GOOGLE_LINKS = """
+CREATE TABLE IF NOT EXISTS google_links (
+    task_id INTEGER PRIMARY KEY,
+    gtask_id TEXT DEFAULT NULL,
+    gtask_etag TEXT DEFAULT NULL,
+    gtask_updated TEXT DEFAULT NULL,
+    event_id TEXT DEFAULT NULL,
+    event_etag TEXT DEFAULT NULL,
+    event_updated TEXT DEFAULT NULL,
+    synced_at TEXT NOT NULL
+);
+"""
+
+DDL_SYNC_STATE = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+def _utcnow() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat(timespec="microseconds")
+
+def _migrate_v4(con):
+    cols = {r[1] for r in con.execute("PRAGMA table_info(tasks)")}
+    if "updated_at" not in cols:
+        con.execute("ALTER TABLE tasks ADD COLUMN updated_at TEXT DEFAULT NULL")
+    con.execute("UPDATE tasks SET updated_at=? WHERE updated_at IS NULL", (_utcnow(),))
+    con.execute(DDL_GOOGLE_LINKS)
+    con.execute(DDL_SYNC_STATE)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks(updated_at)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_links_gtask ON google_links(gtask_id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_links_event ON google_links(event_id)")
+
+# Full-text index over title/description. tasks_fts is an external-content
+# FTS5 table (it stores only the index, reading text back from tasks) kept in
+# sync by triggers; the rebuild indexes rows that already exist. SQLite
+# builds without FTS5 skip it and search_tasks falls back to LIKE.
+FTS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+def _migrate_v5(con):
+    try:
+        con.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+            "title, description, content='tasks', content_rowid='id', prefix='1 2', tokenize='unicode61 remove_diacritics 2')"
+        )
+    except sqlite3.OperationalError:
+        return  # no FTS5 in this SQLite build
+    for trigger in FTS_TRIGGERS:
+        con.execute(trigger)
+    con.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+# Next-fire index of recurring tasks. A recurring task can only fire in a
+# window that ends after its (next) scheduled_at, so window queries read just
+# those entries instead of every enabled task before the window's end.
+def _migrate_v6(con):
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_recurring_next ON tasks(enabled, scheduled_at) WHERE repeat!='none'")
+
+DDL_POMODORO = """
+CREATE TABLE IF NOT EXISTS pomodoro_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    planned_sec INTEGER NOT NULL,
+    actual_sec REAL NOT NULL,
+    paused_sec REAL NOT NULL DEFAULT 0,
+    interrupted INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+DDL_POMODORO_DAILY = """
+CREATE TABLE IF NOT EXISTS pomodoro_daily (
+    day TEXT PRIMARY KEY,
+    pomodoros INTEGER NOT NULL DEFAULT 0,
+    focus_sec REAL NOT NULL DEFAULT 0,
+    break_sec REAL NOT NULL DEFAULT 0,
+    interrupted INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# Pomodoro history: one row per phase, plus per-day totals keyed by the day
+# the phase started. `pomodoros` counts work phases that ran to the end;
+# focus_sec includes the counted-down part of interrupted ones.
+def _migrate_v7(con):
+    con.execute(DDL_POMODORO)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_pomodoro_started ON pomodoro_sessions(started_at)")
+    con.execute(DDL_POMODORO_DAILY)
+    con.execute("DELETE FROM pomodoro_daily")
+    con.execute(
+        "INSERT INTO pomodoro_daily(day, pomodoros, focus_sec, break_sec, interrupted) "
+        "SELECT substr(started_at, 1, 10), SUM(kind='work' AND NOT interrupted), "
+        "SUM(CASE WHEN kind='work' THEN actual_sec ELSE 0 END), SUM(CASE WHEN kind='work' THEN 0 ELSE actual_sec END), "
+        "SUM(interrupted) FROM pomodoro_sessions GROUP BY substr(started_at, 1, 10)"
+    )
+
+# One-shot counterpart of the next-fire index: window queries read packed
+# occurrence keys straight from it, without touching the table.
+def _migrate_v8(con):
+    # repeat is listed only so SQLite treats the index as covering.
+    con.execute("CREATE INDEX IF NOT EXISTS idx_tasks_one_shot ON tasks(enabled, scheduled_at, repeat) WHERE repeat='none'")
+
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6, _migrate_v7, _migrate_v8]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# One connection per (thread, database file), opened lazily and reused. The
+# sqlite3 module keeps a per-connection cache of prepared statements, so the
+# constant SQL strings below are only compiled once per connection.
+STATEMENT_CACHE_SIZE = 256
+class _Connections:
+    """
+    One thread's connections by database path. A thread's thread-local data
+    is dropped when the thread exits, which closes its connections.
+    """
+    def __init__(self):
+        self.by_path: dict = {}
+
+    def close(self) -> None:
+        for con in self.by_path.values():
+            try:
+                con.close()
+            except Exception:
+                pass
+        self.by_path.clear()
+
+    __del__ = close
+
+_local = threading.local()
+_lock = threading.Lock()
+_open_cons: "weakref.WeakSet[_Connections]" = weakref.WeakSet()
+_schema_ready: set = set()
+_generation = 0
+
+def _ensure_schema(con: sqlite3.Connection, path: str) -> None:
+    with _lock:
+        if path in _schema_ready:
+            return
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with con:
+                for migrate in MIGRATIONS[version:]:
+                    migrate(con)
+                con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        _schema_ready.add(path)
+
+def connect():
+    path = str(DB_PATH)
+    cons = getattr(_local, "cons", None)
+    if cons is None or getattr(_local, "generation", None) != _generation:
+        cons = _local.cons = _Connections()
+        _local.generation = _generation
+        with _lock:
+            _open_cons.add(cons)
+    con = cons.by_path.get(path)
+    if con is None:
+        con = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        con.execute("PRAGMA journal_mode=WAL;")
+        con.row_factory = sqlite3.Row
+        _ensure_schema(con, path)
+        cons.by_path[path] = con
     return con
 
+def close_all() -> None:
+    """Close every pooled connection; threads reconnect on their next call."""
+    global _generation
+    with _lock:
+        cons = list(_open_cons)
+        _open_cons.clear()
+        _schema_ready.clear()
+        _generation += 1
+    for thread_cons in cons:
+        thread_cons.close()
+
+# --- Change listeners ---
+# Callbacks receive (kind, task_id) with kind in {'insert','update','delete'},
+# or ('bulk', None) after a bulk import, meaning "reload everything".
+# They run on the thread that made the change, after it was committed.
+_listeners: List = []
+
+def subscribe(fn) -> None:
+    with _lock:
+        _listeners.append(fn)
+
+def unsubscribe(fn) -> None:
+    with _lock:
+        if fn in _listeners:
+            _listeners.remove(fn)
+
+def _emit(kind: str, task_id: Optional[int]) -> None:
+    for fn in list(_listeners):
+        try:
+            fn(kind, task_id)
+        except Exception as e:
+            print("[storage] listener error:", e)
+
+@dataclass
+class ChangeSet:
+    """Net effect of a run of change events: ids to insert, refresh or drop."""
+    inserted: set = field(default_factory=set)
+    updated: set = field(default_factory=set)
+    deleted: set = field(default_factory=set)
+    reload: bool = False  # a 'bulk' event: the id sets are not enough
+
+    def __bool__(self) -> bool:
+        return self.reload or bool(self.inserted or self.updated or self.deleted)
+
+    def add(self, kind: str, task_id: Optional[int]) -> None:
+        if kind == "bulk" or task_id is None:
+            self.reload = True
+        elif kind == "delete":
+            self.inserted.discard(task_id)
+            self.updated.discard(task_id)
+            self.deleted.add(task_id)
+        elif kind == "insert":
+            self.inserted.add(task_id)
+        elif task_id not in self.inserted:
+            self.updated.add(task_id)
+
+class ChangeBus:
+    """
+    Thread-safe mailbox for change events. publish() fits subscribe() (and
+    DaemonClient.watch) and may run on any thread; drain() hands everything
+    published since the previous drain over as one ChangeSet, so a consumer
+    applies a burst of writes as a single update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = ChangeSet()
+        self._count = 0
+
+    def publish(self, kind: str, task_id: Optional[int]) -> None:
+        with self._lock:
+            self._pending.add(kind, task_id)
+            self._count += 1
+
+    def drain(self) -> ChangeSet:
+        with self._lock:
+            changes, self._pending = self._pending, ChangeSet()
+            count, self._count = self._count, 0
+        if count:
+            metrics.observe("storage.change_batch", count, metrics.COUNT_BUCKETS)
+        return changes
+
+# Public functions below record call counts and latencies through
+# metrics.timed, which is a single flag check while metrics are disabled.
+SQL_LIST_TASKS = "SELECT * FROM tasks ORDER BY scheduled_at ASC, id ASC"
+SQL_DUE_TASKS = "SELECT * FROM tasks WHERE enabled=1 AND scheduled_at <= ?"
+
+def _tuples(con: sqlite3.Connection) -> sqlite3.Cursor:
+    """A cursor yielding plain tuples; cheaper than sqlite3.Row for bulk reads."""
+    cur = con.cursor()
+    cur.row_factory = None
+    return cur
+
 def _row_to_task(row) -> Task:
-    return Task(
-        id=row["id"],
-        title=row["title"],
-        description=row["description"] or "",
-        scheduled_at=dt.datetime.fromisoformat(row["scheduled_at"]),
-        repeat=row["repeat"],
-        enabled=bool(row["enabled"]),
-        last_fired_at=dt.datetime.fromisoformat(row["last_fired_at"]) if row["last_fired_at"] else None,
+    # Positional: task queries select the tasks columns first, in table order
+    # (id, title, description, scheduled_at, repeat, enabled, last_fired_at).
+    parse = dt.datetime.fromisoformat
+    return Task(row[0], row[1], row[2] or "", parse(row[3]), row[4], bool(row[5]), parse(row[6]) if row[6] else None)
+
+def _task_params(task: Task) -> tuple:
+    return (
+        task.title,
+        task.description,
+        _fmt(task.scheduled_at),
+        task.repeat,
+        1 if task.enabled else 0,
+        _fmt(task.last_fired_at) if task.last_fired_at else None,
+        _utcnow(),
     )
 
+@timed("storage.add_task")
 def add_task(task: Task) -> int:
     with connect() as con:
         cur = con.execute(
-            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, last_fired_at) VALUES (?,?,?,?,?,?)",
-            (
-                task.title,
-                task.description,
-                task.scheduled_at.isoformat(timespec="minutes"),
-                task.repeat,
-                1 if task.enabled else 0,
-                task.last_fired_at.isoformat(timespec="minutes") if task.last_fired_at else None,
-            ),
+            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, last_fired_at, updated_at) VALUES (?,?,?,?,?,?,?)",
+            _task_params(task),
         )
-        return cur.lastrowid
+    _emit("insert", cur.lastrowid)
+    return cur.lastrowid
 
+@timed("storage.list_tasks")
 def list_tasks() -> List[Task]:
     with connect() as con:
-        cur = con.execute("SELECT * FROM tasks ORDER BY datetime(scheduled_at) ASC")
+        cur = _tuples(con).execute(SQL_LIST_TASKS)
         return [_row_to_task(r) for r in cur.fetchall()]
 
+# --- Keyset pagination ---
+# Pages are (scheduled_at, id) ranges read off idx_tasks_scheduled, or
+# idx_tasks_enabled_scheduled when filtering on enabled. Each page is its own
+# short query starting right after the previous page's last key, so memory
+# stays at one page however large the table is, and no read transaction is
+# held open between pages.
+ITER_PAGE_SIZE = 500
+TASK_LIST_COLUMNS = "id, title, description, scheduled_at, repeat, enabled"
+
+def _page_sql(columns: str = "*", enabled: bool = False, start: bool = False, end: bool = False, keyed: bool = False) -> str:
+    conds = (("enabled=?", enabled), ("scheduled_at>=?", start), ("scheduled_at<?", end), ("(scheduled_at, id) > (?, ?)", keyed))
+    where = " AND ".join(c for c, on in conds if on)
+    return f"SELECT {columns} FROM tasks{' WHERE ' + where if where else ''} ORDER BY scheduled_at ASC, id ASC LIMIT ?"
+
+SQL_TASKS_PAGE = _page_sql()
+SQL_TASKS_PAGE_AFTER = _page_sql(keyed=True)
+
+def _key_text(value) -> str:
+    return value if isinstance(value, str) else _fmt(value)
+
+def _iter_pages(columns: str, after, limit, enabled, window, page_size) -> Iterator[list]:
+    # `columns` must put id first and scheduled_at fourth, as both "*" and
+    # TASK_LIST_COLUMNS do; the last row of a page is the next page's key.
+    start, end = window if window is not None else (None, None)
+    fixed = [v for v in (None if enabled is None else int(bool(enabled)),
+                         None if start is None else _key_text(start),
+                         None if end is None else _key_text(end)) if v is not None]
+    flags = (enabled is not None, start is not None, end is not None)
+    sql_first, sql_next = _page_sql(columns, *flags), _page_sql(columns, *flags, keyed=True)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        n = page_size if remaining is None else min(page_size, remaining)
+        with metrics.timer("storage.iter_page"):
+            if after is None:
+                rows = _tuples(connect()).execute(sql_first, (*fixed, n)).fetchall()
+            else:
+                rows = _tuples(connect()).execute(sql_next, (*fixed, _key_text(after[0]), after[1], n)).fetchall()
+        if rows:
+            yield rows
+        if len(rows) < n:
+            return
+        if remaining is not None:
+            remaining -= n
+        after = (rows[-1][3], rows[-1][0])
+
+def iter_tasks(after: Optional[tuple] = None, limit: Optional[int] = None, enabled: Optional[bool] = None,
+               window: Optional[tuple] = None, page_size: int = ITER_PAGE_SIZE) -> Iterator[Task]:
+    """
+    Tasks in (scheduled_at, id) order, fetched lazily `page_size` at a time.
+    `after` is the (scheduled_at, id) key to start after (datetime or stored
+    ISO text), `limit` caps the total, `enabled` keeps only enabled/disabled
+    tasks, and `window` is a (start, end) scheduled_at range, end exclusive,
+    where either bound may be None.
+    """
+    for rows in _iter_pages("*", after, limit, enabled, window, page_size):
+        yield from map(_row_to_task, rows)
+
+def iter_task_columns(after: Optional[tuple] = None, limit: Optional[int] = None, enabled: Optional[bool] = None,
+                      window: Optional[tuple] = None, page_size: int = ITER_PAGE_SIZE) -> Iterator[TaskColumns]:
+    """Like iter_tasks, but one TaskColumns per page and no row decoding."""
+    for rows in _iter_pages(TASK_LIST_COLUMNS, after, limit, enabled, window, page_size):
+        yield TaskColumns(rows)
+
+@timed("storage.list_tasks_page")
+def list_tasks_page(after: Optional[tuple] = None, limit: int = 200) -> List[Task]:
+    """Up to `limit` tasks in (scheduled_at, id) order, starting right after the `after` key."""
+    return list(iter_tasks(after, limit, page_size=limit))
+
+@timed("storage.list_task_columns")
+def list_task_columns(after: Optional[tuple] = None, limit: int = 200) -> TaskColumns:
+    """Like list_tasks_page, but column-oriented and without decoding rows."""
+    return next(iter_task_columns(after, limit, page_size=limit), TaskColumns([]))
+
+@timed("storage.get_tasks")
+def get_tasks(task_ids: Iterable[int]) -> List[Task]:
+    ids = list(task_ids)
+    out: List[Task] = []
+    with connect() as con:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur = _tuples(con).execute(f"SELECT * FROM tasks WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            out.extend(_row_to_task(r) for r in cur.fetchall())
+    return out
+
+@timed("storage.get_task")
 def get_task(task_id: int) -> Optional[Task]:
     with connect() as con:
         cur = con.execute("SELECT * FROM tasks WHERE id=?", (task_id,))
         row = cur.fetchone()
         return _row_to_task(row) if row else None
 
+@timed("storage.update_task")
 def update_task(task: Task) -> None:
     with connect() as con:
         con.execute(
-            "UPDATE tasks SET title=?, description=?, scheduled_at=?, repeat=?, enabled=?, last_fired_at=? WHERE id=?",
-            (
-                task.title,
-                task.description,
-                task.scheduled_at.isoformat(timespec="minutes"),
-                task.repeat,
-                1 if task.enabled else 0,
-                task.last_fired_at.isoformat(timespec="minutes") if task.last_fired_at else None,
-                task.id,
-            ),
+            "UPDATE tasks SET title=?, description=?, scheduled_at=?, repeat=?, enabled=?, last_fired_at=?, updated_at=? WHERE id=?",
+            _task_params(task) + (task.id,),
         )
+    _emit("update", task.id)
+
+SQL_SAVE_FIRED = "UPDATE tasks SET scheduled_at=?, enabled=?, last_fired_at=?, updated_at=? WHERE id=?"
+# Above this many rows, save_fired() emits one ('bulk', None) instead of a
+# change event per task, so listeners reload once rather than per row.
+FIRED_EVENT_LIMIT = 100
+
+@timed("storage.save_fired")
+def save_fired(tasks: Iterable[Task]) -> int:
+    """
+    Persist scheduled_at, enabled and last_fired_at of the tasks fired in one
+    scheduler tick with a single executemany transaction. Returns rows written.
+    """
+    stamp = _utcnow()
+    rows = [
+        (_fmt(t.scheduled_at), 1 if t.enabled else 0, _fmt(t.last_fired_at) if t.last_fired_at else None, stamp, t.id)
+        for t in tasks
+    ]
+    if not rows:
+        return 0
+    with connect() as con:
+        con.executemany(SQL_SAVE_FIRED, rows)
+    if len(rows) > FIRED_EVENT_LIMIT:
+        _emit("bulk", None)
+    else:
+        for row in rows:
+            _emit("update", row[-1])
+    return len(rows)
 
+@timed("storage.delete_task")
 def delete_task(task_id: int) -> None:
     with connect() as con:
         con.execute("DELETE FROM tasks WHERE id=?", (task_id,))
+    _emit("delete", task_id)
+
+@timed("storage.task_counts")
+def task_counts() -> dict:
+    with connect() as con:
+        row = con.execute("SELECT COUNT(*) AS total, COALESCE(SUM(enabled), 0) AS enabled FROM tasks").fetchone()
+        return {"total": row["total"], "enabled": row["enabled"]}
+
+@timed("storage.enabled_schedule")
+def enabled_schedule() -> List[tuple]:
+    """(id, scheduled_at) of every enabled task, read from the covering index."""
+    with connect() as con:
+        cur = _tuples(con).execute("SELECT id, scheduled_at FROM tasks WHERE enabled=1")
+        parse = dt.datetime.fromisoformat
+        return [(task_id, parse(at)) for task_id, at in cur.fetchall()]
 
+@timed("storage.due_tasks")
 def due_tasks(now: dt.datetime, horizon_minutes: int = 1):
     with connect() as con:
-        cur = con.execute(
-            "SELECT * FROM tasks WHERE enabled=1 AND datetime(scheduled_at) <= datetime(?)",
-            (now.isoformat(timespec="minutes"),),
-        )
+        cur = _tuples(con).execute(SQL_DUE_TASKS, (_fmt(now),))
         tasks = [_row_to_task(r) for r in cur.fetchall()]
     res = []
     horizon = now - dt.timedelta(minutes=horizon_minutes)
@@ -106,21 +546,416 @@ def due_tasks(now: dt.datetime, horizon_minutes: int = 1):
             res.append(t)
     return res
 
+# --- Bulk import / export ---
+BULK_CHUNK_SIZE = 1000
+
+SQL_INSERT_TASK_UNIQUE = """
+INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, last_fired_at, updated_at)
+SELECT ?,?,?,?,?,?,? WHERE NOT EXISTS (SELECT 1 FROM tasks WHERE scheduled_at=? AND title=? AND repeat=?)
+"""
+
+@timed("storage.bulk_add_tasks")
+def bulk_add_tasks(tasks: Iterable[Task], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """
+    Insert tasks with executemany, one transaction per chunk, skipping any
+    whose (title, scheduled_at, repeat) already exists. Returns rows inserted.
+    """
+    con = connect()
+    inserted = 0
+    it = iter(tasks)
+    while True:
+        chunk = list(itertools.islice(it, chunk_size))
+        if not chunk:
+            break
+        params = [p + (p[2], p[0], p[3]) for p in map(_task_params, chunk)]
+        with con:
+            # rowcount, unlike total_changes, leaves out rows written by triggers
+            inserted += con.executemany(SQL_INSERT_TASK_UNIQUE, params).rowcount
+    if inserted:
+        _emit("bulk", None)
+    return inserted
+
+def iter_export(chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[Task]:
+    """Stream every task in id order without materializing the table."""
+    cur = _tuples(connect()).execute("SELECT * FROM tasks ORDER BY id")
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        for r in rows:
+            yield _row_to_task(r)
+
+# --- Google sync bookkeeping ---
+LINK_FIELDS = ("gtask_id", "gtask_etag", "gtask_updated", "event_id", "event_etag", "event_updated")
+
+@timed("storage.get_sync_state")
+def get_sync_state(key: str, default: Optional[str] = None) -> Optional[str]:
+    with connect() as con:
+        row = con.execute("SELECT value FROM sync_state WHERE key=?", (key,)).fetchone()
+        return row["value"] if row else default
+
+@timed("storage.set_sync_state")
+def set_sync_state(key: str, value: Optional[str]) -> None:
+    with connect() as con:
+        con.execute("INSERT INTO sync_state(key, value) VALUES (?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, value))
+
+@timed("storage.get_link")
+def get_link(task_id: int) -> Optional[dict]:
+    with connect() as con:
+        row = con.execute("SELECT * FROM google_links WHERE task_id=?", (task_id,)).fetchone()
+        return dict(row) if row else None
+
+@timed("storage.find_link")
+def find_link(gtask_id: Optional[str] = None, event_id: Optional[str] = None) -> Optional[dict]:
+    with connect() as con:
+        if gtask_id is not None:
+            row = con.execute("SELECT * FROM google_links WHERE gtask_id=?", (gtask_id,)).fetchone()
+        else:
+            row = con.execute("SELECT * FROM google_links WHERE event_id=?", (event_id,)).fetchone()
+        return dict(row) if row else None
+
+@timed("storage.save_link")
+def save_link(task_id: int, reconciled: bool = True, **fields) -> None:
+    """
+    Create or update the link row for `task_id`. With `reconciled`, the task's
+    current updated_at is recorded as synced so the change is not pushed back.
+    """
+    unknown = set(fields) - set(LINK_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown link fields: {sorted(unknown)}")
+    cols = sorted(fields)
+    synced = "COALESCE((SELECT updated_at FROM tasks WHERE id=?), '')" if reconciled else "''"
+    updates = "".join(f", {c}=excluded.{c}" for c in cols)
+    if reconciled:
+        updates = ", synced_at=excluded.synced_at" + updates
+    with connect() as con:
+        con.execute(
+            f"INSERT INTO google_links(task_id, synced_at{''.join(', ' + c for c in cols)}) "
+            f"VALUES (?, {synced}{', ?' * len(cols)}) "
+            f"ON CONFLICT(task_id) DO UPDATE SET task_id=excluded.task_id{updates}",
+            (task_id, *((task_id,) if reconciled else ()), *(fields[c] for c in cols)),
+        )
+
+@timed("storage.delete_link")
+def delete_link(task_id: int) -> None:
+    with connect() as con:
+        con.execute("DELETE FROM google_links WHERE task_id=?", (task_id,))
+
+@timed("storage.task_updated_at")
+def task_updated_at(task_id: int) -> Optional[str]:
+    with connect() as con:
+        row = con.execute("SELECT updated_at FROM tasks WHERE id=?", (task_id,)).fetchone()
+        return row["updated_at"] if row else None
+
+@timed("storage.tasks_to_push")
+def tasks_to_push(watermark: str = "") -> List[tuple]:
+    """
+    (task, link or None, updated_at) for tasks written locally after
+    `watermark` and not yet reconciled with Google, oldest first.
+    """
+    with connect() as con:
+        cur = con.execute(
+            "SELECT t.*, l.task_id AS link_task_id, " + ", ".join(f"l.{c} AS link_{c}" for c in LINK_FIELDS) + ", l.synced_at AS link_synced_at "
+            "FROM tasks t LEFT JOIN google_links l ON l.task_id=t.id "
+            "WHERE t.updated_at > ? AND (l.task_id IS NULL OR t.updated_at > l.synced_at) ORDER BY t.updated_at",
+            (watermark,),
+        )
+        out = []
+        for r in cur.fetchall():
+            link = None
+            if r["link_task_id"] is not None:
+                link = {c: r[f"link_{c}"] for c in LINK_FIELDS}
+                link["task_id"], link["synced_at"] = r["link_task_id"], r["link_synced_at"]
+            out.append((_row_to_task(r), link, r["updated_at"]))
+        return out
+
+@timed("storage.unlinked_tasks")
+def unlinked_tasks(link_column: str) -> List[Task]:
+    """Tasks with no Google id in `link_column` ('gtask_id' or 'event_id')."""
+    if link_column not in ("gtask_id", "event_id"):
+        raise ValueError(f"not a link id column: {link_column}")
+    with connect() as con:
+        cur = _tuples(con).execute(
+            f"SELECT t.* FROM tasks t LEFT JOIN google_links l ON l.task_id=t.id WHERE l.{link_column} IS NULL ORDER BY t.id"
+        )
+        return [_row_to_task(r) for r in cur.fetchall()]
+
+@timed("storage.orphan_links")
+def orphan_links() -> List[dict]:
+    """Links whose local task has been deleted."""
+    with connect() as con:
+        cur = con.execute("SELECT l.* FROM google_links l LEFT JOIN tasks t ON t.id=l.task_id WHERE t.id IS NULL")
+        return [dict(r) for r in cur.fetchall()]
+
+# --- Occurrences in a time window ---
+# One-shot tasks are read as packed OccurrenceList keys (minutes since
+# 1970-01-01 << 32 | id) computed by SQLite, which reads the naive stored
+# time as UTC exactly like recurrence.to_minute does; the partial index
+# covers the query. Their rows are loaded only when read.
+SQL_WINDOW_ONE_SHOT = ("SELECT (CAST(strftime('%s', scheduled_at) AS INTEGER) / 60) << 32 | id FROM tasks "
+                       "WHERE enabled=1 AND repeat='none' AND scheduled_at>=? AND scheduled_at<?")
+SQL_WINDOW_RECURRING = "SELECT * FROM tasks WHERE enabled=1 AND repeat!='none' AND scheduled_at<?"
+
+def _periodic_keys(starts: List[int], step: int, stop: int) -> List[int]:
+    """
+    Sorted union of range(s, stop, step) over packed keys `starts`. Series
+    with one step repeat the same pattern every period, so each period is the
+    sorted pattern shifted by one step; series starting later join it in the
+    period they start in. Nothing is compared per occurrence.
+    """
+    bits = OccurrenceList.ID_BITS
+    starts.sort()
+    base, period = starts[0] >> bits, step >> bits
+    joins: dict = {}
+    for s in starts:
+        k = ((s >> bits) - base) // period
+        joins.setdefault(k, []).append(s - k * step)
+    out: List[int] = []
+    pattern: List[int] = []
+    k, shift, first = 0, 0, starts[0]
+    while first + shift < stop:
+        if k in joins:
+            pattern = sorted(pattern + joins[k])
+        out.extend(map(shift.__add__, pattern))
+        k += 1
+        shift += step
+    del out[bisect.bisect_left(out, stop):]
+    return out
+
+@timed("storage.occurrences_between")
+def _ceil_to_minute(d: dt.datetime) -> dt.datetime:
+    floor = d.replace(second=0, microsecond=0)
+    return floor if floor == d else floor + dt.timedelta(minutes=1)
+
+def occurrences_between(start: dt.datetime, end: dt.datetime, limit: Optional[int] = None) -> OccurrenceList:
+    """
+    Every occurrence of an enabled task in [start, end), in time order (ties by
+    task id); only the first `limit` if given. One-shot tasks are read off
+    idx_tasks_one_shot and recurring ones off the next-fire index.
+    Occurrences are packed ints built from recurrence.minute_ranges, grouped
+    by step so each group comes out sorted (_periodic_keys); only those few
+    runs are merged. No per-occurrence objects exist until they are read.
+    """
+    bits = OccurrenceList.ID_BITS
+    with connect() as con:
+        # Stored times are whole minutes: the ones in [start, end) are those
+        # in [ceil(start), ceil(end)), which the minute strings compare exactly.
+        lo, hi = _fmt(_ceil_to_minute(start)), _fmt(_ceil_to_minute(end))
+        singles = [k for k, in _tuples(con).execute(SQL_WINDOW_ONE_SHOT, (lo, hi))]
+        recurring = [_row_to_task(r) for r in _tuples(con).execute(SQL_WINDOW_RECURRING, (hi,))]
+    stop = (to_minute(end - dt.timedelta(microseconds=1)) + 1) << bits  # first minute not before end
+    by_step: dict = {}
+    for t in recurring:
+        rule = parse_rule(t.repeat)
+        if rule is None:  # unknown rule: fires once, like the scheduler does
+            if t.scheduled_at >= start:
+                singles.append(to_minute(t.scheduled_at) << bits | t.id)
+            continue
+        for r in minute_ranges(rule, t.scheduled_at, start, end):
+            if len(r) == 1:
+                singles.append(r.start << bits | t.id)
+            elif r:
+                by_step.setdefault(r.step, []).append(r.start << bits | t.id)
+    singles.sort()
+    keys = singles
+    for step, starts in by_step.items():
+        keys += _periodic_keys(starts, step << bits, stop)
+    if by_step:
+        keys.sort()  # a handful of sorted runs: merged, not re-sorted
+    if limit is not None:
+        del keys[limit:]
+    return OccurrenceList(keys, {t.id: t for t in recurring}, get_tasks)
+
+def iter_occurrences(start: dt.datetime, end: dt.datetime) -> Iterator[Occurrence]:
+    """occurrences_between(start, end), one Occurrence at a time."""
+    return iter(occurrences_between(start, end))
+
+# --- Full-text search ---
+SEARCH_WEIGHTS = (10.0, 1.0)  # bm25 weight of title, description
+SQL_SEARCH = f"""
+SELECT t.* FROM (
+    SELECT rowid, bm25(tasks_fts, {SEARCH_WEIGHTS[0]}, {SEARCH_WEIGHTS[1]}) AS score
+    FROM tasks_fts WHERE tasks_fts MATCH ? ORDER BY score LIMIT ?
+) m JOIN tasks t ON t.id = m.rowid ORDER BY m.score, t.scheduled_at
+"""
+
+def _fts_query(text: str) -> str:
+    """Every word of `text` as a quoted prefix term, all required: 'gym lu' -> '"gym"* "lu"*'."""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+def _has_fts(con) -> bool:
+    return con.execute("SELECT 1 FROM sqlite_master WHERE name='tasks_fts'").fetchone() is not None
+
+@timed("storage.search_tasks")
+def search_tasks(query: str, limit: int = 50) -> List[Task]:
+    """
+    Tasks whose title or description contain words starting with each word of
+    `query` (case and accent insensitive), best matches first; title matches
+    outrank description matches. Empty queries return [].
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    with connect() as con:
+        if _has_fts(con):
+            cur = _tuples(con).execute(SQL_SEARCH, (match, limit))
+        else:
+            words = query.split()
+            where = " AND ".join("(title LIKE ? OR description LIKE ?)" for _ in words)
+            params = [p for w in words for p in (f"%{w}%", f"%{w}%")]
+            cur = _tuples(con).execute(f"SELECT * FROM tasks WHERE {where} ORDER BY scheduled_at, id LIMIT ?", (*params, limit))
+        return [_row_to_task(r) for r in cur.fetchall()]
+
 # --- Tabata helpers ---
+SQL_TABATA_ROLLUP = """
+INSERT INTO tabata_daily(day, sessions, rounds, work_sec, rest_sec) VALUES (?,1,?,?,?)
+ON CONFLICT(day) DO UPDATE SET
+    sessions=sessions+1,
+    rounds=rounds+excluded.rounds,
+    work_sec=work_sec+excluded.work_sec,
+    rest_sec=rest_sec+excluded.rest_sec
+"""
+
+@timed("storage.add_tabata_session")
 def add_tabata_session(started_at: dt.datetime, rounds: int, work_sec: int, rest_sec: int, completed: bool = True) -> int:
     with connect() as con:
         cur = con.execute(
             "INSERT INTO tabata_sessions(started_at, rounds, work_sec, rest_sec, completed) VALUES (?,?,?,?,?)",
-            (started_at.isoformat(timespec="minutes"), rounds, work_sec, rest_sec, 1 if completed else 0),
+            (_fmt(started_at), rounds, work_sec, rest_sec, 1 if completed else 0),
         )
+        if completed:
+            con.execute(SQL_TABATA_ROLLUP, (started_at.date().isoformat(), rounds, rounds * work_sec, max(rounds - 1, 0) * rest_sec))
         return cur.lastrowid
 
+SQL_COUNT_TABATAS = "SELECT sessions FROM tabata_daily WHERE day=?"
+
+@timed("storage.count_tabatas_on")
 def count_tabatas_on(day: dt.date) -> int:
-    day_str = day.strftime("%Y-%m-%d")
+    with connect() as con:
+        row = con.execute(SQL_COUNT_TABATAS, (day.isoformat(),)).fetchone()
+        return int(row["sessions"]) if row else 0
+
+ROLLUP_BUCKETS = {
+    "day": "day",
+    "week": "date(day, '-6 days', 'weekday 1')",  # Monday of the week
+    "month": "substr(day, 1, 7)",
+}
+
+@timed("storage.tabata_stats")
+def tabata_stats(start: dt.date, end: dt.date, bucket: str = "day") -> List[dict]:
+    """
+    Totals of completed sessions per bucket ('day', 'week' keyed by its Monday,
+    or 'month' as 'YYYY-MM') for start..end inclusive, from the daily rollup.
+    Buckets without sessions are omitted.
+    """
+    if bucket not in ROLLUP_BUCKETS:
+        raise ValueError(f"unknown bucket: {bucket!r}")
+    key = ROLLUP_BUCKETS[bucket]
     with connect() as con:
         cur = con.execute(
-            "SELECT COUNT(*) AS c FROM tabata_sessions WHERE date(started_at)=date(?) AND completed=1",
-            (day_str,),
+            f"SELECT {key} AS bucket, SUM(sessions) AS sessions, SUM(rounds) AS rounds, "
+            "SUM(work_sec) AS work_sec, SUM(rest_sec) AS rest_sec "
+            f"FROM tabata_daily WHERE day BETWEEN ? AND ? GROUP BY {key} ORDER BY bucket",
+            (start.isoformat(), end.isoformat()),
         )
-        row = cur.fetchone()
-        return int(row["c"] if row else 0)
+        return [dict(r) for r in cur.fetchall()]
+
+# --- Pomodoro history ---
+SQL_POMODORO_ROLLUP = """
+INSERT INTO pomodoro_daily(day, pomodoros, focus_sec, break_sec, interrupted) VALUES (?,?,?,?,?)
+ON CONFLICT(day) DO UPDATE SET
+    pomodoros=pomodoros+excluded.pomodoros,
+    focus_sec=focus_sec+excluded.focus_sec,
+    break_sec=break_sec+excluded.break_sec,
+    interrupted=interrupted+excluded.interrupted
+"""
+
+@timed("storage.add_pomodoro_phases")
+def add_pomodoro_phases(phases: Iterable[FocusPhase]) -> int:
+    """Store phases and fold them into the daily rollup, in one transaction."""
+    phases = list(phases)
+    days: dict = {}
+    for p in phases:
+        work = p.kind == "work"
+        d = days.setdefault(p.started_at.date().isoformat(), [0, 0.0, 0.0, 0])
+        d[0] += int(work and not p.interrupted)
+        d[1 if work else 2] += p.actual_sec
+        d[3] += int(p.interrupted)
+    with connect() as con:
+        con.executemany(
+            "INSERT INTO pomodoro_sessions(started_at, ended_at, kind, number, planned_sec, actual_sec, paused_sec, interrupted) "
+            "VALUES (?,?,?,?,?,?,?,?)",
+            [(p.started_at.isoformat(timespec="seconds"), p.ended_at.isoformat(timespec="seconds"), p.kind, p.number,
+              p.planned_sec, p.actual_sec, p.paused_sec, int(p.interrupted)) for p in phases],
+        )
+        con.executemany(SQL_POMODORO_ROLLUP, [(day, *totals) for day, totals in days.items()])
+    return len(phases)
+
+SQL_POMODORO_DAY = "SELECT pomodoros, focus_sec FROM pomodoro_daily WHERE day=?"
+
+@timed("storage.pomodoro_on")
+def pomodoro_on(day: dt.date) -> tuple:
+    """(completed pomodoros, focus seconds) on `day`, from the daily rollup."""
+    with connect() as con:
+        row = _tuples(con).execute(SQL_POMODORO_DAY, (day.isoformat(),)).fetchone()
+        return row if row else (0, 0.0)
+
+@timed("storage.pomodoro_stats")
+def pomodoro_stats(start: dt.date, end: dt.date, bucket: str = "day") -> List[dict]:
+    """Per-bucket Pomodoro totals for start..end inclusive, like tabata_stats()."""
+    if bucket not in ROLLUP_BUCKETS:
+        raise ValueError(f"unknown bucket: {bucket!r}")
+    key = ROLLUP_BUCKETS[bucket]
+    with connect() as con:
+        cur = con.execute(
+            f"SELECT {key} AS bucket, SUM(pomodoros) AS pomodoros, SUM(focus_sec) AS focus_sec, "
+            "SUM(break_sec) AS break_sec, SUM(interrupted) AS interrupted "
+            f"FROM pomodoro_daily WHERE day BETWEEN ? AND ? GROUP BY {key} ORDER BY bucket",
+            (start.isoformat(), end.isoformat()),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+class BatchWriter(threading.Thread):
+    """
+    Runs write(items) on its own thread for everything passed to submit(), so
+    callers (the Tk thread) never wait on SQLite. Items that queue up while a
+    write is in progress, or within `linger` seconds of the first, go into
+    the same call. on_written(items) runs on the writer thread afterwards.
+    """
+
+    def __init__(self, write: Callable[[list], object], on_written: Optional[Callable[[list], None]] = None, linger: float = 0.2):
+        super().__init__(daemon=True, name="storage-writer")
+        self.write = write
+        self.on_written = on_written
+        self.linger = linger
+        self._queue: queue.Queue = queue.Queue()
+
+    def submit(self, item) -> None:
+        self._queue.put(item)
+
+    def stop(self, timeout: Optional[float] = 2.0) -> None:
+        """Write whatever is queued and exit."""
+        self._queue.put(None)
+        self.join(timeout)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.linger
+            while True:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [b for b in batch if b is not None]
+            if not batch:
+                continue
+            try:
+                self.write(batch)
+                if self.on_written is not None:
+                    self.on_written(batch)
+            except Exception as e:
+                print("[storage] batch write failed:", e)
@@ -0,0 +1,145 @@
+"""
+Headless interval-program engine shared by the Timer and Tabata tabs.
+
+A program is a declarative list of phases. Phase deadlines are computed from a
+monotonic clock and chained (each deadline is the previous one plus the phase
+length), so late UI callbacks never make the countdown drift.
+"""
+from __future__ import annotations
+import math, time, datetime as dt
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+from .models import FocusPhase
+
+WORK = "work"
+REST = "rest"
+
+@dataclass(frozen=True)
+class Phase:
+    name: str    # WORK | REST
+    seconds: int
+    number: int  # 1-based cycle/round this phase belongs to
+
+def pomodoro(work_sec: int, break_sec: int, cycles: int) -> List[Phase]:
+    """work, break, work, ..., work: the last work block ends the program."""
+    phases: List[Phase] = []
+    for n in range(1, cycles + 1):
+        phases.append(Phase(WORK, work_sec, n))
+        if n < cycles:
+            phases.append(Phase(REST, break_sec, n))
+    return phases
+
+def tabata(work_sec: int, rest_sec: int, rounds: int) -> List[Phase]:
+    return pomodoro(work_sec, rest_sec, rounds)
+
+class IntervalProgram:
+    def __init__(self, phases: Sequence[Phase], clock: Callable[[], float] = time.monotonic):
+        if not phases:
+            raise ValueError("an interval program needs at least one phase")
+        self.phases = list(phases)
+        self.clock = clock
+        self.index = 0
+        self.running = False
+        self.finished = False
+        self._deadline = 0.0
+        self._left = float(self.phases[0].seconds)
+
+    @property
+    def current(self) -> Optional[Phase]:
+        return None if self.finished else self.phases[self.index]
+
+    def start(self) -> None:
+        """Start, or resume after pause()."""
+        if self.running or self.finished:
+            return
+        self._deadline = self.clock() + self._left
+        self.running = True
+
+    def pause(self) -> None:
+        if not self.running:
+            return
+        self._left = max(0.0, self._deadline - self.clock())
+        self.running = False
+
+    def remaining(self) -> float:
+        """Seconds left in the current phase."""
+        if self.finished:
+            return 0.0
+        if self.running:
+            return max(0.0, self._deadline - self.clock())
+        return self._left
+
+    def display_seconds(self) -> int:
+        return math.ceil(self.remaining())
+
+    def poll(self) -> List[Phase]:
+        """Advance past every phase whose deadline has passed; returns those phases in order."""
+        ended: List[Phase] = []
+        if not self.running:
+            return ended
+        now = self.clock()
+        while self.running and now >= self._deadline:
+            ended.append(self.phases[self.index])
+            self.index += 1
+            if self.index >= len(self.phases):
+                self.running = False
+                self.finished = True
+                self._left = 0.0
+            else:
+                self._deadline += self.phases[self.index].seconds
+        return ended
+
+    def poll_transitions(self) -> List[Tuple[Phase, Optional[Phase]]]:
+        """poll(), pairing each ended phase with the one that followed it (None after the last)."""
+        first = self.index
+        return [(phase, self.phases[i] if i < len(self.phases) else None)
+                for i, phase in enumerate(self.poll(), first + 1)]
+
+class PhaseRecorder:
+    """
+    Turns the phases a program goes through into FocusPhase records. Wall
+    times are derived from the start time plus counted-down and paused
+    seconds, so phases that ended while the UI was asleep get their real
+    boundaries rather than the time the UI noticed.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, wall: Callable[[], dt.datetime] = dt.datetime.now):
+        self.clock = clock
+        self.wall = wall
+        self.phase: Optional[Phase] = None
+        self._started: Optional[dt.datetime] = None
+        self._paused = 0.0
+        self._paused_at: Optional[float] = None
+
+    def begin(self, phase: Phase, at: Optional[dt.datetime] = None) -> None:
+        self.phase = phase
+        self._started = at or self.wall()
+        self._paused = 0.0
+        self._paused_at = None
+
+    def pause(self) -> None:
+        if self.phase is not None and self._paused_at is None:
+            self._paused_at = self.clock()
+
+    def resume(self) -> None:
+        if self._paused_at is not None:
+            self._paused += self.clock() - self._paused_at
+            self._paused_at = None
+
+    def end(self, remaining: float = 0.0, interrupted: bool = False) -> Optional[FocusPhase]:
+        """Close the current phase (`remaining` seconds short of its length)."""
+        if self.phase is None:
+            return None
+        self.resume()
+        phase, self.phase = self.phase, None
+        actual = max(0.0, phase.seconds - remaining)
+        return FocusPhase(
+            started_at=self._started,
+            ended_at=self._started + dt.timedelta(seconds=actual + self._paused),
+            kind=phase.name,
+            number=phase.number,
+            planned_sec=phase.seconds,
+            actual_sec=actual,
+            paused_sec=self._paused,
+            interrupted=interrupted,
+        )
@@ -0,0 +1,238 @@
+"""
+Streaming import/export of agenda tasks as CSV, JSON Lines or iCalendar.
+
+    python -m app.transfer import tareas.csv
+    python -m app.transfer export tareas.ics
+"""
+from __future__ import annotations
+import csv, json, sys, pathlib, datetime as dt
+from typing import Iterable, Iterator, IO, Optional, Tuple, Union
+from .models import Task, TaskColumns
+from .recurrence import KEYWORDS, parse_rule, to_rrule
+from .utils import parse_iso_local
+from . import storage
+
+CSV_FIELDS = ("title", "description", "scheduled_at", "repeat", "enabled")
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "")
+
+def _task_from_dict(d: dict) -> Task:
+    return Task(
+        id=None,
+        title=d["title"],
+        description=d.get("description") or "",
+        scheduled_at=parse_iso_local(d["scheduled_at"]),
+        repeat=d.get("repeat") or "none",
+        enabled=_parse_bool(d.get("enabled", True)),
+    )
+
+def _task_to_dict(t: Task) -> dict:
+    return {
+        "title": t.title,
+        "description": t.description,
+        "scheduled_at": t.scheduled_at.isoformat(timespec="minutes"),
+        "repeat": t.repeat,
+        "enabled": t.enabled,
+    }
+
+# -------------------- CSV / JSON Lines --------------------
+def read_csv(fp: IO[str]) -> Iterator[Task]:
+    for row in csv.DictReader(fp):
+        yield _task_from_dict(row)
+
+def _column_dicts(chunks: Iterable[TaskColumns]) -> Iterator[dict]:
+    """Export dicts straight from column reads, without building Task objects."""
+    for c in chunks:
+        for title, description, at, repeat, enabled in zip(c.title, c.description, c.scheduled_at, c.repeat, c.enabled):
+            yield {"title": title, "description": description or "", "scheduled_at": at, "repeat": repeat, "enabled": bool(enabled)}
+
+# The CSV / JSON Lines writers take Task objects or dicts shaped like
+# _task_to_dict's output.
+def write_csv(tasks: Iterable[Union[Task, dict]], fp: IO[str]) -> int:
+    w = csv.DictWriter(fp, fieldnames=CSV_FIELDS)
+    w.writeheader()
+    n = 0
+    for t in tasks:
+        d = dict(t) if isinstance(t, dict) else _task_to_dict(t)
+        d["enabled"] = 1 if d["enabled"] else 0
+        w.writerow(d)
+        n += 1
+    return n
+
+def read_jsonl(fp: IO[str]) -> Iterator[Task]:
+    for line in fp:
+        if line.strip():
+            yield _task_from_dict(json.loads(line))
+
+def write_jsonl(tasks: Iterable[Union[Task, dict]], fp: IO[str]) -> int:
+    n = 0
+    for t in tasks:
+        fp.write(json.dumps(t if isinstance(t, dict) else _task_to_dict(t), ensure_ascii=False) + "\n")
+        n += 1
+    return n
+
+# -------------------- iCalendar (RFC 5545 subset) --------------------
+ICS_STAMP_FMT = "%Y%m%dT%H%M%S"
+
+def _ics_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _ics_unescape(text: str) -> str:
+    out, i = [], 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+def _ics_fold(line: str) -> str:
+    # Lines are limited to 75 octets; continuation lines start with a space.
+    parts, cur = [], b""
+    for ch in line:
+        b = ch.encode("utf-8")
+        if len(cur) + len(b) > (75 if not parts else 74):
+            parts.append(cur.decode("utf-8"))
+            cur = b""
+        cur += b
+    parts.append(cur.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+def _ics_datetime(value: str, params: str) -> dt.datetime:
+    if "VALUE=DATE" in params.upper() or len(value) == 8:
+        return dt.datetime.strptime(value[:8], "%Y%m%d")
+    if value.endswith("Z"):
+        utc = dt.datetime.strptime(value[:-1], ICS_STAMP_FMT).replace(tzinfo=dt.timezone.utc)
+        return utc.astimezone().replace(tzinfo=None)
+    # TZID-qualified times are taken as local wall-clock time.
+    return dt.datetime.strptime(value, ICS_STAMP_FMT)
+
+def _repeat_from_rrule(value: str) -> str:
+    rule = parse_rule(value)
+    if rule is None:
+        return "none"
+    for keyword, known in KEYWORDS.items():
+        if known == rule:
+            return keyword
+    return to_rrule(value)
+
+def _ics_lines(fp: IO[str]) -> Iterator[str]:
+    buf: Optional[str] = None
+    for raw in fp:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and buf is not None:
+            buf += line[1:]
+            continue
+        if buf is not None:
+            yield buf
+        buf = line
+    if buf is not None:
+        yield buf
+
+def read_ics(fp: IO[str]) -> Iterator[Task]:
+    event: Optional[dict] = None
+    for line in _ics_lines(fp):
+        name, _, value = line.partition(":")
+        name, _, params = name.partition(";")
+        name = name.upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            if "SUMMARY" in event and "DTSTART" in event:
+                yield Task(
+                    id=None,
+                    title=event["SUMMARY"],
+                    description=event.get("DESCRIPTION", ""),
+                    scheduled_at=event["DTSTART"],
+                    repeat=_repeat_from_rrule(event["RRULE"]) if "RRULE" in event else "none",
+                    enabled=event.get("X-PT-ENABLED", "1") != "0",
+                )
+            event = None
+        elif event is not None:
+            if name == "DTSTART":
+                event[name] = _ics_datetime(value, params)
+            elif name in ("SUMMARY", "DESCRIPTION"):
+                event[name] = _ics_unescape(value)
+            elif name in ("RRULE", "X-PT-ENABLED"):
+                event[name] = value
+
+def write_ics(tasks: Iterable[Task], fp: IO[str]) -> int:
+    stamp = dt.datetime.now(dt.timezone.utc).strftime(ICS_STAMP_FMT) + "Z"
+    fp.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//productivity_timer_agenda//ES\r\n")
+    n = 0
+    for t in tasks:
+        fp.write("BEGIN:VEVENT\r\n")
+        fp.write(f"UID:task-{t.id}-{t.scheduled_at.strftime(ICS_STAMP_FMT)}@productivity-timer\r\n")
+        fp.write(f"DTSTAMP:{stamp}\r\n")
+        fp.write(f"DTSTART:{t.scheduled_at.strftime(ICS_STAMP_FMT)}\r\n")
+        fp.write(_ics_fold("SUMMARY:" + _ics_escape(t.title)))
+        if t.description:
+            fp.write(_ics_fold("DESCRIPTION:" + _ics_escape(t.description)))
+        rrule = to_rrule(t.repeat)
+        if rrule:
+            fp.write(f"RRULE:{rrule}\r\n")
+        if not t.enabled:
+            fp.write("X-PT-ENABLED:0\r\n")
+        fp.write("END:VEVENT\r\n")
+        n += 1
+    fp.write("END:VCALENDAR\r\n")
+    return n
+
+# -------------------- Files --------------------
+FORMATS = {
+    ".csv": (read_csv, write_csv),
+    ".jsonl": (read_jsonl, write_jsonl),
+    ".ics": (read_ics, write_ics),
+}
+
+def _format_for(path) -> tuple:
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Formato no soportado: {suffix or path} (usa .csv, .jsonl o .ics)")
+    return FORMATS[suffix]
+
+def import_file(path) -> Tuple[int, int]:
+    """Import tasks from `path`; returns (rows read, rows inserted)."""
+    reader, _ = _format_for(path)
+    read = 0
+    def counted(tasks):
+        nonlocal read
+        for t in tasks:
+            read += 1
+            yield t
+    newline = "" if str(path).lower().endswith(".csv") else None
+    with open(path, "r", encoding="utf-8-sig", newline=newline) as fp:
+        inserted = storage.bulk_add_tasks(counted(reader(fp)))
+    return read, inserted
+
+def export_file(path) -> int:
+    """Export every task to `path`; returns rows written."""
+    _, writer = _format_for(path)
+    newline = "" if pathlib.Path(path).suffix.lower() in (".csv", ".ics") else None
+    with open(path, "w", encoding="utf-8", newline=newline) as fp:
+        if writer is write_ics:
+            return writer(storage.iter_tasks(), fp)
+        return writer(_column_dicts(storage.iter_task_columns()), fp)
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] not in ("import", "export"):
+        print("uso: python -m app.transfer import|export ARCHIVO.(csv|jsonl|ics)", file=sys.stderr)
+        return 2
+    action, path = argv
+    if action == "import":
+        read, inserted = import_file(path)
+        print(f"{inserted} tareas importadas ({read - inserted} duplicadas omitidas)")
+    else:
+        print(f"{export_file(path)} tareas exportadas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,3 +11,10 @@ def parse_datetime(s: str) -> dt.datetime | None:
 
 def now() -> dt.datetime:
     return dt.datetime.now()
+
+def parse_iso_local(s: str) -> dt.datetime:
+    """ISO 8601 time as local naive time to the minute; offsets ('Z', '+02:00') are converted."""
+    value = dt.datetime.fromisoformat(s.strip())
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.replace(second=0, microsecond=0)
@@ -0,0 +1,51 @@
+"""Peak RSS of reading every task: list_tasks() vs the keyset iterators.
+
+Each mode runs in a fresh interpreter so ru_maxrss is its own peak.
+Run from the repository root:  python -m benchmarks.bench_iter [N]
+"""
+from __future__ import annotations
+import sys, time, subprocess, tempfile, pathlib, datetime as dt
+from app import storage
+
+MODES = {
+    "baseline (connect only)": "storage.connect()",
+    "list_tasks()": "n = len(storage.list_tasks())",
+    "iter_tasks()": "n = sum(1 for _ in storage.iter_tasks())",
+    "iter_task_columns()": "n = sum(len(c) for c in storage.iter_task_columns())",
+    "export .csv": "n = transfer.export_file(pathlib.Path(db).with_suffix('.csv'))",
+}
+
+CHILD = """
+import sys, time, pathlib, resource
+from app import storage, transfer
+db = sys.argv[1]
+storage.DB_PATH = pathlib.Path(db)
+t0 = time.perf_counter()
+{stmt}
+print(time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def seed(n: int) -> None:
+    base = dt.datetime(2025, 1, 1)
+    con = storage.connect()
+    with con:
+        con.executemany(
+            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, updated_at) VALUES (?,?,?,?,?,?)",
+            ((f"Task {i}", "", storage._fmt(base + dt.timedelta(minutes=(i * 7919) % 525600)), "daily", 1, "") for i in range(n)),
+        )
+    storage.close_all()
+
+def main(n: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = pathlib.Path(tmp) / "bench.sqlite"
+        storage.DB_PATH = db
+        t0 = time.perf_counter()
+        seed(n)
+        print(f"seeded {n} tasks in {time.perf_counter() - t0:.1f} s")
+        for name, stmt in MODES.items():
+            out = subprocess.run([sys.executable, "-c", CHILD.format(stmt=stmt), str(db)], capture_output=True, text=True, check=True)
+            seconds, maxrss_kb = out.stdout.split()
+            print(f"{name:24s} {float(seconds) * 1000:9.0f} ms   peak RSS {int(maxrss_kb) / 1024:8.1f} MiB")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
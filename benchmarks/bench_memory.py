@@ -0,0 +1,65 @@
+"""Bulk read time and tracemalloc peak: dataclass Tasks built from sqlite3.Row
+(the old decoding) vs slotted Tasks from tuple rows vs TaskColumns.
+
+Run from the repository root:  python -m benchmarks.bench_memory [N]
+"""
+from __future__ import annotations
+import sys, time, tracemalloc, tempfile, pathlib, datetime as dt
+from dataclasses import dataclass
+from typing import Optional
+from app import storage
+from benchmarks.bench_storage import seed
+
+@dataclass
+class LegacyTask:
+    id: Optional[int]
+    title: str
+    description: str
+    scheduled_at: dt.datetime
+    repeat: str
+    enabled: bool = True
+    last_fired_at: Optional[dt.datetime] = None
+
+def legacy_list_tasks():
+    cur = storage.connect().execute(storage.SQL_LIST_TASKS)
+    return [
+        LegacyTask(
+            id=r["id"], title=r["title"], description=r["description"] or "",
+            scheduled_at=dt.datetime.fromisoformat(r["scheduled_at"]), repeat=r["repeat"], enabled=bool(r["enabled"]),
+            last_fired_at=dt.datetime.fromisoformat(r["last_fired_at"]) if r["last_fired_at"] else None,
+        )
+        for r in cur.fetchall()
+    ]
+
+def profile(fn):
+    """(seconds, peak MiB, retained MiB) for one call."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return seconds, peak / 2**20, retained / 2**20
+
+def main(n: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = pathlib.Path(tmp) / "bench.sqlite"
+        seed(n, dt.datetime(2025, 1, 1))
+        cases = (
+            ("legacy dataclass + Row", legacy_list_tasks),
+            ("slotted Task, tuple rows", storage.list_tasks),
+            ("TaskColumns", lambda: storage.list_task_columns(None, n)),
+        )
+        print(f"{n} tasks   (time without tracing; peak/retained with tracemalloc)")
+        for name, fn in cases:
+            fn()  # warm the statement and parse caches
+            t0 = time.perf_counter()
+            fn()
+            untraced = time.perf_counter() - t0
+            _, peak, retained = profile(fn)
+            print(f"{name:24s} {untraced * 1000:8.1f} ms   peak {peak:7.1f} MiB   retained {retained:7.1f} MiB")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
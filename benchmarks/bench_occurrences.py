@@ -0,0 +1,59 @@
+"""Calendar window expansion: walking every task with next_occurrence vs storage.occurrences_between.
+
+occurrences_between returns packed keys; the last column adds building an
+Occurrence for every one of them, which is what dominates a full year.
+
+Run from the repository root:  python -m benchmarks.bench_occurrences [N]
+"""
+from __future__ import annotations
+import sys, random, tempfile, pathlib, datetime as dt
+from app import storage
+from app.models import Occurrence
+from benchmarks.bench_storage import timeit
+
+RULES = ("daily", "weekly", "weekdays", "monthly", "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR", "FREQ=MONTHLY;BYMONTHDAY=-1")
+
+def seed(n: int, base: dt.datetime) -> None:
+    """n tasks over the year before `base`; one in ten recurs."""
+    rnd = random.Random(5)
+    con = storage.connect()
+    with con:
+        con.executemany(
+            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, updated_at) VALUES (?,?,?,?,?,?)",
+            ((f"Task {i}", "", storage._fmt(base + dt.timedelta(minutes=rnd.randrange(-525600, 525600))),
+              rnd.choice(RULES) if i % 10 == 0 else "none", 1, "") for i in range(n)),
+        )
+    con.execute("ANALYZE")
+
+def legacy(start: dt.datetime, end: dt.datetime) -> list:
+    """What a calendar view had to do before: read everything, walk each series."""
+    out = []
+    for t in storage.list_tasks():
+        if not t.enabled:
+            continue
+        at = t.scheduled_at
+        while at is not None and at < end:
+            if at >= start:
+                out.append(Occurrence(at, t))
+            at = t.next_occurrence(at)
+    out.sort(key=lambda o: (o.at, o.task.id))
+    return out
+
+def main(n: int = 100_000) -> None:
+    base = dt.datetime(2025, 6, 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = pathlib.Path(tmp) / "bench.sqlite"
+        seed(n, base)
+        print(f"{n} tasks ({n // 10} recurring)")
+        for label, days, limit in (("week", 7, None), ("month", 30, None), ("year", 365, None), ("year, first 200", 365, 200)):
+            end = base + dt.timedelta(days=days)
+            hits = len(storage.occurrences_between(base, end, limit))
+            new = timeit(lambda: storage.occurrences_between(base, end, limit), 3)
+            read = timeit(lambda: sum(1 for _ in storage.occurrences_between(base, end, limit)), 1)
+            old = timeit(lambda: legacy(base, end)[:limit], 1)
+            print(f"{label:16s} legacy {old:9.1f} ms   occurrences_between {new:8.1f} ms   "
+                  f"query + iterating every Occurrence {read:8.1f} ms   ({hits} occurrences)")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
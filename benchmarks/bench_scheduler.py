@@ -0,0 +1,48 @@
+"""Firing N reminders due in the same minute: per-task pipeline vs one batch.
+
+Run from the repository root:  python -m benchmarks.bench_scheduler [N] [NOTIFY_MS]
+"""
+from __future__ import annotations
+import sys, time, tempfile, pathlib, datetime as dt
+from app import storage, scheduler
+from app.models import Task
+from app.recurrence import catch_up
+
+def seed(n: int, when: dt.datetime) -> None:
+    storage.bulk_add_tasks(Task(id=None, title=f"Reminder {i}", description="", scheduled_at=when, repeat="daily") for i in range(n))
+
+def legacy_fire_all(now: dt.datetime, notify) -> None:
+    """The old loop: per task get_task, blocking notify, then update_task's own commit."""
+    for task_id, _ in storage.enabled_schedule():
+        task = storage.get_task(task_id)
+        fire, nxt = catch_up(task.repeat, task.scheduled_at, now)
+        if fire:
+            notify("Recordatorio", task.title)
+            task.last_fired_at = now
+        task.scheduled_at = nxt
+        storage.update_task(task)
+
+def batch_fire_all(now: dt.datetime) -> None:
+    sched = scheduler.EventScheduler()
+    sched._load()
+    sched._fire_due(now)
+    sched._effects.shutdown(wait=True)
+
+def main(n: int = 10_000, notify_ms: float = 0.0) -> None:
+    def notify(title, message, **kw):
+        if notify_ms:
+            time.sleep(notify_ms / 1000)
+    scheduler.notify, scheduler.play_sound = notify, lambda name: None
+    now = dt.datetime.now().replace(second=0, microsecond=0)
+    print(f"{n} tasks due at {now:%H:%M}, notify takes {notify_ms} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, run in (("per-task", lambda: legacy_fire_all(now, notify)), ("batch", lambda: batch_fire_all(now))):
+            storage.DB_PATH = pathlib.Path(tmp) / f"{name}.sqlite"
+            seed(n, now)
+            t0 = time.perf_counter()
+            run()
+            print(f"{name:9s} {(time.perf_counter() - t0) * 1000:10.1f} ms")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000, float(sys.argv[2]) if len(sys.argv) > 2 else 0.0)
@@ -0,0 +1,43 @@
+"""Agenda search latency: LIKE scan vs the FTS5 index behind search_tasks.
+
+Run from the repository root:  python -m benchmarks.bench_search [N]
+"""
+from __future__ import annotations
+import sys, random, tempfile, pathlib, datetime as dt
+from app import storage
+from benchmarks.bench_storage import timeit
+
+WORDS = ("llamar", "pagar", "revisar", "comprar", "enviar", "reunión", "gimnasio", "dentista", "factura", "correo",
+         "informe", "mamá", "proyecto", "médico", "banco", "alquiler", "clase", "entrega", "cumpleaños", "viaje")
+SYLLABLES = ("ba", "ca", "de", "fi", "go", "lu", "ma", "no", "pe", "ri", "sa", "to", "vu", "za")
+# Named words plus filler vocabulary, so each word is in a few hundred tasks
+# rather than in a third of them.
+VOCABULARY = WORDS + tuple(sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES}))[:3000]
+QUERIES = ("g", "gim", "factura", "dentista banco", "cumpleaños mamá viaje", "zzz")
+LEGACY_SEARCH = "SELECT * FROM tasks WHERE title LIKE ? OR description LIKE ? ORDER BY scheduled_at, id LIMIT ?"
+
+def seed(n: int) -> None:
+    rnd = random.Random(3)
+    base = dt.datetime(2025, 1, 1)
+    con = storage.connect()
+    with con:
+        con.executemany(
+            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled, updated_at) VALUES (?,?,?,?,?,?)",
+            ((" ".join(rnd.sample(VOCABULARY, 3)) + f" {i}", " ".join(rnd.sample(VOCABULARY, 5)),
+              storage._fmt(base + dt.timedelta(minutes=rnd.randrange(525600))), "none", 1, "") for i in range(n)),
+        )
+
+def main(n: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = pathlib.Path(tmp) / "bench.sqlite"
+        seed(n)
+        con = storage.connect()
+        print(f"{n} tasks, 50 results per query")
+        for q in QUERIES:
+            like = lambda: con.execute(LEGACY_SEARCH, (f"%{q}%", f"%{q}%", 50)).fetchall()
+            hits = len(storage.search_tasks(q))
+            print(f"{q!r:26s} LIKE {timeit(like):8.2f} ms   search_tasks {timeit(lambda: storage.search_tasks(q)):8.2f} ms   ({hits} hits)")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,45 @@
+"""Tone synthesis: per-sample struct.pack loop vs cached bulk-packed buffers.
+
+Run from the repository root:  python -m benchmarks.bench_sounds
+"""
+from __future__ import annotations
+import os, math, wave, struct, tempfile, time
+from app import sounds
+
+def legacy_gen_tone_wav(path: str, freq=880, dur_ms=200, volume=0.25, sample_rate=44100):
+    n = int(sample_rate * (dur_ms/1000.0))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        for i in range(n):
+            val = int(32767.0 * volume * math.sin(2*math.pi*freq*(i/sample_rate)))
+            w.writeframes(struct.pack("<h", val))
+
+def legacy_play_prep(freq, dur):
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
+    tmp.close()
+    try:
+        legacy_gen_tone_wav(tmp.name, freq=freq, dur_ms=dur)
+    finally:
+        os.unlink(tmp.name)
+
+def bench(fn, repeat: int = 50) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+def cold():
+    sounds._tone_pcm.cache_clear()
+    sounds._tone_wav_bytes.cache_clear()
+    return sounds._tone_wav_bytes(880, 200)
+
+def main() -> None:
+    print(f"legacy temp WAV per play (200 ms) {bench(lambda: legacy_play_prep(880, 200)):8.3f} ms")
+    print(f"bulk synthesis, cold cache        {bench(cold):8.3f} ms")
+    sounds._tone_wav_path(880, 200)
+    print(f"cached WAV path, warm             {bench(lambda: sounds._tone_wav_path(880, 200), 10000):8.4f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Storage query benchmark.
+
+Run from the repository root:  python -m benchmarks.bench_storage [N]
+"""
+from __future__ import annotations
+import sys, time, random, tempfile, pathlib, datetime as dt
+from app import storage
+
+LEGACY_DUE = "SELECT * FROM tasks WHERE enabled=1 AND datetime(scheduled_at) <= datetime(?)"
+LEGACY_LIST = "SELECT * FROM tasks ORDER BY datetime(scheduled_at) ASC"
+LEGACY_COUNT = "SELECT COUNT(*) AS c FROM tabata_sessions WHERE date(started_at)=date(?) AND completed=1"
+
+def seed(n: int, base: dt.datetime) -> None:
+    rnd = random.Random(42)
+    con = storage.connect()
+    with con:
+        con.executemany(
+            "INSERT INTO tasks(title, description, scheduled_at, repeat, enabled) VALUES (?,?,?,?,?)",
+            ((f"Task {i}", "", storage._fmt(base + dt.timedelta(minutes=rnd.randrange(525600))),
+              rnd.choice(("none", "daily", "weekly", "weekdays")), 1 if rnd.random() < 0.9 else 0) for i in range(n)),
+        )
+        con.executemany(
+            "INSERT INTO tabata_sessions(started_at, rounds, work_sec, rest_sec, completed) VALUES (?,?,?,?,?)",
+            ((storage._fmt(base + dt.timedelta(minutes=rnd.randrange(525600))), 8, 20, 10, 1) for _ in range(n)),
+        )
+        storage._migrate_v3(con)  # rebuild the daily rollup from the raw sessions
+
+def timeit(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def plan(sql: str, *args) -> str:
+    return "; ".join(r["detail"] for r in storage.connect().execute("EXPLAIN QUERY PLAN " + sql, args))
+
+def main(n: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = pathlib.Path(tmp) / "bench.sqlite"
+        base = dt.datetime(2025, 1, 1)
+        seed(n, base)
+        con = storage.connect()
+        con.execute("ANALYZE")
+        now = base + dt.timedelta(days=3)
+        day = (base + dt.timedelta(days=100)).date()
+        rows = [
+            ("due_tasks", lambda: con.execute(LEGACY_DUE, (storage._fmt(now),)).fetchall(),
+             lambda: con.execute(storage.SQL_DUE_TASKS, (storage._fmt(now),)).fetchall(),
+             plan(LEGACY_DUE, storage._fmt(now)), plan(storage.SQL_DUE_TASKS, storage._fmt(now))),
+            ("list_tasks", lambda: con.execute(LEGACY_LIST).fetchall(),
+             lambda: con.execute(storage.SQL_LIST_TASKS).fetchall(),
+             plan(LEGACY_LIST), plan(storage.SQL_LIST_TASKS)),
+            ("count_tabatas_on", lambda: con.execute(LEGACY_COUNT, (day.isoformat(),)).fetchone(),
+             lambda: storage.count_tabatas_on(day),
+             plan(LEGACY_COUNT, day.isoformat()), plan(storage.SQL_COUNT_TABATAS, day.isoformat())),
+        ]
+        print(f"{n} tasks / {n} tabata sessions")
+        for name, legacy, current, legacy_plan, current_plan in rows:
+            print(f"{name:18s} legacy {timeit(legacy):9.2f} ms   indexed {timeit(current):9.2f} ms")
+            print(f"{'':18s} legacy plan:  {legacy_plan}")
+            print(f"{'':18s} indexed plan: {current_plan}")
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
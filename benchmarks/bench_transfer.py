@@ -0,0 +1,49 @@
+"""Bulk import/export throughput.
+
+Run from the repository root:  python -m benchmarks.bench_transfer [N]
+"""
+from __future__ import annotations
+import sys, time, tempfile, pathlib, datetime as dt
+from app import storage, transfer
+from app.models import Task
+
+def make_tasks(n: int, offset: int = 0):
+    base = dt.datetime(2025, 1, 1)
+    for i in range(offset, offset + n):
+        yield Task(id=None, title=f"Task {i}", description="", scheduled_at=base + dt.timedelta(minutes=i), repeat="daily" if i % 3 else "none")
+
+def rate(n: int, seconds: float) -> str:
+    return f"{n:>8d} rows {seconds * 1000:9.1f} ms  {n / seconds:>10.0f} rows/s"
+
+def main(n: int = 100_000) -> None:
+    legacy_n = min(n, 5_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        storage.DB_PATH = tmp / "legacy.sqlite"
+        t0 = time.perf_counter()
+        for t in make_tasks(legacy_n):
+            storage.add_task(t)
+        print("add_task loop    ", rate(legacy_n, time.perf_counter() - t0))
+
+        storage.DB_PATH = tmp / "bulk.sqlite"
+        t0 = time.perf_counter()
+        storage.bulk_add_tasks(make_tasks(n))
+        print("bulk_add_tasks   ", rate(n, time.perf_counter() - t0))
+        t0 = time.perf_counter()
+        storage.bulk_add_tasks(make_tasks(n))
+        print("  (all duplicate)", rate(n, time.perf_counter() - t0))
+
+        for suffix in (".csv", ".jsonl", ".ics"):
+            path = tmp / f"export{suffix}"
+            storage.DB_PATH = tmp / "bulk.sqlite"
+            t0 = time.perf_counter()
+            transfer.export_file(path)
+            print(f"export {suffix:6s}    ", rate(n, time.perf_counter() - t0))
+            storage.DB_PATH = tmp / f"import{suffix}.sqlite"
+            t0 = time.perf_counter()
+            transfer.import_file(path)
+            print(f"import {suffix:6s}    ", rate(n, time.perf_counter() - t0))
+        storage.close_all()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
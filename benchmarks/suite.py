@@ -0,0 +1,157 @@
+"""Benchmark suite: storage queries, recurrence, tone synthesis and a scheduler day.
+
+Seeds a synthetic database per size, times each case and writes the results
+as JSON. With --baseline, cases more than --tolerance slower than in the
+baseline file are reported and the exit status is 1.
+
+Run from the repository root:
+    python -m benchmarks.suite                       # 1k and 100k rows
+    python -m benchmarks.suite 1000 100000 1000000 -o new.json --baseline old.json
+"""
+from __future__ import annotations
+import argparse, json, platform, random, statistics, sys, time, tempfile, pathlib, datetime as dt
+from typing import Callable, Dict, List
+from app import storage, scheduler, sounds
+from app.models import Task
+from benchmarks.bench_storage import seed
+
+DEFAULT_SIZES = (1_000, 100_000)
+RULES = ("daily", "weekly", "weekdays", "monthly", "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR", "FREQ=MONTHLY;BYMONTHDAY=-1")
+
+def measure(fn: Callable[[], object], repeat: int = 5, number: int = 1) -> dict:
+    """Best and median wall time of `number` calls, over `repeat` runs (ms per call)."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - t0) / number * 1000)
+    return {"best_ms": min(runs), "median_ms": statistics.median(runs), "repeat": repeat, "number": number}
+
+def bench_storage(n: int, base: dt.datetime) -> Dict[str, dict]:
+    now = base + dt.timedelta(days=3)
+    day = (base + dt.timedelta(days=100)).date()
+    repeat = 3 if n >= 1_000_000 else 5
+    return {
+        f"list_tasks[{n}]": measure(storage.list_tasks, repeat),
+        f"due_tasks[{n}]": measure(lambda: storage.due_tasks(now), repeat),
+        f"count_tabatas_on[{n}]": measure(lambda: storage.count_tabatas_on(day), repeat, 1000),
+    }
+
+def bench_recurrence() -> Dict[str, dict]:
+    anchor = dt.datetime(2025, 1, 31, 9, 30)
+    tasks = [Task(id=None, title="", description="", scheduled_at=anchor, repeat=r) for r in RULES]
+    out = {}
+    for years in (1, 10, 100):
+        after = anchor + dt.timedelta(days=365 * years)
+        out[f"next_occurrence[{years}y]"] = measure(lambda: [t.next_occurrence(after) for t in tasks], number=1000)
+    return out
+
+def bench_sounds() -> Dict[str, dict]:
+    def cold():
+        sounds._tone_pcm.cache_clear()
+        sounds._tone_wav_bytes.cache_clear()
+        sounds._gen_tone_wav(str(path), 880, 200)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / "tone.wav"
+        return {
+            "gen_tone_wav[cold]": measure(cold, number=20),
+            "gen_tone_wav[warm]": measure(lambda: sounds._gen_tone_wav(str(path), 880, 200), number=200),
+        }
+
+def bench_scheduler_day(n: int) -> Dict[str, dict]:
+    """Fire every reminder of one simulated day through EventScheduler, without sleeping."""
+    day = dt.datetime.combine(dt.date.today() + dt.timedelta(days=1), dt.time())
+    rnd = random.Random(7)
+    storage.bulk_add_tasks(
+        Task(id=None, title=f"Reminder {i}", description="", scheduled_at=day + dt.timedelta(minutes=rnd.randrange(1440)),
+             repeat=rnd.choice(("none", "daily", "weekdays")))
+        for i in range(n)
+    )
+    fired = []
+    saved = scheduler.notify, scheduler.play_sound
+    scheduler.notify = lambda title, message, **kw: fired.append(message)
+    scheduler.play_sound = lambda name: None
+    try:
+        sched = scheduler.EventScheduler()
+        t0 = time.perf_counter()
+        sched._load()
+        while True:
+            entry = sched._next_entry()
+            if entry is None or entry[0] >= day + dt.timedelta(days=1):
+                break
+            sched._fire_due(entry[0])
+        if sched._effects is not None:
+            sched._effects.shutdown(wait=True)
+        total = (time.perf_counter() - t0) * 1000
+    finally:
+        scheduler.notify, scheduler.play_sound = saved
+    return {f"scheduler_day[{n}]": {"best_ms": total, "median_ms": total, "repeat": 1, "number": 1, "fired": len(fired)}}
+
+def run(sizes=DEFAULT_SIZES, log=print) -> dict:
+    results: Dict[str, dict] = {}
+    saved_path = storage.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in sizes:
+                storage.DB_PATH = pathlib.Path(tmp) / f"bench_{n}.sqlite"
+                base = dt.datetime(2025, 1, 1)
+                t0 = time.perf_counter()
+                seed(n, base)
+                storage.connect().execute("ANALYZE")
+                log(f"seeded {n} tasks / {n} tabata sessions in {time.perf_counter() - t0:.1f} s")
+                results.update(bench_storage(n, base))
+                storage.DB_PATH = pathlib.Path(tmp) / f"day_{n}.sqlite"
+                results.update(bench_scheduler_day(min(n, 10_000)))
+                storage.close_all()
+    finally:
+        storage.close_all()
+        storage.DB_PATH = saved_path
+    results.update(bench_recurrence())
+    results.update(bench_sounds())
+    return {
+        "meta": {
+            "created": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlite": storage.sqlite3.sqlite_version,
+            "sizes": list(sizes),
+        },
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict) -> List[tuple]:
+    """(case, baseline ms, current ms, ratio) for every case present in both, slowest ratio first."""
+    rows = []
+    for name, cur in current["results"].items():
+        old = baseline["results"].get(name)
+        if old:
+            rows.append((name, old["best_ms"], cur["best_ms"], cur["best_ms"] / max(old["best_ms"], 1e-9)))
+    return sorted(rows, key=lambda r: r[3], reverse=True)
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("sizes", nargs="*", type=int, default=list(DEFAULT_SIZES), help="rows per synthetic database")
+    p.add_argument("-o", "--output", default="bench_results.json", help="where to write the JSON results")
+    p.add_argument("--baseline", help="earlier results file to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = p.parse_args(argv)
+
+    current = run(args.sizes)
+    pathlib.Path(args.output).write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    for name, r in current["results"].items():
+        print(f"{name:28s} best {r['best_ms']:10.3f} ms   median {r['median_ms']:10.3f} ms")
+    print(f"wrote {args.output}")
+    if not args.baseline:
+        return 0
+    baseline = json.loads(pathlib.Path(args.baseline).read_text(encoding="utf-8"))
+    regressions = 0
+    print(f"\nvs {args.baseline}")
+    for name, old, new, ratio in compare(current, baseline):
+        flag = "REGRESSION" if ratio > 1 + args.tolerance else ""
+        regressions += bool(flag)
+        print(f"{name:28s} {old:10.3f} -> {new:10.3f} ms  x{ratio:5.2f}  {flag}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
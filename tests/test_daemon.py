@@ -0,0 +1,59 @@
+import asyncio, datetime as dt, threading, queue
+import pytest
+from app import storage, scheduler, daemon
+from app.models import Task
+
+@pytest.fixture
+def running(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    monkeypatch.setattr(scheduler, "play_sound", lambda name: None)
+    fired = queue.Queue()
+    monkeypatch.setattr(scheduler, "notify", lambda title, message, **kw: fired.put(message))
+    d = daemon.Daemon(tmp_path / "d.sock")
+    thread = threading.Thread(target=asyncio.run, args=(d.serve(),), daemon=True)
+    thread.start()
+    assert d.ready.wait(2)
+    assert d.path.stat().st_mode & 0o077 == 0  # owner-only from the start
+    yield d, fired
+    d.stop()
+    thread.join(3)
+    assert not thread.is_alive() and not d.path.exists()
+
+def test_json_api_round_trip(running):
+    d, _ = running
+    client = daemon.connect_daemon(d.path)
+    later = (dt.datetime.now() + dt.timedelta(days=1)).replace(second=0, microsecond=0)
+    tid = client.call("add", task={"title": "Gym", "scheduled_at": later.isoformat(), "repeat": "daily"})
+    assert [t["title"] for t in client.call("list")] == ["Gym"]
+    utc = client.call("add", task={"title": "UTC", "scheduled_at": "2099-01-01T09:00Z"})
+    assert storage.get_task(utc).scheduled_at == dt.datetime(2099, 1, 1, 9, 0, tzinfo=dt.timezone.utc).astimezone().replace(tzinfo=None)
+    client.call("delete", id=utc)
+    assert client.call("toggle", id=tid) is False
+    stats = client.call("stats")
+    assert stats["tasks"] == {"total": 1, "enabled": 0} and stats["pid"] > 0
+    client.call("delete", id=tid)
+    assert client.call("list") == []
+    with pytest.raises(daemon.DaemonError, match="unknown op"):
+        client.call("explode")
+    assert daemon.connect_daemon(d.path.with_name("missing.sock")) is None
+
+def test_watchers_see_changes_and_external_writes_wake_scheduler(running):
+    d, fired = running
+    client = daemon.connect_daemon(d.path)
+    events = queue.Queue()
+    stop = client.watch(lambda kind, task_id: events.put((kind, task_id)))
+    tid = client.call("add", task={"title": "Later", "scheduled_at": "2099-01-01T09:00"})
+    assert events.get(timeout=2) == ("insert", tid)
+
+    # A write made by another process (e.g. the GUI) reaches the daemon only
+    # through the "changed" op.
+    listeners, storage._listeners[:] = list(storage._listeners), []
+    try:
+        now = dt.datetime.now().replace(second=0, microsecond=0)
+        other = storage.add_task(Task(id=None, title="Now", description="", scheduled_at=now, repeat="none"))
+    finally:
+        storage._listeners[:] = listeners
+    client.call("changed", kind="insert", id=other)
+    assert fired.get(timeout=2) == "Now"
+    assert ("insert", other) in [events.get(timeout=2), events.get(timeout=2)]
+    stop()
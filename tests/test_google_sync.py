@@ -0,0 +1,51 @@
+import datetime as dt, json
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpMockSequence
+from google.oauth2.credentials import Credentials
+from app.integrations import google_sync
+from app.models import Task
+
+def _batch_response(bodies, first=0):
+    parts = []
+    for i, body in enumerate(bodies, first):
+        status = "200 OK" if "error" not in body else "400 Bad Request"
+        parts.append(
+            "--batch_abc\r\nContent-Type: application/http\r\n"
+            f"Content-ID: <response-x + {i}>\r\n\r\n"
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(body)}\r\n"
+        )
+    return ({"status": "200", "content-type": 'multipart/mixed; boundary="batch_abc"'}, "".join(parts) + "--batch_abc--")
+
+@pytest.fixture
+def offline(monkeypatch):
+    google_sync.reset_cache()
+    monkeypatch.setattr(google_sync, "_creds", Credentials(token="offline"))
+    def install(tasks_responses, calendar_responses):
+        google_sync._services["tasks"] = build("tasks", "v1", http=HttpMockSequence(tasks_responses), static_discovery=True)
+        google_sync._services["calendar"] = build("calendar", "v3", http=HttpMockSequence(calendar_responses), static_discovery=True)
+    yield install
+    google_sync.reset_cache()
+
+def test_services_and_tasklist_are_cached(offline):
+    ok = {"status": "200"}
+    offline([(ok, json.dumps({"items": [{"id": "L1"}]})), (ok, json.dumps({"id": "t1"})), (ok, json.dumps({"id": "t2"}))], [])
+    svc = google_sync.tasks_service()
+    assert google_sync.tasks_service() is svc
+    assert google_sync.add_google_task("a") == "t1"
+    assert google_sync.add_google_task("b") == "t2"  # no second tasklists().list() round trip
+
+def test_bulk_export_uses_batches(offline):
+    ok = {"status": "200"}
+    n = google_sync.BATCH_SIZE + 2
+    tasks = [Task(id=i, title=f"T{i}", description="", scheduled_at=dt.datetime(2025, 1, 1, 9, 0), repeat="none") for i in range(n)]
+    task_bodies = [{"id": f"t{i}"} for i in range(n)]
+    task_bodies[1] = {"error": {"code": 400, "message": "bad"}}
+    offline(
+        [(ok, json.dumps({"items": [{"id": "L1"}]})), _batch_response(task_bodies[:-2]), _batch_response(task_bodies[-2:], n - 2)],
+        [_batch_response([{"id": f"e{i}"} for i in range(n - 2)]), _batch_response([{"id": "e50"}, {"id": "e51"}], n - 2)],
+    )
+    results = google_sync.export_local_tasks_to_google(tasks)
+    assert results[0] == {"task_id": "t0", "event_id": "e0"}
+    assert "task_error" in results[1] and results[1]["event_id"] == "e1"
+    assert results[-1] == {"task_id": f"t{n - 1}", "event_id": "e51"}
@@ -0,0 +1,61 @@
+import datetime as dt, json, urllib.request
+import pytest
+from app import metrics, storage, scheduler
+from app.models import Task
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.enable(False)
+    metrics.reset()
+
+def test_disabled_registry_records_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    metrics.reset()
+    storage.list_tasks()
+    metrics.inc("x")
+    with metrics.timer("y_ms"):
+        pass
+    assert metrics.snapshot()["counters"] == {} and metrics.snapshot()["histograms"] == {}
+
+def test_storage_and_scheduler_hot_paths(tmp_path, monkeypatch, enabled):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    monkeypatch.setattr(scheduler, "notify", lambda title, message, **kw: None)
+    monkeypatch.setattr(scheduler, "play_sound", lambda name: None)
+    past = dt.datetime.now().replace(second=0, microsecond=0) - dt.timedelta(minutes=2)
+    storage.add_task(Task(id=None, title="Late", description="", scheduled_at=past, repeat="daily"))
+    sched = scheduler.EventScheduler()
+    sched._load()
+    assert sched._fire_due(dt.datetime.now()) == 1
+    sched._effects.shutdown(wait=True)
+
+    snap = metrics.snapshot()
+    assert snap["histograms"]["storage.add_task"]["count"] == 1
+    assert snap["histograms"]["storage.save_fired"]["count"] == 1
+    lag = snap["histograms"]["scheduler.fire_lag_seconds"]
+    assert lag["count"] == 1 and 120 <= lag["max"] < 300
+    assert snap["counters"]["scheduler.fired"] == 1
+    assert {"scheduler.notify_ms", "scheduler.sound_ms"} <= set(snap["histograms"])
+
+    path = tmp_path / "metrics.json"
+    metrics.write_snapshot(path)
+    assert json.loads(path.read_text())["counters"]["scheduler.fired"] == 1
+
+def test_histogram_quantiles_and_prometheus_endpoint(enabled):
+    for v in (0.2, 0.3, 4, 4000, 9000):
+        metrics.observe("op_ms", v)
+    h = metrics.snapshot()["histograms"]["op_ms"]
+    assert h["count"] == 5 and h["p50"] == 5 and h["p99"] == 9000
+    metrics.inc("calls", 3)
+
+    server = metrics.serve_prometheus(0)
+    try:
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+        text = urllib.request.urlopen(url, timeout=2).read().decode()
+    finally:
+        server.shutdown()
+    assert "pt_calls_total 3" in text
+    assert 'pt_op_ms_bucket{le="0.25"} 1' in text and 'pt_op_ms_bucket{le="5000"} 4' in text
+    assert 'pt_op_ms_bucket{le="+Inf"} 5' in text and "pt_op_ms_count 5" in text
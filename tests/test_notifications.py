@@ -0,0 +1,26 @@
+import time
+from app.notifications import Dispatcher, MemoryBackend, Notification
+
+def test_burst_is_coalesced_and_rate_limited():
+    backend = MemoryBackend()
+    d = Dispatcher(backend, coalesce_window=0.05, min_interval=0.3)
+    d.start()
+    for i in range(7):
+        d.submit(Notification("Recordatorio", f"Tarea {i}", source="reminders"))
+    d.submit(Notification("Timer", "Fin de Trabajo"))
+    assert backend.event.wait(2)
+    time.sleep(0.1)
+    assert sorted(t for t, _ in backend.delivered) == ["Recordatorio (7)", "Timer"]
+    summary = dict(backend.delivered)["Recordatorio (7)"]
+    assert summary.splitlines()[:2] == ["Tarea 0", "Tarea 1"] and summary.endswith("… y 2 más")
+
+    sent = time.monotonic()
+    d.submit(Notification("Recordatorio", "Otra", source="reminders"))
+    while len(backend.delivered) < 3 and time.monotonic() - sent < 2:
+        time.sleep(0.01)
+    assert backend.delivered[-1] == ("Recordatorio", "Otra")
+    assert time.monotonic() - sent >= 0.15  # held back by the per-source rate limit
+    d.stop()
+    stats = d.stats()
+    assert stats["submitted"] == 9 and stats["delivered"] == 3 and stats["coalesced"] == 6
+    assert 0 < stats["latency_max"] < 1
@@ -0,0 +1,67 @@
+import datetime as dt
+from app.models import Task
+from app.recurrence import parse_rule, next_after, occurrences, minute_ranges, to_minute, catch_up, to_rrule, CATCH_UP_ALL, CATCH_UP_SKIP
+
+def _legacy_weekdays(d):
+    d = d + dt.timedelta(days=1)
+    while d.weekday() >= 5:
+        d += dt.timedelta(days=1)
+    return d
+
+def test_keywords_match_single_step_behaviour():
+    start = dt.datetime(2025, 1, 1, 9, 30)
+    for days in range(21):
+        d = start + dt.timedelta(days=days)
+        t = Task(id=None, title="t", description="", scheduled_at=d, repeat="weekdays")
+        assert t.next_occurrence() == _legacy_weekdays(d)
+        t.repeat = "daily"
+        assert t.next_occurrence() == d + dt.timedelta(days=1)
+        t.repeat = "weekly"
+        assert t.next_occurrence() == d + dt.timedelta(weeks=1)
+    assert Task(id=None, title="t", description="", scheduled_at=start, repeat="none").next_occurrence() is None
+
+def test_next_after_jumps_over_long_gaps():
+    anchor = dt.datetime(2025, 1, 1, 9, 0)  # Wednesday
+    after = dt.datetime(2031, 6, 5, 12, 0)
+    assert next_after(parse_rule("FREQ=DAILY;INTERVAL=3"), anchor, after) == dt.datetime(2031, 6, 8, 9, 0)
+    assert next_after(parse_rule("weekdays"), anchor, dt.datetime(2025, 1, 3, 9, 0)) == dt.datetime(2025, 1, 6, 9, 0)
+    rule = parse_rule("RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR")
+    got, t = [], anchor
+    for _ in range(4):
+        t = next_after(rule, anchor, t)
+        got.append(t.date())
+    assert got == [dt.date(2025, 1, 3), dt.date(2025, 1, 13), dt.date(2025, 1, 17), dt.date(2025, 1, 27)]
+
+def test_monthly_skips_missing_days():
+    anchor = dt.datetime(2025, 1, 31, 8, 0)
+    assert next_after(parse_rule("monthly"), anchor, anchor) == dt.datetime(2025, 3, 31, 8, 0)
+    assert next_after(parse_rule("FREQ=MONTHLY;BYMONTHDAY=-1"), anchor, anchor) == dt.datetime(2025, 2, 28, 8, 0)
+    assert parse_rule("FREQ=YEARLY") is None and parse_rule("FREQ=DAILY;BYDAY=MO") is None
+    assert to_rrule("weekdays") == "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"
+
+def test_catch_up_policies():
+    missed = dt.datetime(2025, 1, 1, 9, 0)
+    now = dt.datetime(2025, 2, 1, 10, 0)
+    assert catch_up("daily", missed, now) == (True, dt.datetime(2025, 2, 2, 9, 0))
+    assert catch_up("daily", missed, now, CATCH_UP_ALL) == (True, dt.datetime(2025, 1, 2, 9, 0))
+    assert catch_up("daily", missed, now, CATCH_UP_SKIP) == (False, dt.datetime(2025, 2, 2, 9, 0))
+    assert catch_up("none", now, now, CATCH_UP_SKIP) == (True, None)
+
+def test_occurrences_match_next_after_chain():
+    repeats = ("daily", "weekly", "weekdays", "monthly", "FREQ=DAILY;INTERVAL=3", "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR",
+               "FREQ=MONTHLY;BYMONTHDAY=-1", "FREQ=MONTHLY;INTERVAL=5;BYMONTHDAY=30")
+    # Anchors on and off the rule's pattern (a Friday the 31st, a Wednesday the 15th).
+    for anchor in (dt.datetime(2025, 1, 31, 9, 0), dt.datetime(2025, 1, 15, 7, 30)):
+        for start, end in ((dt.datetime(2025, 3, 1), dt.datetime(2026, 9, 1)), (dt.datetime(2024, 1, 1), dt.datetime(2025, 2, 10, 9, 0, 30))):
+            for repeat in repeats:
+                rule = parse_rule(repeat)
+                expected, t = [], anchor
+                while t < end:
+                    if t >= start:
+                        expected.append(t)
+                    t = next_after(rule, anchor, t)
+                assert list(occurrences(rule, anchor, start, end)) == expected, repeat
+                minutes = sorted(m for r in minute_ranges(rule, anchor, start, end) for m in r)
+                assert minutes == [to_minute(t) for t in expected], repeat
+    anchor = dt.datetime(2025, 1, 31, 9, 0)
+    assert list(occurrences(parse_rule("daily"), anchor, anchor, anchor)) == []
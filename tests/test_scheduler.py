@@ -0,0 +1,115 @@
+import datetime as dt, threading, time
+import pytest
+from app import storage, scheduler, metrics
+from app.models import Task
+
+def _recording_fire(monkeypatch):
+    fired = []
+    event = threading.Event()
+    monkeypatch.setattr(scheduler, "play_sound", lambda name: None)
+    def fake_notify(title, message, **kw):
+        fired.append((message, time.monotonic()))
+        event.set()
+    monkeypatch.setattr(scheduler, "notify", fake_notify)
+    return fired, event
+
+def test_event_scheduler_wakes_on_new_task(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    fired, event = _recording_fire(monkeypatch)
+    later = dt.datetime.now().replace(second=0, microsecond=0) + dt.timedelta(hours=3)
+    storage.add_task(Task(id=None, title="Later", description="", scheduled_at=later, repeat="none"))
+    sched = scheduler.EventScheduler()
+    sched.start()
+    try:
+        time.sleep(0.2)
+        assert fired == []
+        added = time.monotonic()
+        past = dt.datetime.now().replace(second=0, microsecond=0)
+        tid = storage.add_task(Task(id=None, title="Now", description="", scheduled_at=past, repeat="daily"))
+        assert event.wait(2)
+        assert fired[0][0] == "Now" and fired[0][1] - added < 1
+    finally:
+        sched.stop()
+        sched.join(2)
+    assert storage.get_task(tid).scheduled_at == past + dt.timedelta(days=1)
+    assert not sched.is_alive()
+    assert [m for m, _ in fired] == ["Now"]
+
+def test_batch_fire_commits_once_and_slow_alerts_do_not_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    monkeypatch.setattr(scheduler, "play_sound", lambda name: None)
+    release, fired = threading.Event(), []
+    def slow_notify(title, message, **kw):
+        if message == "Slow":
+            release.wait(2)
+        fired.append(message)
+    monkeypatch.setattr(scheduler, "notify", slow_notify)
+    now = dt.datetime.now().replace(second=0, microsecond=0)
+    storage.bulk_add_tasks(Task(id=None, title="Slow" if i == 0 else f"T{i}", description="", scheduled_at=now, repeat="daily") for i in range(150))
+    events = []
+    listener = lambda kind, task_id: events.append(kind)
+    storage.subscribe(listener)
+    sched = scheduler.EventScheduler()
+    sched._load()
+    try:
+        assert sched._fire_due(now) == 150
+        assert events == ["bulk"]  # one transaction, one reload event
+        assert all(t.scheduled_at == now + dt.timedelta(days=1) and t.last_fired_at == now for t in storage.list_tasks())
+        deadline = time.monotonic() + 2
+        while len(fired) < 149 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(fired) == 149 and "Slow" not in fired
+    finally:
+        release.set()
+        storage.unsubscribe(listener)
+        sched.stop()
+
+def test_alert_timeouts_reported_on_time_and_pool_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    monkeypatch.setattr(scheduler, "play_sound", lambda name: None)
+    release, fired = threading.Event(), []
+    def notify(title, message, **kw):
+        if message == "Hung":
+            release.wait(5)
+        fired.append(message)
+    monkeypatch.setattr(scheduler, "notify", notify)
+    metrics.reset()
+    metrics.enable()
+    now = dt.datetime.now().replace(second=0, microsecond=0)
+    sched = scheduler.Scheduler(effect_workers=1, effect_timeout=0.1)
+    try:
+        sched._fire_batch([Task(id=None, title="Hung", description="", scheduled_at=now, repeat="daily")])
+        deadline = time.monotonic() + 2
+        while not metrics.snapshot()["counters"].get("scheduler.effect_timeouts") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert metrics.snapshot()["counters"]["scheduler.effect_timeouts"] == 1  # without another batch
+        sched._fire_batch([Task(id=None, title="Next", description="", scheduled_at=now, repeat="daily")])
+        while "Next" not in fired and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fired == ["Next"]  # not stuck behind the hung worker
+    finally:
+        release.set()
+        sched.stop()
+        metrics.enable(False)
+        metrics.reset()
+
+def test_failed_fire_is_retried_after_resync(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    fired, _ = _recording_fire(monkeypatch)
+    now = dt.datetime.now().replace(second=0, microsecond=0)
+    storage.add_task(Task(id=None, title="Pago", description="", scheduled_at=now, repeat="daily"))
+    sched = scheduler.EventScheduler()
+    sched._load()
+    def locked(tasks):
+        raise storage.sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(scheduler, "save_fired", locked)
+    try:
+        with pytest.raises(storage.sqlite3.OperationalError):
+            sched._fire_due(now)
+        assert sched._resync
+        monkeypatch.setattr(scheduler, "save_fired", storage.save_fired)
+        sched._load()
+        assert sched._fire_due(now) == 1
+        assert storage.list_tasks()[0].scheduled_at == now + dt.timedelta(days=1)
+    finally:
+        sched.stop()
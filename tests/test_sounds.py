@@ -0,0 +1,83 @@
+import array, os, wave
+from app import sounds
+
+def test_tone_is_cached_and_faded():
+    pcm = sounds._tone_pcm(880, 120)
+    assert sounds._tone_pcm(880, 120) is pcm
+    samples = array.array("h", pcm)
+    assert len(samples) == int(sounds.SAMPLE_RATE * 0.12)
+    assert samples[0] == 0 and abs(samples[-1]) < 200
+    assert max(samples) > 0.9 * 32767 * sounds.VOLUME
+
+def test_wav_persisted_in_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(sounds, "CACHE_DIR", tmp_path)
+    sounds._tone_wav_path.cache_clear()
+    path = sounds._tone_wav_path(523, 220)
+    assert path.startswith(str(tmp_path))
+    with wave.open(path, "rb") as w:
+        assert w.getframerate() == sounds.SAMPLE_RATE and w.getsampwidth() == 2
+        assert w.readframes(w.getnframes()) == sounds._tone_pcm(523, 220)
+    sounds._tone_wav_path.cache_clear()
+    assert sounds._tone_wav_path(523, 220) == path
+    sounds._tone_wav_path.cache_clear()
+
+def test_audio_worker_coalesces_and_drops_stale():
+    import threading
+    played, started, gate = [], threading.Event(), threading.Event()
+    def player(event):
+        started.set()
+        gate.wait(2)
+        played.append(event)
+    worker = sounds.AudioWorker(player=player, maxsize=2, coalesce_window=5)
+    worker.start()
+    first = worker.submit("start")
+    assert started.wait(2)
+    assert worker.submit("start") is first
+    dropped, kept = worker.submit("end"), worker.submit("alert")
+    cancelled = worker.submit("other")  # queue full: the oldest queued sound is dropped
+    cancelled.cancel()
+    gate.set()
+    assert all(h.wait(2) for h in (first, dropped, kept, cancelled))
+    worker.stop()
+    worker.join(2)
+    assert played == ["start", "alert"]
+    assert first.played and kept.played and not dropped.played and not cancelled.played
+
+def test_pcm_sink_reuses_and_restarts_player(tmp_path):
+    import sys, time
+    script = tmp_path / "fake_player.py"
+    out = tmp_path / "received.bin"
+    script.write_text(
+        "import sys\n"
+        "with open(sys.argv[1], 'ab') as f:\n"
+        "    f.write(b'[player started]')\n"
+        "    while chunk := sys.stdin.buffer.read1(65536):\n"
+        "        f.write(chunk); f.flush()\n"
+    )
+    sink = sounds.PcmSink([sys.executable, str(script), str(out)])
+    try:
+        pcm = sounds._tone_pcm(880, 120)
+        assert sink.write(pcm) and sink.write(pcm)
+        deadline = time.monotonic() + 5
+        while (not out.exists() or len(out.read_bytes()) < 2 * len(pcm)) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        first = sink._proc
+        first.kill()
+        first.wait()
+        assert sink.write(b"tail")
+        assert sink._proc is not first
+    finally:
+        sink.close()
+    data = out.read_bytes()
+    assert data.count(b"[player started]") == 2  # one process per (re)start, not per write
+    assert pcm + pcm in data and data.endswith(b"tail")
+
+def test_wav_falls_back_to_private_dir(tmp_path, monkeypatch):
+    blocked = tmp_path / "file"
+    blocked.write_text("")
+    monkeypatch.setattr(sounds, "CACHE_DIR", blocked / "tones")  # cannot be created
+    sounds._tone_wav_path.cache_clear()
+    path = sounds._tone_wav_path(523, 220)
+    assert not path.startswith(str(tmp_path))
+    assert os.stat(os.path.dirname(path)).st_mode & 0o077 == 0
+    sounds._tone_wav_path.cache_clear()
@@ -0,0 +1,17 @@
+import os, subprocess, sys
+from app import profiling
+
+# Startup was ~230 ms with the Google libraries imported eagerly and is ~40 ms
+# without; STARTUP_BUDGET_MS overrides the limit on slow machines.
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "150"))
+LAZY = ("googleapiclient", "google.oauth2", "google_auth_oauthlib", "tkcalendar", "plyer")
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    code = f"import sys, app.main; print([m for m in {LAZY!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=profiling.ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_startup_import_time_budget():
+    timings = profiling.import_times("app.main")
+    assert {t.module for t in timings} >= {"app.main", "app.storage"}
+    assert profiling.total_us(timings) / 1000 < BUDGET_MS, profiling.startup_report()
@@ -1,4 +1,5 @@
-import datetime as dt
+import datetime as dt, gc, sqlite3, threading
+import pytest
 from app import storage
 from app.models import Task
 
@@ -20,3 +21,219 @@ def test_tabata_counter(tmp_path, monkeypatch):
     assert storage.count_tabatas_on(day) == 0
     storage.add_tabata_session(dt.datetime.now(), 8, 20, 10, True)
     assert storage.count_tabatas_on(day) == 1
+
+def test_connection_reused_and_schema_versioned(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    con = storage.connect()
+    assert storage.connect() is con
+    assert con.execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION
+    storage.close_all()
+    assert storage.connect() is not con
+
+def test_thread_connections_closed_when_thread_exits(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    opened = []
+    worker = threading.Thread(target=lambda: opened.append(storage.connect()))
+    worker.start()
+    worker.join()
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+    assert len(storage._open_cons) <= 1  # at most this thread's
+
+def test_time_queries_use_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    con = storage.connect()
+    def plan(sql, *args):
+        return " ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql, args))
+    assert "idx_tasks_enabled_scheduled" in plan(storage.SQL_DUE_TASKS, "2025-01-01T00:00")
+    assert "idx_tasks_scheduled" in plan(storage.SQL_LIST_TASKS)
+    assert "TEMP B-TREE" not in plan(storage.SQL_LIST_TASKS)
+    assert "PRIMARY KEY" in plan(storage.SQL_COUNT_TABATAS, "2025-01-01")
+
+def test_migrates_legacy_time_format(tmp_path, monkeypatch):
+    import sqlite3
+    path = tmp_path / "legacy.sqlite"
+    legacy = sqlite3.connect(path)
+    legacy.execute(storage.DDL)
+    legacy.execute(storage.DDL_TABATA)
+    legacy.execute("INSERT INTO tasks(title, scheduled_at) VALUES ('Old', '2025-03-01 09:30:00')")
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setattr(storage, "DB_PATH", path, raising=False)
+    due = storage.due_tasks(dt.datetime(2025, 3, 1, 9, 30))
+    assert [t.title for t in due] == ["Old"]
+    assert storage.connect().execute("SELECT scheduled_at FROM tasks").fetchone()[0] == "2025-03-01T09:30"
+
+def test_tabata_rollup_and_stats(tmp_path, monkeypatch):
+    import sqlite3
+    path = tmp_path / "test.sqlite"
+    legacy = sqlite3.connect(path)
+    legacy.execute(storage.DDL_TABATA)
+    legacy.execute("INSERT INTO tabata_sessions(started_at, rounds, work_sec, rest_sec, completed) VALUES ('2025-03-03T08:00', 8, 20, 10, 1)")
+    legacy.execute("INSERT INTO tabata_sessions(started_at, rounds, work_sec, rest_sec, completed) VALUES ('2025-03-03T09:00', 8, 20, 10, 0)")
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setattr(storage, "DB_PATH", path, raising=False)
+    assert storage.count_tabatas_on(dt.date(2025, 3, 3)) == 1
+    storage.add_tabata_session(dt.datetime(2025, 3, 4, 7, 0), 6, 40, 20)
+    storage.add_tabata_session(dt.datetime(2025, 3, 12, 7, 0), 8, 20, 10)
+    storage.add_tabata_session(dt.datetime(2025, 3, 12, 8, 0), 8, 20, 10, completed=False)
+    assert storage.tabata_stats(dt.date(2025, 3, 1), dt.date(2025, 3, 31), "week") == [
+        {"bucket": "2025-03-03", "sessions": 2, "rounds": 14, "work_sec": 400, "rest_sec": 170},
+        {"bucket": "2025-03-10", "sessions": 1, "rounds": 8, "work_sec": 160, "rest_sec": 70},
+    ]
+    assert [r["sessions"] for r in storage.tabata_stats(dt.date(2025, 1, 1), dt.date(2025, 12, 31), "month")] == [3]
+    assert [r["bucket"] for r in storage.tabata_stats(dt.date(2025, 3, 4), dt.date(2025, 3, 4))] == ["2025-03-04"]
+
+def test_keyset_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    base = dt.datetime(2025, 1, 1, 8, 0)
+    storage.bulk_add_tasks(Task(id=None, title=f"T{i}", description="", scheduled_at=base + dt.timedelta(hours=i % 4), repeat="none") for i in range(10))
+    seen, after = [], None
+    while True:
+        page = storage.list_tasks_page(after, limit=3)
+        seen += page
+        if len(page) < 3:
+            break
+        after = (page[-1].scheduled_at, page[-1].id)
+    assert [t.id for t in seen] == [t.id for t in storage.list_tasks()]
+    plan = " ".join(r["detail"] for r in storage.connect().execute("EXPLAIN QUERY PLAN " + storage.SQL_TASKS_PAGE_AFTER, ("x", 1, 3)))
+    assert "idx_tasks_scheduled" in plan and "TEMP B-TREE" not in plan
+    assert sorted(t.title for t in storage.get_tasks([seen[0].id, seen[5].id, 999])) == sorted([seen[0].title, seen[5].title])
+
+def test_column_pages_match_task_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    base = dt.datetime(2025, 1, 1, 8, 0)
+    storage.bulk_add_tasks(Task(id=None, title=f"T{i}", description="", scheduled_at=base + dt.timedelta(hours=i % 4), repeat="daily", enabled=i % 2 == 0) for i in range(10))
+    tasks = storage.list_tasks()
+    assert not hasattr(tasks[0], "__dict__")  # slotted
+    first = storage.list_task_columns(limit=4)
+    rest = storage.list_task_columns((first.scheduled_at[-1], first.id[-1]), limit=100)
+    assert len(first) == 4 and len(rest) == 6
+    assert list(first.id + rest.id) == [t.id for t in tasks]
+    assert list(first.tasks()) + list(rest.tasks()) == tasks
+
+def test_iter_tasks_filters_and_pages_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    base = dt.datetime(2025, 1, 1, 8, 0)
+    storage.bulk_add_tasks(Task(id=None, title=f"T{i}", description="", scheduled_at=base + dt.timedelta(hours=i // 2), repeat="none", enabled=i % 3 != 0) for i in range(30))
+    everything = storage.list_tasks()
+    assert list(storage.iter_tasks(page_size=4)) == everything
+    assert list(storage.iter_tasks(limit=7, page_size=3)) == everything[:7]
+    assert list(storage.iter_tasks(after=(everything[9].scheduled_at, everything[9].id), page_size=4)) == everything[10:]
+    assert list(storage.iter_tasks(enabled=False, page_size=2)) == [t for t in everything if not t.enabled]
+    window = (base + dt.timedelta(hours=3), base + dt.timedelta(hours=6))
+    assert list(storage.iter_tasks(window=window, enabled=True)) == [t for t in everything if t.enabled and window[0] <= t.scheduled_at < window[1]]
+    assert [len(c) for c in storage.iter_task_columns(page_size=8)] == [8, 8, 8, 6]
+
+    pages = storage.iter_tasks(page_size=5)
+    first = next(pages)
+    storage.delete_task(everything[1].id)  # later pages see later writes
+    storage.delete_task(everything[20].id)
+    assert [first] + list(pages) == [everything[0]] + everything[1:20] + everything[21:]
+
+def test_search_tasks_prefix_ranked_and_kept_in_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    at = dt.datetime(2025, 1, 1, 9, 0)
+    ids = [storage.add_task(Task(id=None, title=t, description=d, scheduled_at=at, repeat="none")) for t, d in (
+        ("Pagar cuota", "gimnasio del barrio"),
+        ("Gimnasio lunes", "pierna"),
+        ("Llamar a mamá", "cumpleaños"),
+    )]
+    assert [t.title for t in storage.search_tasks("gim")] == ["Gimnasio lunes", "Pagar cuota"]  # title match first
+    assert [t.title for t in storage.search_tasks("MAMA cumple")] == ["Llamar a mamá"]
+    assert storage.search_tasks("") == [] and storage.search_tasks('"') == []
+    task = storage.get_task(ids[2])
+    task.title = "Llamar a papá"
+    storage.update_task(task)
+    storage.delete_task(ids[1])
+    assert storage.search_tasks("mama") == [] and [t.id for t in storage.search_tasks("pap")] == [ids[2]]
+    assert [t.id for t in storage.search_tasks("gim")] == [ids[0]]
+
+def test_search_index_built_for_existing_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    con = storage.connect()
+    storage.add_task(Task(id=None, title="Dentista", description="", scheduled_at=dt.datetime(2025, 1, 1, 9, 0), repeat="none"))
+    with con:  # roll the file back to a version-4 database without the index
+        for name in ("tasks_fts_ai", "tasks_fts_ad", "tasks_fts_au"):
+            con.execute(f"DROP TRIGGER {name}")
+        con.execute("DROP TABLE tasks_fts")
+        con.execute("PRAGMA user_version=4")
+    storage.close_all()
+    assert [t.title for t in storage.search_tasks("dent")] == ["Dentista"]
+    assert storage.connect().execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION
+
+def test_occurrences_between_expands_and_merges(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    mon = dt.datetime(2025, 3, 3)
+    def add(title, at, repeat="none", enabled=True):
+        return storage.add_task(Task(id=None, title=title, description="", scheduled_at=at, repeat=repeat, enabled=enabled))
+    add("Gym", dt.datetime(2025, 1, 1, 7, 0), "weekdays")
+    add("Call", mon + dt.timedelta(days=2, hours=7))
+    add("Off", mon + dt.timedelta(hours=8), "daily", enabled=False)
+    add("Later", mon + dt.timedelta(days=9), "daily")
+    add("Past", mon - dt.timedelta(days=1))
+    week = storage.occurrences_between(mon, mon + dt.timedelta(days=7))
+    assert [(o.at.day, o.task.title) for o in week] == [(3, "Gym"), (4, "Gym"), (5, "Gym"), (5, "Call"), (6, "Gym"), (7, "Gym")]
+    assert len(storage.occurrences_between(mon, mon + dt.timedelta(days=365), limit=3)) == 3
+
+    con = storage.connect()
+    plan = " ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + storage.SQL_WINDOW_RECURRING, ("2025-01-01T00:00",)))
+    assert "idx_tasks_recurring_next" in plan
+    plan = " ".join(r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + storage.SQL_WINDOW_ONE_SHOT, ("2025-01-01T00:00", "2025-02-01T00:00")))
+    assert "COVERING INDEX idx_tasks_one_shot" in plan
+
+def test_occurrence_window_bounds_with_seconds(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    ten = dt.datetime(2025, 3, 3, 10, 0)
+    storage.add_task(Task(id=None, title="Once", description="", scheduled_at=ten, repeat="none"))
+    storage.add_task(Task(id=None, title="Daily", description="", scheduled_at=ten, repeat="daily"))
+    half = dt.timedelta(seconds=30)
+    assert [o.task.title for o in storage.occurrences_between(ten + half, ten + dt.timedelta(hours=1))] == []
+    assert sorted(o.task.title for o in storage.occurrences_between(ten - dt.timedelta(hours=1), ten + half)) == ["Daily", "Once"]
+
+def test_pomodoro_history_rollup_and_batch_writer(tmp_path, monkeypatch):
+    import threading
+    from app.models import FocusPhase
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    def phase(day, kind, actual, interrupted=False):
+        at = dt.datetime(2025, 3, day, 9, 0)
+        return FocusPhase(at, at + dt.timedelta(seconds=actual), kind, 1, 1500 if kind == "work" else 300, actual, 0.0, interrupted)
+    written = threading.Event()
+    writer = storage.BatchWriter(storage.add_pomodoro_phases, on_written=lambda batch: written.set())
+    writer.start()
+    for p in (phase(3, "work", 1500), phase(3, "rest", 300), phase(3, "work", 600, True), phase(11, "work", 1500)):
+        writer.submit(p)
+    assert written.wait(2)
+    writer.stop()
+    assert not writer.is_alive()
+    assert storage.pomodoro_on(dt.date(2025, 3, 3)) == (1, 2100.0)
+    assert storage.pomodoro_on(dt.date(2025, 3, 4)) == (0, 0.0)
+    assert storage.pomodoro_stats(dt.date(2025, 3, 1), dt.date(2025, 3, 31), "week") == [
+        {"bucket": "2025-03-03", "pomodoros": 1, "focus_sec": 2100.0, "break_sec": 300.0, "interrupted": 1},
+        {"bucket": "2025-03-10", "pomodoros": 1, "focus_sec": 1500.0, "break_sec": 0.0, "interrupted": 0},
+    ]
+    assert storage.connect().execute("SELECT COUNT(*) FROM pomodoro_sessions").fetchone()[0] == 4
+
+def test_change_bus_coalesces_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    bus = storage.ChangeBus()
+    storage.subscribe(bus.publish)
+    try:
+        at = dt.datetime(2025, 3, 3, 9, 0)
+        a = storage.add_task(Task(id=None, title="A", description="", scheduled_at=at, repeat="none"))
+        b = storage.add_task(Task(id=None, title="B", description="", scheduled_at=at, repeat="none"))
+        task = storage.get_task(a)
+        task.title = "A2"
+        storage.update_task(task)
+        storage.delete_task(b)
+        changes = bus.drain()
+        assert (changes.inserted, changes.updated, changes.deleted, changes.reload) == ({a}, set(), {b}, False)
+        assert not bus.drain()
+        storage.update_task(task)
+        storage.bulk_add_tasks([Task(id=None, title="C", description="", scheduled_at=at, repeat="none")])
+        changes = bus.drain()
+        assert changes.updated == {a} and changes.reload
+    finally:
+        storage.unsubscribe(bus.publish)
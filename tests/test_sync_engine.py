@@ -0,0 +1,240 @@
+import datetime as dt, itertools
+import pytest
+from app import storage
+from app.models import Task
+from app.integrations.sync_engine import GoogleSync
+
+def _now():
+    return dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+class _Call:
+    def __init__(self, fn):
+        self.execute = fn
+
+class _Batch:
+    def __init__(self, calls, callback):
+        self.calls, self.callback, self.requests = calls, callback, []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.calls.append(("batch", len(self.requests)))
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+class FakeGoogle:
+    """In-memory stand-in for the Tasks and Calendar HTTP APIs."""
+
+    def __init__(self):
+        self.ids = itertools.count(1)
+        self.version = itertools.count(1)
+        self.gtasks, self.events, self.calls = {}, {}, []
+        self.down = set()  # kinds whose calls fail
+
+    def new_batch_http_request(self, callback):
+        return _Batch(self.calls, callback)
+
+    # Tasks API
+    def tasks(self):
+        return self
+
+    def list(self, **kw):
+        self.calls.append(("tasks.list", kw))
+        since = kw.get("updatedMin")
+        items = [dict(t) for t in self.gtasks.values() if since is None or t["updated"] >= since]
+        return _Call(lambda: {"items": items})
+
+    def insert(self, tasklist, body):
+        self.calls.append(("tasks.insert", body))
+        if ("tasks.insert", body["title"]) in self.down:
+            return _Call(lambda: (_ for _ in ()).throw(RuntimeError("rate limited")))
+        item = dict(body, id=f"gt{next(self.ids)}", etag="e", updated=_now())
+        self.gtasks[item["id"]] = item
+        return _Call(lambda: dict(item))
+
+    def patch(self, tasklist, task, body):
+        self.calls.append(("tasks.patch", body))
+        self.gtasks[task].update(body, updated=_now())
+        return _Call(lambda: dict(self.gtasks[task]))
+
+    def delete(self, tasklist, task):
+        self.calls.append(("tasks.delete", task))
+        self.gtasks[task].update(deleted=True, updated=_now())
+        return _Call(lambda: "")
+
+    # Calendar API
+    def calendar(self):
+        fake = self
+        class Events:
+            def list(self, **kw):
+                fake.calls.append(("events.list", kw))
+                since = int(kw.get("syncToken") or 0)
+                items = [dict(e) for e in fake.events.values() if e["_v"] > since]
+                token = str(max([e["_v"] for e in fake.events.values()] + [since]))
+                return _Call(lambda: {"items": items, "nextSyncToken": token})
+            def insert(self, calendarId, body):
+                fake.calls.append(("events.insert", body))
+                if "events.insert" in fake.down:
+                    return _Call(lambda: (_ for _ in ()).throw(RuntimeError("calendar down")))
+                item = dict(body, id=f"ev{next(fake.ids)}", etag="e", updated=_now(), _v=next(fake.version))
+                fake.events[item["id"]] = item
+                return _Call(lambda: dict(item))
+            def patch(self, calendarId, eventId, body):
+                fake.calls.append(("events.patch", body))
+                fake.events[eventId].update(body, updated=_now(), _v=next(fake.version))
+                return _Call(lambda: dict(fake.events[eventId]))
+            def delete(self, calendarId, eventId):
+                fake.calls.append(("events.delete", eventId))
+                fake.events[eventId].update(status="cancelled", updated=_now(), _v=next(fake.version))
+                return _Call(lambda: "")
+        class Svc:
+            def events(self):
+                return Events()
+            def new_batch_http_request(self, callback):
+                return _Batch(fake.calls, callback)
+        return Svc()
+
+    def edit_event(self, event_id, **fields):
+        self.events[event_id].update(fields, updated=_now(), _v=next(self.version))
+
+    def kinds(self):
+        return [c[0] for c in self.calls if not c[0].endswith("list") and c[0] != "batch"]
+
+    def batches(self):
+        return [c[1] for c in self.calls if c[0] == "batch"]
+
+@pytest.fixture
+def google(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    fake = FakeGoogle()
+    return fake, lambda: GoogleSync(tasks_svc=fake, calendar_svc=fake.calendar(), tasklist_id="L1").sync()
+
+def test_push_is_incremental(google):
+    fake, sync = google
+    tid = storage.add_task(Task(id=None, title="Dentista", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    assert sync()["pushed"] == 1
+    assert sync()["pushed"] == 0
+    assert fake.kinds() == ["tasks.insert", "events.insert"]
+    sync()  # steady state: both listings are incremental
+    assert fake.calls[-2][1].get("updatedMin") == fake.gtasks["gt1"]["updated"]
+    assert fake.calls[-1][1].get("syncToken") == "1"
+    assert fake.kinds() == ["tasks.insert", "events.insert"]
+    t = storage.get_task(tid)
+    t.title = "Dentista (cambio)"
+    storage.update_task(t)
+    sync()
+    assert fake.kinds()[-2:] == ["tasks.patch", "events.patch"]
+    assert fake.events["ev2"]["summary"] == "Dentista (cambio)"
+
+def test_pull_remote_changes_and_deletes(google):
+    fake, sync = google
+    tid = storage.add_task(Task(id=None, title="Llamar", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    sync()
+    moved = dt.datetime(2030, 5, 2, 16, 30).astimezone()
+    fake.edit_event("ev2", summary="Llamar a Ana", start={"dateTime": moved.isoformat()})
+    assert sync()["pulled"] == 1
+    t = storage.get_task(tid)
+    assert (t.title, t.scheduled_at) == ("Llamar a Ana", dt.datetime(2030, 5, 2, 16, 30))
+    assert fake.kinds() == ["tasks.insert", "events.insert"]  # nothing echoed back
+    fake.tasks().delete("L1", "gt1")
+    assert sync()["deleted_local"] == 1 and storage.get_task(tid) is None
+    storage.add_task(Task(id=None, title="Otra", description="", scheduled_at=dt.datetime(2030, 6, 1, 9, 0), repeat="none"))
+    sync()
+    storage.delete_task(storage.list_tasks()[0].id)
+    assert sync()["deleted_remote"] == 1
+    assert fake.gtasks["gt3"]["deleted"] and fake.events["ev4"]["status"] == "cancelled"
+
+def test_newer_local_edit_wins_conflict(google):
+    fake, sync = google
+    tid = storage.add_task(Task(id=None, title="Plan", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    sync()
+    fake.edit_event("ev2", summary="Plan (remoto)")
+    t = storage.get_task(tid)
+    t.title = "Plan (local)"
+    storage.update_task(t)
+    report = sync()
+    assert report["conflicts_local_won"] == 1
+    assert storage.get_task(tid).title == "Plan (local)"
+    assert fake.events["ev2"]["summary"] == "Plan (local)"
+
+def test_pulled_tasks_fire_only_when_due_in_future(google):
+    fake, sync = google
+    future = dt.datetime(2030, 5, 1, 10, 0).astimezone().isoformat()
+    past = dt.datetime(2020, 5, 1, 10, 0).astimezone().isoformat()
+    for title, due in (("Futura", future), ("Vencida", past), ("Sin fecha", None)):
+        fake.gtasks[title] = dict(id=title, title=title, status="needsAction", etag="e", updated=_now(), **({"due": due} if due else {}))
+    assert sync()["pulled"] == 3
+    enabled = {t.title: t.enabled for t in storage.list_tasks()}
+    assert enabled == {"Futura": True, "Vencida": False, "Sin fecha": False}
+
+def test_push_is_batched(google):
+    fake, sync = google
+    n = 120
+    for i in range(n):
+        storage.add_task(Task(id=None, title=f"T{i}", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    assert sync()["pushed"] == n
+    assert fake.batches() == [50, 50, 50, 50, 20, 20]
+    for t in storage.list_tasks()[:3]:
+        storage.delete_task(t.id)
+    assert sync()["deleted_remote"] == 3
+    assert fake.batches()[-2:] == [3, 3]
+
+def test_half_pushed_task_is_patched_on_retry(google):
+    fake, sync = google
+    storage.add_task(Task(id=None, title="Cita", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    fake.down.add("events.insert")
+    with pytest.raises(RuntimeError):
+        sync()
+    fake.down.clear()
+    sync()
+    assert fake.kinds() == ["tasks.insert", "events.insert", "tasks.patch", "events.insert"]
+    assert len(fake.gtasks) == len(fake.events) == 1
+    assert sync()["pushed"] == 0
+
+def test_export_goes_through_links(google):
+    fake, sync = google
+    engine = GoogleSync(tasks_svc=fake, calendar_svc=fake.calendar(), tasklist_id="L1")
+    tid = storage.add_task(Task(id=None, title="Informe", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none"))
+    assert engine.export(storage.get_tasks([tid])) == [None]
+    assert engine.export(storage.get_tasks([tid])) == [None]
+    assert sync()["pushed"] == 0
+    assert fake.kinds() == ["tasks.insert", "events.insert", "tasks.patch", "events.patch"]
+
+def test_first_sync_adopts_unlinked_exports(google):
+    fake, sync = google
+    when = dt.datetime(2030, 5, 1, 10, 0)
+    tid = storage.add_task(Task(id=None, title="Viejo", description="", scheduled_at=when, repeat="none"))
+    # Exported before google_links existed: Google has it, no link records it.
+    fake.tasks().insert("L1", dict(title="Viejo", due=when.astimezone(dt.timezone.utc).replace(hour=0).isoformat()))
+    fake.calendar().events().insert("primary", dict(summary="Viejo", start={"dateTime": when.astimezone().isoformat()}))
+    fake.calls.clear()
+    report = sync()
+    assert (report["pulled"], report["pushed"]) == (0, 0)
+    assert fake.kinds() == []
+    assert [t.id for t in storage.list_tasks()] == [tid]
+    link = storage.get_link(tid)
+    assert (link["gtask_id"], link["event_id"]) == ("gt1", "ev2")
+
+def test_failed_push_is_retried_when_rows_share_a_stamp(google):
+    fake, sync = google
+    storage.bulk_add_tasks(Task(id=None, title=f"T{i}", description="", scheduled_at=dt.datetime(2030, 5, 1, 10, 0), repeat="none") for i in range(60))
+    with storage.connect() as con:
+        con.execute("UPDATE tasks SET updated_at='2030-01-01T00:00:00.000000+00:00'")  # one tick / migration stamp
+    fake.down.add(("tasks.insert", "T55"))
+    with pytest.raises(RuntimeError):
+        sync()
+    fake.down.clear()
+    assert sync()["pushed"] == 1
+    assert sorted(t["title"] for t in fake.gtasks.values()) == sorted(f"T{i}" for i in range(60))
+    assert sync()["pushed"] == 0
+
+def test_cancelled_event_without_updated_deletes_task(google):
+    fake, sync = google
+    tid = storage.add_task(Task(id=None, title="Cena", description="", scheduled_at=dt.datetime(2030, 5, 1, 21, 0), repeat="none"))
+    sync()
+    fake.events["ev2"] = {"id": "ev2", "status": "cancelled", "_v": next(fake.version)}  # minimal tombstone
+    assert sync()["deleted_local"] == 1 and storage.get_task(tid) is None
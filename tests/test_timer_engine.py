@@ -0,0 +1,83 @@
+import datetime as dt
+from app.timer_engine import IntervalProgram, Phase, PhaseRecorder, WORK, REST, pomodoro, tabata
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+    def __call__(self):
+        return self.t
+
+def test_pomodoro_phases():
+    assert pomodoro(1500, 300, 2) == [Phase(WORK, 1500, 1), Phase(REST, 300, 1), Phase(WORK, 1500, 2)]
+
+def test_late_polls_do_not_drift():
+    clock = FakeClock()
+    prog = IntervalProgram(tabata(20, 10, 3), clock=clock)
+    prog.start()
+    assert prog.display_seconds() == 20
+    ended = []
+    # Callbacks that always arrive 1.3 s late still land every phase on its deadline.
+    while prog.running:
+        clock.t += 1.3
+        ended += prog.poll()
+    assert [(p.name, p.number) for p in ended] == [(WORK, 1), (REST, 1), (WORK, 2), (REST, 2), (WORK, 3)]
+    assert prog.finished and prog.remaining() == 0
+    assert clock.t - 1000.0 < 80 + 1.3
+
+def test_pause_and_resume_keep_remaining_time():
+    clock = FakeClock()
+    prog = IntervalProgram(pomodoro(60, 30, 1), clock=clock)
+    prog.start()
+    clock.t += 20.5
+    prog.pause()
+    clock.t += 500
+    assert prog.poll() == [] and prog.display_seconds() == 40
+    prog.start()
+    clock.t += 39.4
+    assert prog.poll() == [] and prog.display_seconds() == 1
+    clock.t += 0.1
+    assert prog.poll() == [Phase(WORK, 60, 1)] and prog.finished
+
+def test_phase_recorder_excludes_pauses_and_marks_interruptions():
+    clock = FakeClock()
+    start = dt.datetime(2025, 3, 3, 9, 0)
+    rec = PhaseRecorder(clock=clock, wall=lambda: start)
+    rec.begin(Phase(WORK, 1500, 1))
+    rec.pause()
+    clock.t += 120
+    rec.resume()
+    done = rec.end()
+    assert (done.actual_sec, done.paused_sec, done.interrupted) == (1500, 120, False)
+    assert done.ended_at == start + dt.timedelta(seconds=1620)
+    rec.begin(Phase(REST, 300, 1), at=done.ended_at)
+    cut = rec.end(remaining=200, interrupted=True)
+    assert (cut.kind, cut.actual_sec, cut.interrupted) == (REST, 100, True)
+    assert cut.started_at == done.ended_at and rec.end() is None
+
+def test_phases_ending_in_one_poll_keep_their_successors():
+    clock = FakeClock()
+    start = dt.datetime(2025, 3, 3, 9, 0)
+    prog = IntervalProgram(pomodoro(1500, 300, 2), clock=clock)
+    rec = PhaseRecorder(clock=clock, wall=lambda: start)
+    prog.start()
+    rec.begin(prog.current)
+    clock.t += 1800  # suspended through work 1 and break 1
+    records = []
+    for phase, nxt in prog.poll_transitions():
+        records.append(rec.end())
+        if nxt is not None:
+            rec.begin(nxt, at=records[-1].ended_at)
+    assert [(r.kind, r.number, r.actual_sec) for r in records] == [(WORK, 1, 1500), (REST, 1, 300)]
+    assert rec.phase == Phase(WORK, 1500, 2)
+    clock.t += 1500
+    assert prog.poll_transitions() == [(Phase(WORK, 1500, 2), None)]
+
+def test_final_rest_and_work_in_one_poll_end_with_none():
+    clock = FakeClock()
+    prog = IntervalProgram(tabata(20, 10, 2), clock=clock)
+    prog.start()
+    clock.t += 25
+    assert prog.poll_transitions() == [(Phase(WORK, 20, 1), Phase(REST, 10, 1))]
+    clock.t += 30
+    assert prog.poll_transitions() == [(Phase(REST, 10, 1), Phase(WORK, 20, 2)), (Phase(WORK, 20, 2), None)]
+    assert prog.finished
@@ -0,0 +1,49 @@
+import datetime as dt
+import pytest
+from app import storage, transfer
+from app.models import Task
+
+def _task(title, minutes, repeat="none", **kw):
+    return Task(id=None, title=title, description=kw.pop("description", ""), scheduled_at=dt.datetime(2025, 5, 1, 8, 0) + dt.timedelta(minutes=minutes), repeat=repeat, **kw)
+
+def test_bulk_add_deduplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    tasks = [_task(f"T{i % 50}", i % 50, "daily") for i in range(120)]
+    assert storage.bulk_add_tasks(tasks, chunk_size=7) == 50
+    assert storage.bulk_add_tasks(tasks) == 0
+    assert storage.bulk_add_tasks([_task("T1", 1, "weekly")]) == 1
+    assert sum(1 for _ in storage.iter_export(chunk_size=3)) == 51
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl", ".ics"])
+def test_round_trip(tmp_path, monkeypatch, suffix):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "src.sqlite", raising=False)
+    storage.bulk_add_tasks([
+        _task("Reunión, equipo; semanal", 0, "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH", description="línea 1\nlínea 2 " + "x" * 120),
+        _task("Pagar", 60, "weekdays", enabled=False),
+        _task("Una vez", 120),
+    ])
+    path = tmp_path / f"tasks{suffix}"
+    assert transfer.export_file(path) == 3
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "dst.sqlite", raising=False)
+    assert transfer.import_file(path) == (3, 3)
+    assert transfer.import_file(path) == (3, 0)
+    got = sorted((t.title, t.description, t.scheduled_at, t.repeat, t.enabled) for t in storage.iter_export())
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "src.sqlite", raising=False)
+    assert got == sorted((t.title, t.description, t.scheduled_at, t.repeat, t.enabled) for t in storage.iter_export())
+
+@pytest.mark.parametrize("suffix", [".csv", ".jsonl"])
+def test_import_converts_offsets_to_local_time(tmp_path, monkeypatch, suffix):
+    monkeypatch.setattr(storage, "DB_PATH", tmp_path / "test.sqlite", raising=False)
+    path = tmp_path / f"tasks{suffix}"
+    if suffix == ".csv":
+        path.write_text("title,scheduled_at\nUTC,2025-01-01T09:00Z\nMadrid,2025-01-01T09:00+02:00\n", encoding="utf-8")
+    else:
+        path.write_text('{"title": "UTC", "scheduled_at": "2025-01-01T09:00Z"}\n'
+                        '{"title": "Madrid", "scheduled_at": "2025-01-01T09:00+02:00"}\n', encoding="utf-8")
+    assert transfer.import_file(path) == (2, 2)
+    utc = dt.datetime(2025, 1, 1, 9, 0, tzinfo=dt.timezone.utc)
+    got = {t.title: t.scheduled_at for t in storage.list_tasks()}
+    assert got == {"UTC": utc.astimezone().replace(tzinfo=None),
+                   "Madrid": (utc - dt.timedelta(hours=2)).astimezone().replace(tzinfo=None)}
+    assert all(at.tzinfo is None for at in got.values())
+    assert storage.due_tasks(dt.datetime(2030, 1, 1))